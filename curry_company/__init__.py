@@ -0,0 +1 @@
+"""Camada de dados e agregações compartilhada pelas páginas do dashboard."""
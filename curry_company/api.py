@@ -0,0 +1,223 @@
+# Libraries
+import argparse
+import datetime
+import hashlib
+import json
+import sys
+import traceback
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from curry_company.backends import get_backend
+from curry_company.cache import filter_key
+from curry_company.cube import measure_table, measure_total
+from curry_company.ranking import rank_delivers
+from curry_company.timeseries import rolling_metrics
+from curry_company.views import (orders_by_city_traffic, orders_by_day, orders_by_week, orders_per_driver_week,
+                                 ratings_by_driver, results_cache, traffic_share)
+
+HOST = '127.0.0.1'
+PORT = 8502
+
+
+def drivers_summary(df1, cube, sketches):
+    return {
+        'entregadores_unicos': sketches['drivers'].count(),
+        'maior_idade': df1['Delivery_person_Age'].max(),
+        'menor_idade': df1['Delivery_person_Age'].min(),
+        'melhor_condicao': df1['Vehicle_condition'].max(),
+        'pior_condicao': df1['Vehicle_condition'].min(),
+    }
+
+
+def top_drivers(df1, cube, sketches):
+    rapidos, lentos = rank_delivers(df1, n=10)
+    return {'rapidos': rapidos, 'lentos': lentos}
+
+
+def distances(df1, cube, sketches):
+    media, desvio = measure_total(cube, 'distance')
+    return {
+        'media_km': media,
+        'desvio_km': desvio,
+        'por_cidade': measure_table(cube, ['City'], 'distance', 'media_km', 'desvio_km'),
+    }
+
+
+# Rota -> função(dataset filtrado, cubo filtrado, sketches filtrados); as mesmas contas das páginas
+ENDPOINTS = {
+    '/orders/day': lambda df1, cube, sketches: orders_by_day(cube),
+    '/orders/week': lambda df1, cube, sketches: orders_by_week(cube),
+    '/orders/city-traffic': lambda df1, cube, sketches: orders_by_city_traffic(cube),
+    '/orders/driver-week': lambda df1, cube, sketches: orders_per_driver_week(cube, sketches['drivers']),
+    '/orders/rolling': lambda df1, cube, sketches: rolling_metrics(cube, sketches['drivers']),
+    '/traffic/share': lambda df1, cube, sketches: traffic_share(cube),
+    '/ratings/driver': lambda df1, cube, sketches: ratings_by_driver(df1),
+    '/ratings/traffic': lambda df1, cube, sketches: measure_table(cube, ['Road_traffic_density'], 'rating', 'Delivery_mean', 'Delivery_std'),
+    '/ratings/weather': lambda df1, cube, sketches: measure_table(cube, ['Weatherconditions'], 'rating', 'Delivery_mean', 'Delivery_std'),
+    '/drivers/summary': drivers_summary,
+    '/drivers/top': top_drivers,
+    '/festival': lambda df1, cube, sketches: measure_table(cube, ['Festival'], 'time', 'tempo_medio', 'desvio_padrao'),
+    '/distance': distances,
+    '/restaurants/city-order': lambda df1, cube, sketches: measure_table(cube, ['City', 'Type_of_order'], 'time', 'tempo_medio', 'desvio_padrao'),
+}
+
+# Colunas das linhas filtradas que cada rota usa; rota fora daqui não lê linhas (df1 = None)
+ENDPOINT_ROWS = {
+    '/ratings/driver': ['Delivery_person_ID', 'Delivery_person_Ratings'],
+    '/drivers/summary': ['Delivery_person_Age', 'Vehicle_condition'],
+    '/drivers/top': ['Delivery_person_ID', 'City', 'Time_taken(min)'],
+}
+
+# Sketches que cada rota usa (ver curry_company.sketch)
+ENDPOINT_SKETCHES = {
+    '/orders/driver-week': ['drivers'],
+    '/orders/rolling': ['drivers'],
+    '/drivers/summary': ['drivers'],
+}
+
+
+def parse_filters(query):
+    """ Filtros da query string, no formato de page_results
+
+        start/end em AAAA-MM-DD (end excluso, como o slider), traffic,
+        weather e city como listas separadas por vírgula ou parâmetros
+        repetidos. Parâmetro ausente = sem filtro.
+
+        Output: dicionario com date_start, date_cutoff, traffic, weather e city
+    """
+    parametros = parse_qs(query, keep_blank_values=True)
+
+    def data(nome):
+        if nome not in parametros:
+            return None
+        return datetime.datetime.fromisoformat(parametros[nome][-1])
+
+    def lista(nome):
+        if nome not in parametros:
+            return None
+        return [v.strip() for valor in parametros[nome] for v in valor.split(',') if v.strip()]
+
+    return {'date_start': data('start'), 'date_cutoff': data('end'),
+            'traffic': lista('traffic'), 'weather': lista('weather'), 'city': lista('city')}
+
+
+def _json_value(valor):
+    if isinstance(valor, pd.DataFrame):
+        valor = valor.astype(object).where(valor.notna(), None)
+        return [{coluna: _json_value(v) for coluna, v in linha.items()} for linha in valor.to_dict('records')]
+    if isinstance(valor, dict):
+        return {k: _json_value(v) for k, v in valor.items()}
+    if isinstance(valor, (pd.Timestamp, datetime.datetime)):
+        return valor.isoformat()
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and np.isnan(valor):
+        return None
+    return valor
+
+
+def etag(path, filtros):
+    """ ETag da resposta: versão dos dados no backend, rota e filtros normalizados
+
+        Não depende do corpo, então um If-None-Match igual responde 304
+        sem calcular nada.
+    """
+    chave = (get_backend().version(), path, filter_key(**filtros))
+    return '"' + hashlib.sha1(repr(chave).encode()).hexdigest() + '"'
+
+
+def endpoint_body(path, filtros):
+    """ Corpo JSON (bytes) de uma rota, guardado no results_cache
+
+        Linhas, cubo e sketches filtrados vêm do backend configurado em
+        CURRY_COMPANY_BACKEND, como nas páginas; só as rotas de
+        ENDPOINT_ROWS leem linhas.
+    """
+    backend = get_backend()
+    key = ('api', path, backend.version()) + filter_key(**filtros)
+
+    def calcular():
+        colunas = ENDPOINT_ROWS.get(path)
+        linhas = backend.rows(filtros, colunas) if colunas else None
+        dados = ENDPOINTS[path](linhas, backend.cube(filtros), backend.sketches(filtros, ENDPOINT_SKETCHES.get(path, [])))
+        resposta = {'filters': _json_value(filtros), 'data': _json_value(dados)}
+        return json.dumps(resposta, ensure_ascii=False).encode()
+
+    return results_cache.get_or_compute(key, calcular)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """ GET /<rota>?start=&end=&traffic=&weather=&city= -> JSON """
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and status != HTTPStatus.NOT_MODIFIED:
+            self.wfile.write(body)
+
+    def _error(self, status, mensagem):
+        self._send(status, json.dumps({'error': mensagem}, ensure_ascii=False).encode())
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip('/') or '/'
+        if path == '/':
+            self._send(HTTPStatus.OK, json.dumps({'endpoints': sorted(ENDPOINTS)}).encode())
+            return
+        if path not in ENDPOINTS:
+            self._error(HTTPStatus.NOT_FOUND, f'rota desconhecida: {path}')
+            return
+        try:
+            filtros = parse_filters(url.query)
+        except ValueError as erro:
+            self._error(HTTPStatus.BAD_REQUEST, f'filtro inválido: {erro}')
+            return
+
+        # Um erro no cálculo vira 500 com corpo JSON em vez de derrubar a conexão
+        try:
+            tag = etag(path, filtros)
+            headers = {'ETag': tag, 'Cache-Control': 'no-cache'}
+            if tag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+                self._send(HTTPStatus.NOT_MODIFIED, headers=headers)
+                return
+            body = endpoint_body(path, filtros)
+        except Exception as erro:
+            print(f'Erro em {self.path}:\n{traceback.format_exc()}', file=sys.stderr)
+            self._error(HTTPStatus.INTERNAL_SERVER_ERROR, f'erro ao calcular {path}: {erro}')
+            return
+        self._send(HTTPStatus.OK, body, headers)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API JSON com os agregados do dashboard')
+    parser.add_argument('--host', default=HOST, help='endereço de escuta')
+    parser.add_argument('--port', type=int, default=PORT, help='porta de escuta')
+    args = parser.parse_args()
+
+    # Abre os dados do backend antes da primeira requisição
+    get_backend().date_bounds()
+    servidor = ThreadingHTTPServer((args.host, args.port), MetricsHandler)
+    print(f'API em http://{args.host}:{args.port}/ ({len(ENDPOINTS)} rotas)')
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
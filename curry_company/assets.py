@@ -0,0 +1,51 @@
+# Libraries
+import io
+import os
+import threading
+
+# Logo da barra lateral: arquivo original e largura exibida (px)
+LOGO_PATH = 'logo.png'
+LOGO_WIDTH = 230
+
+# A imagem guardada tem o dobro da largura exibida, para ficar nítida em
+# telas de alta densidade
+LOGO_SCALE = 2
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _asset_key(path, width):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns, width)
+
+
+def logo_image(path=LOGO_PATH, width=LOGO_WIDTH):
+    """ Logo reduzido para a largura exibida, decodificado uma vez por processo
+
+        O png original (1024x1024, ~700 KB) era aberto a cada execução de
+        cada página só para ser mostrado com 230 px. Aqui ele é lido e
+        reduzido uma vez e guardado em memória como png pequeno (chave:
+        caminho, tamanho, mtime e largura); as execuções seguintes só
+        devolvem os bytes.
+
+        Input: caminho do png e largura exibida
+        Output: bytes do png reduzido (para st.sidebar.image)
+    """
+    key = _asset_key(path, width)
+    with _lock:
+        imagem = _cache.get(key)
+        if imagem is None:
+            from PIL import Image
+
+            with Image.open(path) as original:
+                largura = min(original.width, width * LOGO_SCALE)
+                altura = max(1, round(original.height * largura / original.width))
+                modo = 'RGBA' if 'A' in original.getbands() else 'RGB'
+                reduzida = original.convert(modo).resize((largura, altura), Image.LANCZOS, reducing_gap=2.0)
+            buffer = io.BytesIO()
+            # Compressão rápida: o png reduzido já é ~4x menor que o original
+            reduzida.save(buffer, format='PNG', compress_level=1)
+            imagem = _cache[key] = buffer.getvalue()
+    return imagem
+
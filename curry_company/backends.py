@@ -0,0 +1,331 @@
+# Libraries
+import argparse
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from curry_company.cube import DIMENSIONS, MEASURES, filter_cube, load_cube, measure_columns
+from curry_company.data import (DATASET_PATH, DERIVED_SCHEMA, SCHEMA, data_version, dataset_key, dataset_loaded,
+                                load_dataset, resolve_source)
+from curry_company.hll import DISTINCT_DIMENSIONS, build_distinct
+from curry_company.index import date_bounds
+from curry_company.sketch import SKETCHES, build_histogram, filter_sketches, load_sketches
+
+# Backend das agregações das páginas: 'pandas' (padrão) ou 'duckdb'
+BACKEND = os.environ.get('CURRY_COMPANY_BACKEND', 'pandas')
+
+_backends = {}
+_lock = threading.Lock()
+
+
+def _filter_columns(traffic=None, weather=None, city=None):
+    return {'Road_traffic_density': traffic, 'Weatherconditions': weather, 'City': city}
+
+
+class PandasBackend:
+    """ Agregações sobre o dataframe e o cubo em cache no processo """
+
+    name = 'pandas'
+
+    def version(self):
+        # O arquivo de dados entra na chave: com cubo e sketches gravados o
+        # dataset pode nunca ser carregado (e data_version não muda)
+        return (data_version(),) + dataset_key(resolve_source())
+
+    def date_bounds(self):
+        # O cubo sai ordenado por Order_Date, como o dataset
+        return date_bounds(load_cube())
+
+    def rows_loaded(self):
+        """ Se as linhas do dataset atual já estão na memória """
+        return dataset_loaded()
+
+    def rows(self, filters, columns=None):
+        from curry_company.views import filter_rows
+        # As colunas são ignoradas: o recorte sem cópia já tem todas
+        return filter_rows(load_dataset(), **filters)
+
+    def cube(self, filters):
+        return filter_cube(load_cube(), **filters)
+
+    def sketches(self, filters, names=None):
+        """ Sketches filtrados; os que não couberam em SKETCH_MAX_ROWS (None)
+            são montados na hora a partir das linhas filtradas, em datas
+            diárias (quantis dos dias filtrados, sem aproximação de período)
+        """
+        if names is not None and not names:
+            return {}
+        sketches = load_sketches()
+        resultado = filter_sketches(sketches, **filters, names=names)
+        faltando = [nome for nome, sketch in sketches.items()
+                    if sketch is None and (names is None or nome in names)]
+        if faltando:
+            linhas = self.rows(filters)
+            for nome in faltando:
+                resultado[nome] = build_histogram(linhas, *SKETCHES[nome])
+        return resultado
+
+
+class DuckDBBackend:
+    """ Agregações em SQL no DuckDB embutido, lendo o snapshot colunar
+
+        O snapshot é aberto por memory map e registrado como tabela Arrow;
+        filtros e groupbys rodam dentro do DuckDB e só o resultado (cubo
+        filtrado ou as colunas pedidas das linhas filtradas) volta para o
+        pandas. Sem snapshot atualizado, consulta o dataframe em cache.
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, path=DATASET_PATH, snapshot_path=None):
+        try:
+            import duckdb
+        except ImportError as erro:
+            raise ImportError('O backend duckdb precisa do pacote duckdb (pip install duckdb)') from erro
+        self._duckdb = duckdb
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self._table = None
+        self._key = None
+        self._drivers = None
+        self._table_lock = threading.Lock()
+        self._local = threading.local()
+
+    def version(self):
+        return ('duckdb',) + dataset_key(resolve_source(self.path, self.snapshot_path))
+
+    def _source(self):
+        """ Tabela Arrow (ou dataframe) da versão atual dos dados """
+        source = resolve_source(self.path, self.snapshot_path)
+        key = dataset_key(source)
+        with self._table_lock:
+            if self._key != key:
+                self._table = None
+                if source.endswith('.arrow'):
+                    import pyarrow.feather as feather
+                    self._table = feather.read_table(source, memory_map=True)
+                    # Snapshot gravado antes das colunas derivadas atuais: usa o dataframe
+                    if not set(DERIVED_SCHEMA) <= set(self._table.column_names):
+                        self._table = None
+                if self._table is None:
+                    self._table = load_dataset(self.path, self.snapshot_path)
+                self._key = key
+            return key, self._table
+
+    def _connection(self):
+        # Uma conexão por thread (a pré-carga das visões roda em outra thread)
+        key, tabela = self._source()
+        if getattr(self._local, 'key', None) != key:
+            con = self._duckdb.connect()
+            con.register('orders', tabela)
+            self._local.con = con
+            self._local.key = key
+        return self._local.con
+
+    def _where(self, date_cutoff=None, traffic=None, weather=None, date_start=None, city=None):
+        condicoes, parametros = [], []
+        if date_start is not None:
+            condicoes.append('"Order_Date" >= ?')
+            parametros.append(pd.Timestamp(date_start).to_pydatetime())
+        if date_cutoff is not None:
+            condicoes.append('"Order_Date" < ?')
+            parametros.append(pd.Timestamp(date_cutoff).to_pydatetime())
+        for coluna, valores in _filter_columns(traffic, weather, city).items():
+            if valores is None:
+                continue
+            valores = sorted(set(valores))
+            if not valores:
+                condicoes.append('FALSE')
+                continue
+            condicoes.append(f'"{coluna}" IN ({", ".join("?" * len(valores))})')
+            parametros += valores
+        return (' WHERE ' + ' AND '.join(condicoes)) if condicoes else '', parametros
+
+    def _query(self, sql, parametros):
+        return self._connection().execute(sql, parametros).df()
+
+    def rows_loaded(self):
+        # As linhas são lidas do snapshot por memory map a cada consulta
+        return True
+
+    def date_bounds(self):
+        menor, maior = self._connection().execute('SELECT min("Order_Date"), max("Order_Date") FROM orders').fetchone()
+        if menor is None:
+            return None, None
+        return pd.Timestamp(menor).to_pydatetime(), pd.Timestamp(maior).to_pydatetime()
+
+    def rows(self, filters, columns=None):
+        """ Colunas pedidas das linhas filtradas, na ordem do snapshot """
+        where, parametros = self._where(**filters)
+        colunas = ', '.join(f'"{c}"' for c in columns) if columns else '*'
+        return _as_schema(self._query(f'SELECT {colunas} FROM orders{where}', parametros))
+
+    def cube(self, filters):
+        """ Cubo já filtrado, calculado por GROUP BY no DuckDB
+
+            Mesmas colunas e ordem de filter_cube(build_cube(df1)).
+        """
+        where, parametros = self._where(**filters)
+        dimensoes = ', '.join(f'"{d}"' for d in DIMENSIONS)
+        medidas = ['count(*) AS n']
+        for nome, coluna in MEASURES.items():
+            valor = f'CAST("{coluna}" AS DOUBLE)'
+            medidas += [f'count({valor}) AS {nome}_n',
+                        f'coalesce(sum({valor}), 0) AS {nome}_sum',
+                        f'coalesce(sum({valor} * {valor}), 0) AS {nome}_sumsq']
+        ordem = ', '.join(f'"{d}" NULLS LAST' for d in DIMENSIONS)
+        sql = f'SELECT {dimensoes}, {", ".join(medidas)} FROM orders{where} GROUP BY ALL ORDER BY {ordem}'
+        return _as_schema(self._query(sql, parametros)).loc[:, DIMENSIONS + measure_columns()]
+
+    def sketches(self, filters, names=None):
+        """ Sketches de quantis já filtrados (mesmas faixas de build_sketches)
+
+            Montados a cada consulta sobre as linhas filtradas, sempre em
+            datas diárias: não ficam guardados, então não têm limite de
+            tamanho.
+        """
+        resultado = {}
+        for nome, (coluna, largura, dimensoes) in SKETCHES.items():
+            if names is not None and nome not in names:
+                continue
+            ordem = ', '.join(f'"{d}" NULLS LAST' for d in dimensoes)
+            colunas = ', '.join(f'"{d}"' for d in dimensoes)
+            where, parametros = self._where(**filters)
+            where += (' AND ' if where else ' WHERE ') + f'"{coluna}" IS NOT NULL'
+            faixa = f'CAST(floor(CAST("{coluna}" AS DOUBLE) / {largura!r} + 0.5) AS BIGINT)'
+            sql = (f'SELECT {colunas}, {faixa} AS bin, count(*) AS "count" FROM orders{where} '
+                   f'GROUP BY ALL ORDER BY {ordem}, bin')
+            resultado[nome] = _as_schema(self._query(sql, parametros))
+        if names is None or 'drivers' in names:
+            resultado['drivers'] = self._distinct_drivers().filter(**filters)
+        return resultado
+
+    def _distinct_drivers(self):
+        """ Sketch de entregadores distintos, montado uma vez por versão dos dados
+
+            O DuckDB devolve só os pares distintos (célula, entregador).
+        """
+        key = self._source()[0]
+        if self._drivers is None or self._drivers[0] != key:
+            dimensoes = ', '.join(f'"{d}"' for d in DISTINCT_DIMENSIONS)
+            pares = self._query(f'SELECT DISTINCT {dimensoes}, "Delivery_person_ID" FROM orders '
+                                f'WHERE "Delivery_person_ID" IS NOT NULL', [])
+            self._drivers = (key, build_distinct(_as_schema(pares)))
+        return self._drivers[1]
+
+
+def _as_schema(df):
+    """ Colunas de texto voltam como category, como no dataset limpo """
+    for coluna in df.columns:
+        if SCHEMA.get(coluna) == 'category' and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype('category')
+    return df
+
+
+BACKENDS = {
+    'pandas': PandasBackend,
+    'duckdb': DuckDBBackend,
+}
+
+
+def get_backend(name=None):
+    """ Backend configurado (CURRY_COMPANY_BACKEND), criado uma vez por processo """
+    name = name or BACKEND
+    with _lock:
+        if name not in _backends:
+            if name not in BACKENDS:
+                raise ValueError(f'backend desconhecido: {name} (opções: {", ".join(BACKENDS)})')
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
+
+
+def _differences(nome, a, b, rtol=1e-6):
+    """ Diferenças entre dois resultados de página (números, tabelas e figuras) """
+    if hasattr(a, 'to_plotly_json'):
+        a, b = a.to_plotly_json()['data'], b.to_plotly_json()['data']
+    if isinstance(a, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(a.reset_index(drop=True), b.reset_index(drop=True), check_dtype=False,
+                                          check_categorical=False, rtol=rtol)
+        except AssertionError as erro:
+            return [f'{nome}: {str(erro).splitlines()[0]}']
+        return []
+    if isinstance(a, dict):
+        if set(a) != set(b):
+            return [f'{nome}: chaves diferentes']
+        return [d for k in a for d in _differences(f'{nome}.{k}', a[k], b[k], rtol)]
+    if isinstance(a, (list, tuple)):
+        if len(a) != len(b):
+            return [f'{nome}: tamanhos diferentes']
+        return [d for i, (x, y) in enumerate(zip(a, b)) for d in _differences(f'{nome}[{i}]', x, y, rtol)]
+    if isinstance(a, (np.ndarray, pd.Series, pd.Index)):
+        a, b = np.asarray(a), np.asarray(b)
+        if a.shape != b.shape:
+            return [f'{nome}: formatos diferentes']
+        if a.dtype.kind in 'fiu' and b.dtype.kind in 'fiu':
+            iguais = np.allclose(a, b, rtol=rtol, equal_nan=True)
+        else:
+            iguais = (a.astype(str) == b.astype(str)).all()
+        return [] if iguais else [f'{nome}: valores diferentes']
+    if isinstance(a, (float, np.floating)) and isinstance(b, (float, np.floating, int, np.integer)):
+        return [] if np.isclose(a, b, rtol=rtol, equal_nan=True) else [f'{nome}: {a} != {b}']
+    return [] if a == b else [f'{nome}: {a!r} != {b!r}']
+
+
+# Conjuntos de filtros usados na verificação de paridade
+PARITY_FILTERS = [
+    {},
+    {'date_cutoff': '2022-03-13', 'traffic': ['Low', 'Medium', 'High', 'Jam']},
+    {'date_start': '2022-03-01', 'date_cutoff': '2022-03-20', 'traffic': ['Jam'], 'weather': ['conditions Sunny', 'conditions Fog']},
+    {'city': ['Urban'], 'traffic': []},
+]
+
+
+def check_parity(filter_sets=PARITY_FILTERS, other='duckdb'):
+    """ Compara os resultados das páginas no pandas e em outro backend
+
+        Output: lista de diferenças (vazia quando os números batem)
+    """
+    from curry_company.views import PAGES, ROW_COLUMNS, SKETCH_NAMES
+
+    pandas_backend, outro = get_backend('pandas'), get_backend(other)
+    diferencas = []
+    for filtros in filter_sets:
+        for page, view in PAGES.items():
+            nome = f'{page} {filtros}'
+            # Um erro em qualquer backend conta como diferença (não é comparado)
+            try:
+                esperado = view(pandas_backend.rows(filtros), pandas_backend.cube(filtros),
+                                pandas_backend.sketches(filtros))
+            except Exception as erro:
+                diferencas.append(f'{nome}: pandas falhou com {erro!r}')
+                esperado = None
+            try:
+                obtido = view(outro.rows(filtros, ROW_COLUMNS.get((page, None))), outro.cube(filtros),
+                              outro.sketches(filtros, SKETCH_NAMES.get((page, None), [])))
+            except Exception as erro:
+                diferencas.append(f'{nome}: {other} falhou com {erro!r}')
+                obtido = None
+            if esperado is not None and obtido is not None:
+                diferencas += _differences(nome, esperado, obtido)
+    diferencas += _differences('date_bounds', pandas_backend.date_bounds(), outro.date_bounds())
+    return diferencas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verifica se um backend produz os mesmos números que o pandas')
+    parser.add_argument('--backend', default='duckdb', help='backend comparado com o pandas')
+    args = parser.parse_args()
+
+    diferencas = check_parity(other=args.backend)
+    for diferenca in diferencas:
+        print(diferenca)
+    print(f'{len(diferencas)} diferenças entre pandas e {args.backend}')
+    sys.exit(1 if diferencas else 0)
+
+
+if __name__ == '__main__':
+    main()
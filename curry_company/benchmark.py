@@ -0,0 +1,195 @@
+# Libraries
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from curry_company import views
+from curry_company.cube import aggregate_plan, build_cube
+from curry_company.data import clean_code, prepare_dataset, read_raw_csv
+from curry_company.parallel import read_parallel
+from curry_company.ranking import rank_delivers
+from curry_company.sketch import build_sketches
+from curry_company.synthetic import generate
+from curry_company.timeseries import rolling_metrics
+
+# Tamanhos padrão (linhas do csv bruto) e pasta dos arquivos gerados
+SCALES = [50_000, 1_000_000, 10_000_000]
+BENCH_DIR = 'dataset/bench'
+REPEAT = 3
+# Acima desta razão em relação ao baseline o caso conta como regressão
+THRESHOLD = 1.25
+
+
+def bench_input(rows, directory=BENCH_DIR, seed=0):
+    """ Csv sintético com `rows` linhas, gerado uma vez e reaproveitado
+
+        O número de entregadores e restaurantes cresce com o tamanho, como
+        num marketplace maior.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'synthetic_{rows}_{seed}.csv')
+    if not os.path.exists(path):
+        restaurantes = max(50, rows // 1000)
+        generate(path, rows, drivers=3 * restaurantes, regions=22, restaurants=restaurantes, seed=seed)
+    return path
+
+
+def cases(path):
+    """ Casos medidos: nome -> (função, argumentos)
+
+        Os argumentos de cada etapa são preparados antes, fora da medição.
+    """
+    bruto = read_raw_csv(path)
+    df1 = prepare_dataset(clean_code(bruto))
+    cube = build_cube(df1)
+    tabelas = aggregate_plan(cube, views.RESTAURANT_SPECS)
+    sketches = build_sketches(df1)
+    return {
+        'read_raw_csv': (read_raw_csv, (path,)),
+        'clean_code': (lambda: clean_code(bruto), ()),
+        'prepare_dataset': (lambda: prepare_dataset(clean_code(bruto)), ()),
+        'read_parallel': (read_parallel, (path,)),
+        'build_cube': (build_cube, (df1,)),
+        'build_sketches': (build_sketches, (df1,)),
+        'filter_rows': (views.filter_rows, (df1, pd.Timestamp('2022-03-13'), ['Low', 'Medium', 'High'], None)),
+        'order_metric': (views.order_metric, (cube,)),
+        'traffic_order_share': (views.traffic_order_share, (cube,)),
+        'traffic_order_city': (views.traffic_order_city, (cube,)),
+        'order_by_week': (views.order_by_week, (cube,)),
+        'order_share_by_week': (views.order_share_by_week, (cube, sketches['drivers'])),
+        'country_map_data': (views.country_map_data, (sketches,)),
+        'rolling_metrics': (rolling_metrics, (cube, sketches['drivers'])),
+        'top_delivers': (rank_delivers, (df1,)),
+        'ratings_by_driver': (views.ratings_by_driver, (df1,)),
+        'aggregate_plan': (aggregate_plan, (cube, views.RESTAURANT_SPECS)),
+        'distance_haversine': (views.distance_haversine, (tabelas['distancia_total'],)),
+        'city_time_chart': (views.city_time_chart, (tabelas['tempo_cidade'],)),
+        'city_distance_chart': (views.city_distance_chart, (tabelas['distancia_cidade'],)),
+        'city_traffic_chart': (views.city_traffic_chart, (tabelas['tempo_cidade_transito'],)),
+        'time_percentiles': (views.time_percentiles, (sketches['time'],)),
+        'empresa_view': (views.empresa_view, (df1, cube, sketches)),
+        'entregadores_view': (views.entregadores_view, (df1, cube, sketches)),
+        'restaurantes_view': (views.restaurantes_view, (df1, cube, sketches)),
+    }
+
+
+def measure(func, args, repeat=REPEAT):
+    """ Tempo de parede de `repeat` execuções e pico de memória de uma
+
+        O pico vem do tracemalloc (alocações de Python e numpy) em uma
+        execução separada, para não pesar nos tempos.
+    """
+    tempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        func(*args)
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds': tempos,
+        'best': min(tempos),
+        'median': statistics.median(tempos),
+        'peak_bytes': pico,
+    }
+
+
+def git_commit():
+    try:
+        saida = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True)
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales=SCALES, directory=BENCH_DIR, repeat=REPEAT, only=None):
+    """ Executa todos os casos em cada tamanho
+
+        Input: tamanhos, pasta dos csv, repetições e (opcional) nomes dos
+               casos a medir
+        Output: dicionario pronto para gravar em JSON
+    """
+    resultados = []
+    for rows in scales:
+        path = bench_input(rows, directory)
+        for nome, (func, args) in cases(path).items():
+            if only and nome not in only:
+                continue
+            medida = measure(func, args, repeat)
+            resultados.append({'case': nome, 'rows': rows, **medida})
+            print(f'{rows:>11} {nome:<22} {medida["best"]:9.4f}s {medida["peak_bytes"] / 1024 ** 2:9.1f}MB', file=sys.stderr)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.platform(),
+        'repeat': repeat,
+        'results': resultados,
+    }
+
+
+def compare(atual, baseline, threshold=THRESHOLD):
+    """ Casos mais lentos que o baseline (razão entre os melhores tempos)
+
+        Output: lista de (caso, linhas, razão) acima do threshold
+    """
+    anteriores = {(r['case'], r['rows']): r['best'] for r in baseline['results']}
+    regressoes = []
+    for r in atual['results']:
+        anterior = anteriores.get((r['case'], r['rows']))
+        if anterior:
+            razao = r['best'] / anterior
+            if razao > threshold:
+                regressoes.append((r['case'], r['rows'], razao))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede o tempo e a memória das etapas das páginas')
+    parser.add_argument('-o', '--output', default='-', help='arquivo JSON de saída (- = stdout)')
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES, help='linhas do csv bruto em cada execução')
+    parser.add_argument('--dir', default=BENCH_DIR, help='pasta dos csv sintéticos')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='execuções cronometradas por caso')
+    parser.add_argument('--case', action='append', help='mede só este caso (pode repetir)')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='razão de tempo considerada regressão')
+    args = parser.parse_args()
+
+    resultado = run(args.scales, args.dir, args.repeat, args.case)
+    texto = json.dumps(resultado, indent=2)
+    if args.output == '-':
+        print(texto)
+    else:
+        with open(args.output, 'w') as arquivo:
+            arquivo.write(texto + '\n')
+
+    if args.baseline:
+        with open(args.baseline) as arquivo:
+            regressoes = compare(resultado, json.load(arquivo), args.threshold)
+        for caso, rows, razao in regressoes:
+            print(f'REGRESSÃO {caso} ({rows} linhas): {razao:.2f}x mais lento', file=sys.stderr)
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
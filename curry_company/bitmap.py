@@ -0,0 +1,125 @@
+# Libraries
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from curry_company.index import date_slice
+
+# Dimensões categóricas com bitmap por valor (filtros da barra lateral)
+BITMAP_DIMENSIONS = ['City', 'Road_traffic_density', 'Weatherconditions', 'Type_of_vehicle', 'Type_of_order', 'Festival']
+
+# Índices por dataframe (dataset, cubo e sketches em cache), por id do objeto. Só
+# uma referência fraca ao dataframe fica guardada: quando ele sai dos caches (arquivo
+# novo, ingestão) o índice é descartado junto, antes que o id possa ser reaproveitado
+MAX_INDEXES = 8
+_indexes = {}
+_lock = threading.Lock()
+
+
+def _value_codes(serie):
+    """ Códigos inteiros e valores distintos de uma coluna (-1 = nulo) """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), list(serie.cat.categories)
+    codes, valores = pd.factorize(serie)
+    return codes, list(valores)
+
+
+def build_bitmaps(df1, dimensions=BITMAP_DIMENSIONS):
+    """ Bitmaps compactados (np.packbits) de cada valor das dimensões
+
+        Cada bitmap tem um bit por linha do dataframe, 1 quando a linha tem
+        aquele valor; ocupa len(df1) / 8 bytes.
+
+        Input: Dataframe (dataset limpo ou cubo) e lista de dimensões
+        Output: dicionario dimensão -> {valor: bitmap uint8}
+    """
+    bitmaps = {}
+    for dimensao in dimensions:
+        if dimensao not in df1.columns:
+            continue
+        codes, valores = _value_codes(df1[dimensao])
+        bitmaps[dimensao] = {valor: np.packbits(codes == i) for i, valor in enumerate(valores)}
+    return bitmaps
+
+
+def bitmap_index(df1):
+    """ Bitmaps de um dataframe, montados uma vez por objeto """
+    with _lock:
+        item = _indexes.get(id(df1))
+        if item is not None and item[0]() is df1:
+            return item[1]
+    bitmaps = build_bitmaps(df1)
+    with _lock:
+        if len(_indexes) >= MAX_INDEXES:
+            _indexes.pop(next(iter(_indexes)))
+        _indexes[id(df1)] = (weakref.ref(df1), bitmaps)
+    weakref.finalize(df1, _discard, id(df1))
+    return bitmaps
+
+
+def _discard(chave):
+    with _lock:
+        _indexes.pop(chave, None)
+
+
+def combine(bitmaps, filters, n_bytes):
+    """ Resolve uma combinação de filtros sobre os bitmaps
+
+        OR entre os valores escolhidos de uma dimensão e AND entre as
+        dimensões. Filtros com None são ignorados; um valor que não existe
+        nos dados não seleciona nenhuma linha.
+
+        Input: bitmaps (build_bitmaps), dicionario dimensão -> valores e
+               tamanho dos bitmaps em bytes
+        Output: bitmap da seleção, ou None quando nenhum filtro se aplica
+    """
+    selecao = None
+    for dimensao, valores in filters.items():
+        if valores is None:
+            continue
+        por_valor = bitmaps[dimensao]
+        dimensao_bits = np.zeros(n_bytes, dtype=np.uint8)
+        for valor in set(valores):
+            if valor in por_valor:
+                dimensao_bits |= por_valor[valor]
+        if selecao is None:
+            selecao = dimensao_bits
+        else:
+            selecao &= dimensao_bits
+    return selecao
+
+
+def select_rows(df1, start=None, end=None, filters=None):
+    """ Recorte do dataframe ordenado pelo período e pelos filtros categóricos
+
+        O período vira um slice por busca binária; os filtros são
+        resolvidos nos bitmaps só no trecho de bytes que cobre esse slice.
+        Sem filtros (ou quando nenhuma linha é descartada) o resultado é o
+        próprio slice, sem cópia; senão as linhas saem com um único take.
+
+        Input: Dataframe ordenado por Order_Date, início, fim e dicionario
+               dimensão -> valores escolhidos (None = sem filtro)
+        Output: Dataframe filtrado
+    """
+    lo, hi = date_slice(df1['Order_Date'], start, end)
+    filters = {dimensao: valores for dimensao, valores in (filters or {}).items() if valores is not None}
+    if not filters or lo == hi:
+        return df1.iloc[lo:hi]
+
+    bitmaps = bitmap_index(df1)
+    byte_lo, byte_hi = lo // 8, (hi + 7) // 8
+    trecho = {dimensao: {valor: bits[byte_lo:byte_hi] for valor, bits in bitmaps[dimensao].items()}
+              for dimensao in filters}
+    selecao = combine(trecho, filters, byte_hi - byte_lo)
+    inicio = lo - byte_lo * 8
+    mascara = np.unpackbits(selecao, count=inicio + hi - lo)[inicio:].view(bool)
+    if mascara.all():
+        return df1.iloc[lo:hi]
+    return df1.iloc[lo + np.flatnonzero(mascara)]
+
+
+def clear_indexes():
+    with _lock:
+        _indexes.clear()
@@ -0,0 +1,158 @@
+# Libraries
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Limites padrão do cache de resultados
+MAX_ENTRIES = 64
+MAX_BYTES = 256 * 1024 ** 2
+
+
+def filter_key(date_cutoff=None, traffic=None, weather=None, date_start=None, city=None):
+    """ Chave normalizada dos filtros da barra lateral
+
+        A ordem em que as opções foram marcadas no multiselect não importa:
+        as listas viram tuplas ordenadas. None (sem filtro) fica como None.
+        Output: (início, data limite, trânsito, clima, cidade)
+    """
+    inicio = None if date_start is None else pd.Timestamp(date_start).isoformat()
+    data = None if date_cutoff is None else pd.Timestamp(date_cutoff).isoformat()
+    traffic = None if traffic is None else tuple(sorted(set(traffic)))
+    weather = None if weather is None else tuple(sorted(set(weather)))
+    city = None if city is None else tuple(sorted(set(city)))
+    return (inicio, data, traffic, weather, city)
+
+
+def estimate_size(valor):
+    """ Estimativa em bytes do que será guardado no cache
+
+        Dataframes e arrays pelo tamanho real dos dados; figuras plotly pelo
+        conteúdo dos traces; dicionários e listas somando os itens.
+    """
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum()) if isinstance(uso, pd.Series) else int(uso)
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if hasattr(valor, 'to_plotly_json'):
+        return estimate_size(valor.to_plotly_json())
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(estimate_size(k) + estimate_size(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(estimate_size(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class _Pending:
+    """ Cálculo em andamento de uma chave: liberado no fim, com o valor se deu certo """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.done = False
+
+
+class ResultCache:
+    """ Cache LRU de resultados limitado por quantidade e por memória
+
+        Quando um dos limites é ultrapassado, as entradas usadas há mais
+        tempo são descartadas. Os contadores (hits, misses, evictions)
+        ficam disponíveis em stats().
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Chaves sendo calculadas agora: chave -> _Pending
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, valor):
+        tamanho = estimate_size(valor)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            # Um resultado maior que o limite inteiro não é guardado
+            if tamanho > self.max_bytes:
+                return valor
+            self._entries[key] = (valor, tamanho)
+            self._bytes += tamanho
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, removido) = self._entries.popitem(last=False)
+                self._bytes -= removido
+                self.evictions += 1
+        return valor
+
+    def get_or_compute(self, key, func):
+        """ Devolve o resultado em cache ou calcula com func() e guarda
+
+            Se outra thread já está calculando a mesma chave (pré-carga em
+            segundo plano), espera por ela em vez de calcular de novo e
+            recebe o valor calculado, mesmo quando ele não cabe no cache.
+            Cada chamada conta um hit ou um miss.
+        """
+        primeira = True
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    if primeira:
+                        self.hits += 1
+                    return self._entries[key][0]
+                if primeira:
+                    self.misses += 1
+                    primeira = False
+                calculo = self._pending.get(key)
+                if calculo is None:
+                    calculo = self._pending[key] = _Pending()
+                    break
+            calculo.event.wait()
+            if calculo.done:
+                return calculo.value
+            # O cálculo da outra thread falhou: esta tenta de novo
+
+        try:
+            calculo.value = func()
+            calculo.done = True
+            return self.put(key, calculo.value)
+        finally:
+            with self._lock:
+                del self._pending[key]
+            calculo.event.set()
+
+    def computing(self, key):
+        """ True se a chave já está em cache ou sendo calculada """
+        with self._lock:
+            return key in self._entries or key in self._pending
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
@@ -0,0 +1,246 @@
+# Libraries
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from curry_company.data import (DATASET_PATH, DISTANCE_COLUMN, concat_cleaned, dataset_key,
+                                load_dataset, resolve_source)
+from curry_company.bitmap import select_rows
+from curry_company.timing import span, timed
+
+CUBE_PATH = 'dataset/cube.arrow'
+# Metadado do cubo persistido com a chave (dataset_key) do arquivo de origem
+SOURCE_METADATA = 'curry_company.source'
+
+# Chaves inteiras de calendário do carregamento (ver add_derived_columns). Dependem só
+# de Order_Date, então não criam células novas; as semanas e janelas móveis leem daqui
+CALENDAR_DIMENSIONS = ['Order_Day', 'Order_Week']
+
+# Dimensões usadas pelos filtros e agregações das páginas
+DIMENSIONS = (['Order_Date'] + CALENDAR_DIMENSIONS +
+              ['City', 'Road_traffic_density', 'Weatherconditions', 'Type_of_vehicle', 'Type_of_order', 'Festival'])
+
+# Medidas: nome curto -> coluna do dataset
+MEASURES = {
+    'time': 'Time_taken(min)',
+    'rating': 'Delivery_person_Ratings',
+    'distance': DISTANCE_COLUMN,
+}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def measure_columns():
+    colunas = ['n']
+    for nome in MEASURES:
+        colunas += [f'{nome}_n', f'{nome}_sum', f'{nome}_sumsq']
+    return colunas
+
+
+@timed
+def build_cube(df1, dimensions=DIMENSIONS):
+    """ Monta o cubo de estatísticas suficientes
+
+        Uma linha por combinação de `dimensions` presente nos dados, com a
+        quantidade de pedidos (n) e, para cada medida, contagem de valores
+        não nulos, soma e soma dos quadrados. Média e desvio padrão de
+        qualquer recorte saem somando essas colunas (ver rollup).
+        As células saem ordenadas pelas dimensões (Order_Date primeiro).
+
+        Input: Dataframe limpo
+        Output: Dataframe do cubo
+    """
+    valores = {'n': np.ones(len(df1), dtype='int64')}
+    for nome, coluna in MEASURES.items():
+        x = df1[coluna].to_numpy(dtype='float64')
+        valores[f'{nome}_n'] = (~np.isnan(x)).astype('int64')
+        valores[f'{nome}_sum'] = x
+        valores[f'{nome}_sumsq'] = x * x
+    frame = pd.DataFrame(valores, index=df1.index)
+    for dimensao in dimensions:
+        frame[dimensao] = df1[dimensao]
+
+    cube = (frame.groupby(dimensions, observed=True, dropna=False)[measure_columns()]
+                 .sum()
+                 .reset_index())
+    return cube
+
+
+@timed
+def filter_cube(cube, date_cutoff=None, traffic=None, weather=None, date_start=None, city=None):
+    """ Aplica os filtros da barra lateral sobre o cubo
+
+        Mesmo critério das páginas: date_start <= Order_Date < date_cutoff e
+        os valores escolhidos de trânsito, clima e cidade (None = sem filtro). O
+        cubo sai do groupby ordenado por Order_Date, então o período é um
+        recorte por busca binária e os filtros usam os bitmaps do cubo.
+    """
+    filters = {'Road_traffic_density': traffic, 'Weatherconditions': weather, 'City': city}
+    return select_rows(cube, date_start, date_cutoff, filters)
+
+
+@timed
+def rollup(cube, by):
+    """ Soma as estatísticas do cubo ao nível das dimensões em `by`
+
+        Input: cubo (filtrado ou não) e lista de dimensões
+        Output: Dataframe com as dimensões e as colunas de medida somadas
+    """
+    return (cube.groupby(by, observed=True)[measure_columns()]
+                .sum()
+                .reset_index())
+
+
+def mean_std(stats, measure):
+    """ Média e desvio padrão amostral (ddof=1) a partir das somas
+
+        Input: resultado do rollup (ou uma linha dele) e nome da medida
+        Output: (média, desvio padrão); NaN quando não há valores suficientes
+    """
+    n = np.asarray(stats[f'{measure}_n'], dtype='float64')
+    soma = np.asarray(stats[f'{measure}_sum'], dtype='float64')
+    soma_q = np.asarray(stats[f'{measure}_sumsq'], dtype='float64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.where(n > 0, soma / n, np.nan)
+        variancia = np.where(n > 1, (soma_q - soma * media) / (n - 1), np.nan)
+    desvio = np.sqrt(np.clip(variancia, 0, None))
+    return media, desvio
+
+
+def _measure_frame(stats, by, measure, mean_name, std_name):
+    media, desvio = mean_std(stats, measure)
+    tabela = stats.loc[:, by].copy()
+    tabela[mean_name] = media
+    tabela[std_name] = desvio
+    return tabela
+
+
+def measure_table(cube, by, measure, mean_name='mean', std_name='std'):
+    """ Tabela por `by` com média e desvio padrão de uma medida """
+    return _measure_frame(rollup(cube, by), by, measure, mean_name, std_name)
+
+
+@timed
+def aggregate_plan(cube, specs):
+    """ Calcula várias tabelas de média/desvio com uma única passada no cubo
+
+        A página declara todas as tabelas de uma vez; o cubo é somado uma
+        vez ao nível da união das dimensões pedidas e cada tabela sai
+        somando esse resultado (poucas linhas) ao seu próprio nível. Uma
+        tabela com `by` vazio é o total (uma linha).
+
+        Input: cubo e dicionario nome -> (by, medida, nome da média, nome do desvio)
+        Output: dicionario nome -> Dataframe, na mesma forma de measure_table
+    """
+    dimensoes = []
+    for by, *_ in specs.values():
+        dimensoes += [d for d in by if d not in dimensoes]
+    base = rollup(cube, dimensoes) if dimensoes else cube[measure_columns()].sum().to_frame().T
+
+    tabelas = {}
+    for nome, (by, measure, mean_name, std_name) in specs.items():
+        if list(by) == dimensoes:
+            stats = base
+        elif by:
+            stats = base.groupby(list(by), observed=True)[measure_columns()].sum().reset_index()
+        else:
+            stats = base[measure_columns()].sum().to_frame().T
+        tabelas[nome] = _measure_frame(stats, list(by), measure, mean_name, std_name)
+    return tabelas
+
+
+def measure_total(cube, measure):
+    """ Média e desvio padrão de uma medida sobre todo o cubo """
+    stats = cube[measure_columns()].sum()
+    media, desvio = mean_std(stats, measure)
+    return float(media), float(desvio)
+
+
+def write_cube(cube, path=CUBE_PATH, source=None):
+    """ Grava o cubo; `source` é o arquivo de dados de onde ele saiu
+
+        A chave do arquivo de origem (caminho, tamanho e mtime) fica nos
+        metadados do cubo, para load_cube só reaproveitar o cubo do mesmo
+        arquivo.
+    """
+    from curry_company.snapshot import write_snapshot
+    metadata = {SOURCE_METADATA: json.dumps(dataset_key(source))} if source else None
+    write_snapshot(cube, path, metadata)
+
+
+def cube_source(path=CUBE_PATH):
+    """ Chave do arquivo de origem gravada no cubo (None se não houver) """
+    from curry_company.snapshot import read_metadata
+    valor = read_metadata(path).get(SOURCE_METADATA)
+    return tuple(json.loads(valor)) if valor else None
+
+
+def read_cube(path=CUBE_PATH):
+    from curry_company.snapshot import read_snapshot
+    return read_snapshot(path)
+
+
+def load_cube(path=DATASET_PATH, snapshot_path=None, cube_path=CUBE_PATH):
+    """ Cubo do dataset atual, uma vez por processo
+
+        Usa o cubo persistido (python -m curry_company.cube) quando ele foi
+        montado a partir do arquivo de dados lido agora, na mesma versão
+        (chave gravada por write_cube) e com todas as DIMENSIONS; senão
+        monta a partir do dataset em cache.
+    """
+    source = resolve_source(path, snapshot_path)
+    key = dataset_key(source)
+    with span('load_cube') as s, _lock:
+        cube = _cache.get(key)
+        if cube is None:
+            if cube_path and os.path.exists(cube_path) and cube_source(cube_path) == key:
+                cube = read_cube(cube_path)
+                # Cubo gravado antes das chaves de calendário: monta de novo
+                if not set(DIMENSIONS) <= set(cube.columns):
+                    cube = None
+            if cube is None:
+                cube = build_cube(load_dataset(path, snapshot_path))
+            _cache.clear()
+            _cache[key] = cube
+        s.rows = len(cube)
+    return cube
+
+
+def store_cube(cube, path=DATASET_PATH, snapshot_path=None):
+    """ Substitui o cubo em cache (usado pela ingestão incremental) """
+    key = dataset_key(resolve_source(path, snapshot_path))
+    with _lock:
+        _cache.clear()
+        _cache[key] = cube
+
+
+def cube_dimensions(cube):
+    return [coluna for coluna in cube.columns if coluna not in measure_columns()]
+
+
+def merge_cubes(cubes):
+    """ Junta cubos somando as células com as mesmas dimensões """
+    cube = concat_cleaned(cubes)
+    return (cube.groupby(cube_dimensions(cube), observed=True, dropna=False)[measure_columns()]
+                .sum()
+                .reset_index())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera o cubo de agregados do dataset limpo')
+    parser.add_argument('csv', nargs='?', default=DATASET_PATH, help='csv bruto de entrada')
+    parser.add_argument('-o', '--output', default=CUBE_PATH, help='arquivo .arrow de saída')
+    args = parser.parse_args()
+
+    cube = build_cube(load_dataset(args.csv))
+    write_cube(cube, args.output, resolve_source(args.csv))
+    print(f'{len(cube)} células gravadas em {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,379 @@
+# Libraries
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+from pandas.api.types import union_categoricals
+
+from curry_company.geo import delivery_distance
+from curry_company.index import CALENDAR_COLUMNS, calendar_keys
+from curry_company.timing import span
+
+DATASET_PATH = 'dataset/train.csv'
+SNAPSHOT_PATH = 'dataset/train.arrow'
+DISTANCE_COLUMN = 'Distance (km)'
+
+# Colunas de texto com espaços sobrando no csv bruto
+STRIP_COLUMNS = ['ID', 'Road_traffic_density', 'Type_of_order', 'Type_of_vehicle', 'City', 'multiple_deliveries', 'Delivery_person_Age', 'Festival']
+# Linhas com 'NaN' (texto) nessas colunas são descartadas
+NAN_FILTER_COLUMNS = ['Road_traffic_density', 'City', 'Delivery_person_Age', 'multiple_deliveries', 'Festival']
+NUMERIC_COLUMNS = ['Delivery_location_latitude', 'Delivery_location_longitude', 'Delivery_person_Age', 'Delivery_person_Ratings', 'multiple_deliveries']
+CATEGORY_COLUMNS = ['ID', 'Delivery_person_ID', 'Time_Orderd', 'Time_Order_picked', 'Weatherconditions',
+                    'Road_traffic_density', 'Type_of_order', 'Type_of_vehicle', 'Festival', 'City']
+# Colunas lidas como category no csv bruto (inclui as que viram número/data depois)
+CATEGORY_SOURCE_COLUMNS = CATEGORY_COLUMNS + ['Delivery_person_Age', 'Delivery_person_Ratings', 'multiple_deliveries',
+                                              'Order_Date', 'Time_taken(min)']
+
+# Schema do dataframe limpo. Lat/Long ficam em float64 para não perder
+# precisão no cálculo de distância e nas medianas do mapa; as avaliações
+# também, para as médias mostradas serem as mesmas do csv.
+SCHEMA = {
+    'ID': 'category',
+    'Delivery_person_ID': 'category',
+    'Delivery_person_Age': 'integer',
+    'Delivery_person_Ratings': 'float64',
+    'Restaurant_latitude': 'float64',
+    'Restaurant_longitude': 'float64',
+    'Delivery_location_latitude': 'float64',
+    'Delivery_location_longitude': 'float64',
+    'Order_Date': 'datetime64[ns]',
+    'Time_Orderd': 'category',
+    'Time_Order_picked': 'category',
+    'Weatherconditions': 'category',
+    'Road_traffic_density': 'category',
+    'Vehicle_condition': 'integer',
+    'Type_of_order': 'category',
+    'Type_of_vehicle': 'category',
+    'multiple_deliveries': 'integer',
+    'Festival': 'category',
+    'City': 'category',
+    'Time_taken(min)': 'integer',
+}
+
+# Colunas derivadas, calculadas uma vez no carregamento (add_derived_columns)
+DERIVED_SCHEMA = {
+    DISTANCE_COLUMN: 'float32',
+    'Order_Day': 'int32',
+    'Order_Week': 'int8',
+    'Order_Month': 'int8',
+    'Order_Weekday': 'int8',
+    'Order_Hour': 'int8',
+}
+
+# Cache do processo: (caminho, tamanho, mtime) -> dataframe limpo
+_cache = {}
+_lock = threading.Lock()
+# Muda a cada dataframe novo colocado no cache (chave dos caches de resultado)
+_version = 0
+
+
+def _as_category(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie
+    return serie.astype('category')
+
+
+def _strip_category(serie, sort=True):
+    """ str.strip aplicado só nas categorias (não em cada linha).
+
+        Categorias que ficam iguais após o strip ('Low' e 'Low ') são unidas.
+        Com sort=True a ordem final é a alfabética, a mesma que o groupby
+        usaria em texto; colunas quase únicas (ID) pulam a ordenação.
+    """
+    serie = _as_category(serie)
+    mapa, novas = pd.factorize(serie.cat.categories.astype(str).str.strip(), sort=sort)
+    codes = serie.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, mapa[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=novas), index=serie.index, name=serie.name)
+
+
+def _map_category(serie, func):
+    """ Aplica func nas categorias e expande o resultado pelos códigos """
+    serie = _as_category(serie)
+    valores = func(pd.Series(serie.cat.categories)).to_numpy()
+    valores = take(valores, serie.cat.codes.to_numpy(), allow_fill=True)
+    return pd.Series(valores, index=serie.index, name=serie.name)
+
+
+def clean_code(df):
+    """ Esta funcao de limpar do dataframe
+
+        Tipos de limpeza:
+        1. Remoção de valores NaN
+        2. Transformacao tipo de dados
+        3. Formatacao da coluna de data
+        4. Remocao dos espacos das variaveis de texto
+        5. Limpeza da coluna de tempo (remocao do texto da variavel numerica)
+
+        Todas as transformações de texto são feitas sobre as categorias de
+        cada coluna (poucos valores distintos) e não linha a linha, e os
+        filtros são combinados em uma única máscara aplicada uma vez.
+        O resultado segue o SCHEMA: textos como category, inteiros e floats
+        reduzidos ao menor tipo que comporta os valores.
+
+        Input: Dataframe bruto (ver read_raw_csv)
+        Output: Dataframe
+    
+    """
+    colunas = {}
+    for coluna in df.columns:
+        if coluna in STRIP_COLUMNS:
+            # Retirada de espaços em branco
+            colunas[coluna] = _strip_category(df[coluna], sort=coluna != 'ID')
+        elif coluna in CATEGORY_COLUMNS:
+            colunas[coluna] = _as_category(df[coluna])
+        else:
+            colunas[coluna] = df[coluna]
+
+    # Removendo linhas com valores inválidos ('NaN' como string) nas colunas
+    mascara = np.ones(len(df), dtype=bool)
+    for coluna in NAN_FILTER_COLUMNS:
+        mascara &= (colunas[coluna] != 'NaN').to_numpy()
+
+    #Converter para numérico e tratar strings inválidas como nulo (NaN)
+    for coluna in NUMERIC_COLUMNS:
+        if not pd.api.types.is_numeric_dtype(colunas[coluna]):
+            colunas[coluna] = _map_category(colunas[coluna], lambda c: pd.to_numeric(c, errors='coerce'))
+
+    #Remover linhas onde Lat/Long são nulas (NaN) após a conversão
+    mascara &= colunas['Delivery_location_latitude'].notna().to_numpy()
+    mascara &= colunas['Delivery_location_longitude'].notna().to_numpy()
+
+    # Convertendo para tipo data
+    colunas['Order_Date'] = _map_category(colunas['Order_Date'], lambda c: pd.to_datetime(c, format="%d-%m-%Y"))
+
+    # Limpando a coluna de time taken
+    colunas['Time_taken(min)'] = _map_category(colunas['Time_taken(min)'], lambda c: c.astype(str).str.split('(min) ', regex=False).str[1].astype(int))
+
+    # Filtro único e tipos compactos
+    df1 = pd.DataFrame(colunas, index=df.index).loc[mascara]
+    for coluna, tipo in SCHEMA.items():
+        if coluna not in df1.columns:
+            continue
+        if tipo == 'category' and coluna != 'ID':
+            df1[coluna] = df1[coluna].cat.remove_unused_categories()
+        elif tipo == 'integer':
+            df1[coluna] = pd.to_numeric(df1[coluna], downcast='integer')
+
+    return df1
+
+
+def _order_hour(serie):
+    """ Hora do pedido a partir de Time_Orderd ('HH:MM:SS'); -1 quando não dá para ler
+
+        Calculada nas categorias e expandida pelos códigos. Valores sem ':'
+        menores que 1 são frações do dia (como aparecem no csv bruto).
+    """
+    def hora(categorias):
+        texto = categorias.astype(str).str.strip()
+        horas = pd.to_numeric(texto.str.split(':', regex=False).str[0], errors='coerce')
+        fracao = pd.to_numeric(texto, errors='coerce')
+        horas = horas.where(texto.str.contains(':', regex=False), np.floor(fracao * 24).where(fracao < 1))
+        return horas.where((horas >= 0) & (horas < 24), -1).astype('int8')
+    return _map_category(serie, hora).fillna(-1).astype('int8')
+
+
+def add_derived_columns(df1):
+    """ Acrescenta as colunas derivadas que ainda não existem no dataframe
+
+        - Distance (km): distância haversine restaurante -> entrega
+        - Order_Day, Order_Week (semana ISO), Order_Month, Order_Weekday:
+          chaves inteiras de calendário de Order_Date (ver calendar_keys);
+          Order_Day e Order_Week seguem para o cubo e o sketch de distintos
+        - Order_Hour: hora de Time_Orderd
+    """
+    if DISTANCE_COLUMN not in df1.columns:
+        df1[DISTANCE_COLUMN] = delivery_distance(df1).astype(DERIVED_SCHEMA[DISTANCE_COLUMN])
+    faltando = [coluna for coluna in CALENDAR_COLUMNS if coluna not in df1.columns]
+    if faltando:
+        chaves = calendar_keys(df1['Order_Date'])
+        for coluna in faltando:
+            df1[coluna] = chaves[CALENDAR_COLUMNS[coluna]].astype(DERIVED_SCHEMA[coluna])
+    if 'Order_Hour' not in df1.columns:
+        df1['Order_Hour'] = _order_hour(df1['Time_Orderd'])
+    return df1
+
+
+def sort_by_date(df1):
+    """ Ordena o dataframe por Order_Date (ordenação estável)
+
+        Com as datas ordenadas, filtros de data viram um recorte contínuo
+        encontrado por busca binária (ver curry_company.index).
+    """
+    if df1['Order_Date'].is_monotonic_increasing:
+        return df1
+    return df1.sort_values('Order_Date', kind='stable')
+
+
+def prepare_dataset(df1):
+    """ Dataframe limpo pronto para as páginas: colunas derivadas e ordem por data """
+    return sort_by_date(add_derived_columns(df1))
+
+
+def read_raw_csv(path=DATASET_PATH, **kwargs):
+    """ Lê o csv bruto já com as colunas de texto como category
+
+        O parser monta o dicionário de cada coluna durante a leitura, o que
+        evita criar um objeto string por linha.
+    """
+    dtype = {coluna: 'category' for coluna in CATEGORY_SOURCE_COLUMNS}
+    return pd.read_csv(path, dtype=dtype, **kwargs)
+
+
+def dataset_key(path=DATASET_PATH):
+    """ Chave de cache do arquivo: caminho absoluto, tamanho e mtime.
+
+        Qualquer alteração no arquivo muda a chave e força uma nova leitura.
+    """
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def snapshot_for(path=DATASET_PATH):
+    """ Snapshot colunar de um csv: mesmo caminho com a extensão .arrow
+
+        dataset/train.csv -> dataset/train.arrow (SNAPSHOT_PATH)
+    """
+    return os.path.splitext(path)[0] + '.arrow'
+
+
+def resolve_source(path=DATASET_PATH, snapshot_path=None):
+    """ Escolhe o arquivo a ser lido: o snapshot colunar, se existir e não
+        for mais antigo que o csv, ou o próprio csv.
+
+        Com snapshot_path=None o snapshot é o do próprio csv (snapshot_for),
+        então outro csv nunca cai no snapshot do train.csv; '' desliga o
+        snapshot.
+    """
+    if snapshot_path is None:
+        snapshot_path = snapshot_for(path)
+    if snapshot_path and os.path.exists(snapshot_path):
+        if not os.path.exists(path) or os.stat(snapshot_path).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            return snapshot_path
+    return path
+
+
+def read_source(path):
+    """ Lê e limpa um arquivo de dados, seja snapshot (.arrow) ou csv bruto,
+        já com as colunas derivadas e ordenado por data.
+    """
+    if path.endswith('.arrow'):
+        from curry_company.snapshot import read_snapshot
+        with span('read_snapshot') as s:
+            df1 = read_snapshot(path)
+            s.rows = len(df1)
+    else:
+        with span('read_csv') as s:
+            df = read_raw_csv(path)
+            s.rows = len(df)
+        with span('clean_code', rows=len(df)):
+            df1 = clean_code(df)
+    with span('prepare_dataset', rows=len(df1)):
+        return prepare_dataset(df1)
+
+
+def load_dataset(path=DATASET_PATH, snapshot_path=None):
+    """ Carrega e limpa o dataset uma única vez por processo
+
+        Usa o snapshot colunar quando ele existe (ver curry_company.snapshot)
+        e cai para o csv caso contrário.
+        O resultado fica em cache enquanto o arquivo não mudar, então os
+        reruns do Streamlit custam apenas os filtros e as agregações.
+        O dataframe retornado é compartilhado entre as páginas e não deve
+        ser alterado no lugar (os filtros das páginas já geram cópias).
+
+        Input: caminho do csv e do snapshot
+        Output: Dataframe limpo
+    """
+    source = resolve_source(path, snapshot_path)
+    key = dataset_key(source)
+    with span('load_dataset') as s, _lock:
+        df1 = _cache.get(key)
+        if df1 is None:
+            df1 = read_source(source)
+            _store(key, df1)
+        s.rows = len(df1)
+    return df1
+
+
+def dataset_loaded(path=DATASET_PATH, snapshot_path=None):
+    """ Se o dataset atual já está no cache do processo (sem carregá-lo) """
+    key = dataset_key(resolve_source(path, snapshot_path))
+    with _lock:
+        return key in _cache
+
+
+def _store(key, df1):
+    global _version
+    # Descarta versões antigas do mesmo arquivo
+    for old_key in [k for k in _cache if k[0] == key[0]]:
+        del _cache[old_key]
+    _cache[key] = df1
+    _version += 1
+
+
+def data_version():
+    """ Versão do dataset em cache no processo
+
+        Muda sempre que um dataframe novo entra no cache (arquivo alterado ou
+        ingestão incremental); serve de chave para os caches de resultado.
+    """
+    return _version
+
+
+def store_dataset(df1, path=DATASET_PATH, snapshot_path=None):
+    """ Substitui o dataframe em cache (usado pela ingestão incremental) """
+    key = dataset_key(resolve_source(path, snapshot_path))
+    with _lock:
+        _store(key, df1)
+
+
+def concat_cleaned(frames):
+    """ Concatena dataframes limpos preservando as colunas category
+
+        pd.concat transforma em object as categorias que não são iguais nos
+        dois lados; aqui as categorias são unidas (em ordem alfabética, menos
+        o ID) e os códigos recalculados.
+    """
+    colunas = {}
+    for coluna in frames[0].columns:
+        partes = [frame[coluna] for frame in frames]
+        if isinstance(partes[0].dtype, pd.CategoricalDtype):
+            colunas[coluna] = union_categoricals([parte.array for parte in partes], sort_categories=coluna != 'ID')
+        else:
+            colunas[coluna] = pd.concat(partes, ignore_index=True).array
+    index = frames[0].index.append([frame.index for frame in frames[1:]])
+    return pd.DataFrame(colunas, index=index)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def load_timing(path=DATASET_PATH, snapshot_path=None):
+    """ Mede o carregamento frio (leitura + limpeza) e o quente (cache).
+
+        Output: dicionario com os tempos em segundos
+    """
+    clear_cache()
+    inicio = time.perf_counter()
+    load_dataset(path, snapshot_path)
+    cold = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    load_dataset(path, snapshot_path)
+    warm = time.perf_counter() - inicio
+    return {'source': resolve_source(path, snapshot_path), 'cold_s': cold, 'warm_s': warm}
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else DATASET_PATH
+    tempos = load_timing(path)
+    print(f"source: {tempos['source']}")
+    print(f"cold load: {tempos['cold_s'] * 1000:.1f} ms")
+    print(f"warm load: {tempos['warm_s'] * 1000:.3f} ms")
@@ -0,0 +1,209 @@
+# Libraries
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from curry_company.cube import filter_cube, load_cube
+from curry_company.data import load_dataset
+from curry_company.sketch import filter_sketches, load_sketches
+from curry_company.views import PAGES, country_map, filter_rows
+
+EXPORT_DIR = 'reports'
+TRAFFIC = ['Low', 'Medium', 'High', 'Jam']
+
+
+def read_filter_sets(path):
+    """ Lista de conjuntos de filtros de um arquivo JSON
+
+        Cada item: {"name": ..., "start": "AAAA-MM-DD", "end": "AAAA-MM-DD",
+        "traffic": [...], "weather": [...], "city": [...]}; campos ausentes
+        ficam sem filtro. O nome (obrigatório e único) vira a pasta do
+        relatório.
+    """
+    with open(path) as arquivo:
+        return json.load(arquivo)
+
+
+def grid_filter_sets(df1, start=None, end=None):
+    """ Um conjunto por cidade e condição de trânsito (relatório semanal) """
+    cidades = sorted(df1['City'].dropna().unique())
+    return [{'name': f'{cidade}_{transito}', 'start': start, 'end': end, 'city': [cidade], 'traffic': [transito]}
+            for cidade in cidades for transito in TRAFFIC]
+
+
+def _filters(filter_set):
+    def data(valor):
+        return None if valor is None else datetime.datetime.fromisoformat(valor)
+    return {
+        'date_start': data(filter_set.get('start')),
+        'date_cutoff': data(filter_set.get('end')),
+        'traffic': filter_set.get('traffic'),
+        'weather': filter_set.get('weather'),
+        'city': filter_set.get('city'),
+    }
+
+
+def _folder_name(nome):
+    return re.sub(r'[^\w.-]+', '_', str(nome)).strip('_')
+
+
+def validate_filter_sets(filter_sets):
+    """ Confere os nomes dos conjuntos antes de exportar
+
+        O nome é a chave do resultado e a pasta do relatório: conjunto sem
+        nome, ou dois conjuntos com a mesma pasta, sobrescreveriam um ao
+        outro sem aviso.
+
+        Input: lista de conjuntos de filtros
+        Output: ValueError com o primeiro problema encontrado
+    """
+    pastas = {}
+    for posicao, filter_set in enumerate(filter_sets):
+        nome = filter_set.get('name')
+        if nome is None or not _folder_name(nome):
+            raise ValueError(f'conjunto {posicao} sem nome válido: {nome!r}')
+        pasta = _folder_name(nome)
+        if pasta in pastas:
+            raise ValueError(f'conjuntos {pastas[pasta]} e {posicao} usam o mesmo nome: {nome!r}')
+        pastas[pasta] = posicao
+
+
+def _metric_value(valor):
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and np.isnan(valor):
+        return None
+    return valor
+
+
+def write_results(resultados, pasta):
+    """ Grava os resultados de uma página: figuras plotly em html e json,
+        tabelas em csv e os números em metrics.json
+
+        Output: lista de arquivos gravados
+    """
+    os.makedirs(pasta, exist_ok=True)
+    arquivos = []
+    metricas = {}
+    for nome, valor in resultados.items():
+        if hasattr(valor, 'to_plotly_json'):
+            arquivos.append(os.path.join(pasta, f'{nome}.html'))
+            valor.write_html(arquivos[-1], include_plotlyjs='cdn')
+            arquivos.append(os.path.join(pasta, f'{nome}.json'))
+            valor.write_json(arquivos[-1])
+        elif isinstance(valor, pd.DataFrame):
+            arquivos.append(os.path.join(pasta, f'{nome}.csv'))
+            valor.to_csv(arquivos[-1], index=False)
+        elif isinstance(valor, dict):
+            continue
+        else:
+            metricas[nome] = _metric_value(valor)
+    if metricas:
+        arquivos.append(os.path.join(pasta, 'metrics.json'))
+        with open(arquivos[-1], 'w') as arquivo:
+            json.dump(metricas, arquivo, ensure_ascii=False, indent=2)
+    return arquivos
+
+
+def export_filter_set(filter_set, output_dir=EXPORT_DIR):
+    """ Todas as figuras, tabelas e o mapa das três páginas para um conjunto de filtros
+
+        Usa o dataset, o cubo e os sketches em cache no processo (herdados do processo
+        principal quando o pool usa fork).
+
+        Output: (nome do conjunto, lista de arquivos gravados)
+    """
+    df1 = load_dataset()
+    cube = load_cube()
+    filtros = _filters(filter_set)
+    linhas = filter_rows(df1, **filtros)
+    celulas = filter_cube(cube, **filtros)
+    sketches = filter_sketches(load_sketches(), **filtros)
+
+    base = os.path.join(output_dir, _folder_name(filter_set.get('name')))
+    arquivos = []
+    for page, view in PAGES.items():
+        resultados = view(linhas, celulas, sketches)
+        arquivos += write_results(resultados, os.path.join(base, page))
+        if page == 'empresa':
+            arquivos.append(os.path.join(base, page, 'map.html'))
+            country_map(resultados['map_data'], resultados['map_grid']).save(arquivos[-1])
+
+    with open(os.path.join(base, 'filters.json'), 'w') as arquivo:
+        json.dump(filter_set, arquivo, ensure_ascii=False, indent=2)
+    return filter_set.get('name'), arquivos
+
+
+def _init_worker():
+    # Com fork o cache já vem preenchido e isto não lê nada; com spawn cada
+    # processo lê o snapshot por memory map (páginas compartilhadas pelo SO)
+    load_dataset()
+    load_cube()
+    load_sketches()
+
+
+def export(filter_sets, output_dir=EXPORT_DIR, workers=None):
+    """ Exporta os relatórios de vários conjuntos de filtros em paralelo
+
+        O dataset limpo e o cubo são carregados uma vez no processo
+        principal antes de criar o pool; com fork os processos filhos
+        compartilham essa memória (copy-on-write) em vez de reler e limpar
+        o csv cada um.
+
+        Input: lista de conjuntos de filtros, pasta de saída e número de
+               processos (None = número de CPUs)
+        Output: dicionario nome do conjunto -> arquivos gravados
+    """
+    validate_filter_sets(filter_sets)
+    load_dataset()
+    load_cube()
+    load_sketches()
+    metodos = multiprocessing.get_all_start_methods()
+    contexto = multiprocessing.get_context('fork' if 'fork' in metodos else None)
+
+    gravados = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto, initializer=_init_worker) as pool:
+        tarefas = [pool.submit(export_filter_set, filter_set, output_dir) for filter_set in filter_sets]
+        for tarefa in as_completed(tarefas):
+            nome, arquivos = tarefa.result()
+            gravados[nome] = arquivos
+    return gravados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporta as figuras das páginas para vários conjuntos de filtros')
+    parser.add_argument('filters', nargs='?', help='arquivo JSON com a lista de conjuntos de filtros')
+    parser.add_argument('--grid', action='store_true', help='um conjunto por cidade e condição de trânsito')
+    parser.add_argument('--start', help='início do período dos conjuntos do --grid (AAAA-MM-DD)')
+    parser.add_argument('--end', help='fim do período (excluso) dos conjuntos do --grid (AAAA-MM-DD)')
+    parser.add_argument('-o', '--output', default=EXPORT_DIR, help='pasta de saída')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='processos em paralelo (padrão: CPUs)')
+    args = parser.parse_args()
+
+    if args.grid:
+        filter_sets = grid_filter_sets(load_dataset(), args.start, args.end)
+    elif args.filters:
+        filter_sets = read_filter_sets(args.filters)
+    else:
+        parser.error('informe o arquivo de filtros ou --grid')
+    try:
+        validate_filter_sets(filter_sets)
+    except ValueError as erro:
+        parser.error(str(erro))
+
+    inicio = time.perf_counter()
+    gravados = export(filter_sets, args.output, args.workers)
+    total = sum(len(arquivos) for arquivos in gravados.values())
+    print(f'{len(gravados)} conjuntos, {total} arquivos em {args.output} ({time.perf_counter() - inicio:.2f}s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+from curry_company.timing import timed
+
+# Mesmo raio médio usado pelo pacote haversine (Unit.KILOMETERS)
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_np(lat1, lon1, lat2, lon2, dtype=np.float64):
+    """ Distância de grande círculo (km) entre arrays de coordenadas
+
+        Versão vetorizada de haversine((lat1, lon1), (lat2, lon2)): calcula
+        todas as linhas de uma vez em numpy, em float64 ou float32.
+
+        Input: arrays de latitude/longitude em graus
+        Output: array de distâncias em km
+    """
+    lat1 = np.radians(np.asarray(lat1, dtype=dtype))
+    lon1 = np.radians(np.asarray(lon1, dtype=dtype))
+    lat2 = np.radians(np.asarray(lat2, dtype=dtype))
+    lon2 = np.radians(np.asarray(lon2, dtype=dtype))
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    d = np.sin(dlat * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon * 0.5) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(d))).astype(dtype, copy=False)
+
+
+def delivery_distance(df1, dtype=np.float64):
+    """ Distância restaurante -> local de entrega de cada pedido (km) """
+    return haversine_np(df1['Restaurant_latitude'], df1['Restaurant_longitude'],
+                        df1['Delivery_location_latitude'], df1['Delivery_location_longitude'],
+                        dtype=dtype)
+
+
+# Grade do mapa: célula mais fina (graus) e limite de células ocupadas
+GRID_CELL_DEG = 0.005
+MAX_CELLS = 2000
+
+
+def _merge_cells(linha, coluna, contagem):
+    """ Soma as contagens de células repetidas (chave única linha/coluna) """
+    if len(linha) == 0:
+        return linha, coluna, contagem
+    base_linha, base_coluna = linha.min(), coluna.min()
+    largura = int(coluna.max() - base_coluna) + 1
+    chave = (linha - base_linha) * largura + (coluna - base_coluna)
+    chaves, inversa = np.unique(chave, return_inverse=True)
+    soma = np.bincount(inversa, weights=contagem, minlength=len(chaves)).astype(np.int64)
+    return chaves // largura + base_linha, chaves % largura + base_coluna, soma
+
+
+def bin_points(lat, lon, cell_deg=GRID_CELL_DEG, max_cells=MAX_CELLS):
+    """ Agrupa coordenadas em uma grade regular de latitude/longitude
+
+        Começa na célula mais fina e dobra o tamanho da célula até que o
+        número de células ocupadas caiba em max_cells, então o resultado
+        tem tamanho limitado pelas células e não pela quantidade de pedidos.
+        Coordenadas nulas são ignoradas. Pontos dos dois lados do equador
+        ou do meridiano de Greenwich ficam em até 4 células mesmo com
+        max_cells menor (a célula para de crescer ao cobrir o globo).
+
+        Input: arrays de latitude e longitude em graus
+        Output: Dataframe com centro de cada célula ocupada (latitude,
+                longitude) e quantidade de pontos (count), e o tamanho da
+                célula usado em graus
+    """
+    if max_cells < 1:
+        raise ValueError(f'max_cells precisa ser pelo menos 1 (recebido {max_cells})')
+    if not cell_deg > 0:
+        raise ValueError(f'cell_deg precisa ser positivo (recebido {cell_deg})')
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    validos = ~(np.isnan(lat) | np.isnan(lon))
+    lat, lon = lat[validos], lon[validos]
+
+    # Células da grade mais fina; os níveis seguintes agregam as próprias
+    # células (linha // 2, coluna // 2), sem voltar aos pontos
+    linha = np.floor(lat / cell_deg).astype(np.int64)
+    coluna = np.floor(lon / cell_deg).astype(np.int64)
+    contagem = np.ones(len(lat), dtype=np.int64)
+    while True:
+        linha, coluna, contagem = _merge_cells(linha, coluna, contagem)
+        if len(contagem) <= max_cells or cell_deg >= 360:
+            break
+        linha, coluna = linha // 2, coluna // 2
+        cell_deg *= 2
+
+    grade = pd.DataFrame({
+        'latitude': (linha + 0.5) * cell_deg,
+        'longitude': (coluna + 0.5) * cell_deg,
+        'count': contagem,
+    })
+    return grade, cell_deg
+
+
+@timed
+def delivery_grid(df1, max_cells=MAX_CELLS):
+    """ Grades dos locais de entrega e dos restaurantes (camadas do mapa) """
+    entregas, _ = bin_points(df1['Delivery_location_latitude'], df1['Delivery_location_longitude'], max_cells=max_cells)
+    restaurantes, _ = bin_points(df1['Restaurant_latitude'], df1['Restaurant_longitude'], max_cells=max_cells)
+    return {'entregas': entregas, 'restaurantes': restaurantes}
@@ -0,0 +1,268 @@
+# Libraries
+import os
+
+import numpy as np
+import pandas as pd
+
+from curry_company.bitmap import select_rows
+from curry_company.data import concat_cleaned
+from curry_company.timing import timed
+
+# Dimensões das células do sketch de entregadores distintos (Order_Day e Order_Week
+# são as chaves de calendário de Order_Date, como no cubo)
+DISTINCT_DIMENSIONS = ['Order_Date', 'Order_Day', 'Order_Week', 'City', 'Road_traffic_density', 'Weatherconditions']
+
+# Precisão p do HyperLogLog: 2**p registradores por célula, erro padrão de
+# cerca de 1.04 / sqrt(2**p) (p=12: 4096 bytes por célula, ~1.6%)
+HLL_PRECISION = int(os.environ.get('CURRY_COMPANY_HLL_PRECISION', '12'))
+
+
+def _bit_length(valores):
+    """ Posição do bit mais alto + 1 de cada uint64 (0 para zero) """
+    valores = valores.copy()
+    tamanho = np.zeros(len(valores), dtype='int64')
+    for deslocamento in (32, 16, 8, 4, 2, 1):
+        maior = valores >= (np.uint64(1) << np.uint64(deslocamento))
+        tamanho += deslocamento * maior
+        valores = np.where(maior, valores >> np.uint64(deslocamento), valores)
+    return tamanho + (valores > 0)
+
+
+def hll_positions(valores, precision):
+    """ Registrador e rank de cada valor distinto (hash de 64 bits estável)
+
+        Output: (índice do registrador, rank = zeros à esquerda + 1)
+    """
+    hashes = pd.util.hash_array(np.asarray(valores, dtype=object))
+    resto = 64 - precision
+    indice = (hashes >> np.uint64(resto)).astype('int64')
+    sufixo = hashes & np.uint64((1 << resto) - 1)
+    rank = resto - _bit_length(sufixo) + 1
+    return indice, rank.astype('uint8')
+
+
+def hll_estimate(registers, precision):
+    """ Estimativa de cardinalidade de cada linha de registradores
+
+        HyperLogLog com a correção de contagem linear para cardinalidades
+        pequenas; com hash de 64 bits não há correção para valores grandes.
+    """
+    m = 2 ** precision
+    alpha = 0.7213 / (1 + 1.079 / m)
+    soma = np.power(2.0, -registers.astype('float64')).sum(axis=1)
+    estimativa = alpha * m * m / soma
+    zeros = (registers == 0).sum(axis=1)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    estimativa = np.where((estimativa <= 2.5 * m) & (zeros > 0), linear, estimativa)
+    return np.rint(estimativa).astype('int64')
+
+
+def _sliding(registers, window, juntar):
+    """ União de cada janela móvel de `window` posições no eixo 1 (O(n))
+
+        Algoritmo de van Herk/Gil-Werman: o eixo é dividido em blocos do
+        tamanho da janela, com acumulados a partir do início e a partir do
+        fim de cada bloco; a janela que termina em i junta o acumulado de
+        i - window + 1 até o fim do seu bloco com o do início do bloco de i
+        até i. No começo do eixo a janela é parcial.
+
+        Input: array (grupos, posições, registradores), janela e ufunc
+               (np.maximum ou np.bitwise_or)
+        Output: array do mesmo formato
+    """
+    grupos, n, m = registers.shape
+    if window <= 1 or n == 0:
+        return registers
+    blocos = -(-n // window)
+    preenchido = np.zeros((grupos, blocos * window, m), dtype=registers.dtype)
+    preenchido[:, :n] = registers
+    preenchido = preenchido.reshape(grupos, blocos, window, m)
+    inicio = juntar.accumulate(preenchido, axis=2).reshape(grupos, blocos * window, m)
+    fim = juntar.accumulate(preenchido[:, :, ::-1], axis=2)[:, :, ::-1].reshape(grupos, blocos * window, m)
+    resultado = inicio[:, :n].copy()
+    if n >= window:
+        resultado[:, window - 1:] = juntar(fim[:, :n - window + 1], inicio[:, window - 1:n])
+    return resultado
+
+
+class DistinctSketch:
+    """ Contagem de valores distintos (entregadores) por célula, somável
+
+        Uma linha de `cells` por combinação de DISTINCT_DIMENSIONS, ordenada
+        por data como o cubo, e a linha correspondente em `registers`:
+        - modo exato: conjunto de bits, um por valor distinto (`values`);
+        - modo HyperLogLog: 2**precision registradores de um byte.
+        Juntar células é OR dos bits ou máximo dos registradores, então a
+        contagem de qualquer recorte ou grão de tempo sai das células, sem
+        passar pelas linhas do dataset.
+    """
+
+    def __init__(self, cells, registers, precision, values=None):
+        self.cells = cells
+        self.registers = registers
+        self.precision = precision
+        self.values = values
+
+    @property
+    def exact(self):
+        return self.values is not None
+
+    def __len__(self):
+        return len(self.cells)
+
+    def filter(self, date_cutoff=None, traffic=None, weather=None, date_start=None, city=None):
+        """ Células dentro dos filtros da barra lateral (ver filter_cube) """
+        filters = {'Road_traffic_density': traffic, 'Weatherconditions': weather, 'City': city}
+        selecao = select_rows(self.cells, date_start, date_cutoff, filters)
+        return DistinctSketch(selecao.reset_index(drop=True), self.registers[selecao.index.to_numpy()],
+                              self.precision, self.values)
+
+    def _combine(self, codes, n_grupos):
+        """ Junta as linhas de registradores por grupo (códigos 0..n-1, -1 = fora) """
+        juntar = np.bitwise_or if self.exact else np.maximum
+        resultado = np.zeros((n_grupos, self.registers.shape[1]), dtype='uint8')
+        validos = codes >= 0
+        juntar.at(resultado, codes[validos], self.registers[validos])
+        return resultado
+
+    def _count(self, registers):
+        if self.exact:
+            return np.unpackbits(registers, axis=1).sum(axis=1).astype('int64')
+        return hll_estimate(registers, self.precision)
+
+    def count(self, by=None):
+        """ Valores distintos no total, por dimensões ou por rótulo de célula
+
+            Input: None (total), lista de dimensões ou array com um rótulo
+                   por célula (ex.: semana de Order_Date)
+            Output: inteiro, Dataframe com as dimensões e 'distinct' ou
+                    Series indexada pelos rótulos
+        """
+        if by is None:
+            return int(self._count(self._combine(np.zeros(len(self.cells), dtype='int64'), 1))[0])
+        if isinstance(by, (list, tuple)):
+            grupos = self.cells.groupby(list(by), observed=True)
+            codes = grupos.ngroup().to_numpy()
+            tabela = grupos.size().reset_index().loc[:, list(by)]
+            tabela['distinct'] = self._count(self._combine(codes, len(tabela)))
+            return tabela
+        codes, rotulos = pd.factorize(np.asarray(by), sort=True)
+        return pd.Series(self._count(self._combine(codes, len(rotulos))), index=rotulos, name='distinct')
+
+    def rolling_count(self, groups, days, n_groups, n_days, window):
+        """ Distintos em janelas móveis de `window` dias, por grupo
+
+            Input: grupo (0..n_groups-1) e dia (0..n_days-1) de cada célula
+                   (-1 = fora), quantidades e tamanho da janela
+            Output: array (n_groups, n_days); a posição d conta os dias
+                    d - window + 1 até d
+        """
+        dentro = (groups >= 0) & (days >= 0) & (days < n_days)
+        codes = np.where(dentro, groups * n_days + days, -1)
+        diarios = self._combine(codes, n_groups * n_days).reshape(n_groups, n_days, -1)
+        janelas = _sliding(diarios, window, np.bitwise_or if self.exact else np.maximum)
+        return self._count(janelas.reshape(n_groups * n_days, -1)).reshape(n_groups, n_days)
+
+    def pairs(self):
+        """ Pares (célula, valor) do modo exato """
+        bits = np.unpackbits(self.registers, axis=1, count=len(self.values))
+        return np.nonzero(bits)
+
+
+def _from_pairs(cells, cell_codes, value_codes, values, precision, exact):
+    n_celulas = len(cells)
+    if exact:
+        registers = np.zeros((n_celulas, (len(values) + 7) // 8), dtype='uint8')
+        bits = (np.uint8(0x80) >> (value_codes & 7).astype('uint8')).astype('uint8')
+        np.bitwise_or.at(registers, (cell_codes, value_codes >> 3), bits)
+        return DistinctSketch(cells, registers, precision, pd.Index(values))
+    indice, rank = hll_positions(values, precision)
+    registers = np.zeros((n_celulas, 2 ** precision), dtype='uint8')
+    np.maximum.at(registers, (cell_codes, indice[value_codes]), rank[value_codes])
+    return DistinctSketch(cells, registers, precision)
+
+
+def _cell_codes(frame, dimensions):
+    """ Código da célula de cada linha e as células em ordem (data primeiro) """
+    codes = frame.groupby(dimensions, observed=True, dropna=False).ngroup().to_numpy()
+    _, primeiras = np.unique(codes, return_index=True)
+    return codes, frame.iloc[primeiras].loc[:, dimensions].reset_index(drop=True)
+
+
+@timed
+def build_distinct(df1, column='Delivery_person_ID', dimensions=DISTINCT_DIMENSIONS, precision=HLL_PRECISION,
+                   exact=None):
+    """ Monta o sketch de valores distintos de `column` por célula
+
+        Com exact=None o modo exato é usado enquanto o conjunto de bits de
+        uma célula (um bit por valor distinto do dataset) não passa do
+        tamanho dos registradores do HyperLogLog (2**precision bytes), ou
+        seja, até 8 * 2**precision valores distintos.
+
+        Input: Dataframe limpo (ou pares distintos de dimensões e coluna),
+               precisão e modo (None = automático)
+        Output: DistinctSketch
+    """
+    frame = df1.loc[df1[column].notna(), dimensions + [column]]
+    value_codes, values = pd.factorize(frame[column])
+    values = np.asarray(values, dtype=object).astype(str)
+    if exact is None:
+        exact = len(values) <= 8 * 2 ** precision
+    cell_codes, cells = _cell_codes(frame, dimensions)
+    # Um par por célula e valor antes de marcar os registradores
+    pares = np.unique(cell_codes.astype('int64') * max(len(values), 1) + value_codes)
+    return _from_pairs(cells, pares // max(len(values), 1), pares % max(len(values), 1), values, precision, exact)
+
+
+def distinct_frame(sketch):
+    """ Células do sketch com os registradores de cada uma, para gravar em Arrow
+
+        Output: (Dataframe com as dimensões e 'registers' em bytes,
+                 dicionario com o necessário para distinct_from_frame)
+    """
+    frame = sketch.cells.copy()
+    frame['registers'] = [linha.tobytes() for linha in sketch.registers]
+    info = {'precision': sketch.precision, 'width': sketch.registers.shape[1],
+            'values': None if sketch.values is None else [str(valor) for valor in sketch.values]}
+    return frame, info
+
+
+def distinct_from_frame(frame, info):
+    """ Refaz o DistinctSketch gravado a partir de distinct_frame """
+    registers = np.frombuffer(b''.join(frame['registers']), dtype='uint8').reshape(len(frame), info['width'])
+    values = None if info['values'] is None else pd.Index(info['values'])
+    return DistinctSketch(frame.drop(columns='registers'), registers.copy(), info['precision'], values)
+
+
+def merge_distinct(sketches):
+    """ Junta sketches de blocos ou lotes diferentes (mesma precisão)
+
+        Células repetidas são unidas. Se algum sketch estiver no modo
+        HyperLogLog, ou se a união dos valores passar do limite do modo
+        exato, o resultado é HyperLogLog.
+    """
+    precision = sketches[0].precision
+    dimensoes = list(sketches[0].cells.columns)
+    cells = concat_cleaned([s.cells for s in sketches])
+    cell_codes, merged = _cell_codes(cells, dimensoes)
+    deslocamentos = np.cumsum([0] + [len(s) for s in sketches])
+
+    valores = pd.Index([])
+    if all(s.exact for s in sketches):
+        valores = pd.Index(np.unique(np.concatenate([np.asarray(s.values, dtype=object) for s in sketches]).astype(str)))
+    if all(s.exact for s in sketches) and len(valores) <= 8 * 2 ** precision:
+        celulas, codigos = [], []
+        for s, deslocamento in zip(sketches, deslocamentos):
+            linhas, colunas = s.pairs()
+            celulas.append(cell_codes[deslocamento + linhas])
+            codigos.append(valores.get_indexer(s.values[colunas]))
+        return _from_pairs(merged, np.concatenate(celulas), np.concatenate(codigos), np.asarray(valores), precision, True)
+
+    registers = np.zeros((len(merged), 2 ** precision), dtype='uint8')
+    for s, deslocamento in zip(sketches, deslocamentos):
+        if s.exact:
+            linhas, colunas = s.pairs()
+            s = _from_pairs(s.cells, linhas, colunas, np.asarray(s.values), precision, False)
+        np.maximum.at(registers, cell_codes[deslocamento:deslocamento + len(s)], s.registers)
+    return DistinctSketch(merged, registers, precision)
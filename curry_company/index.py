@@ -0,0 +1,91 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+# Chaves de calendário: coluna derivada (calculada no carregamento) -> chave de calendar_keys
+CALENDAR_COLUMNS = {
+    'Order_Day': 'day',
+    'Order_Week': 'week',
+    'Order_Month': 'month',
+    'Order_Weekday': 'weekday',
+}
+
+
+def _as_datetime64(data):
+    return pd.Timestamp(data).to_datetime64()
+
+
+def date_slice(dates, start=None, end=None):
+    """ Posições [lo, hi) das linhas com start <= data < end
+
+        `dates` precisa estar em ordem crescente (o dataset e o cubo já são
+        guardados assim); a busca é binária, sem percorrer as linhas.
+
+        Input: Series de datas ordenadas, início e fim (None = sem limite)
+        Output: (lo, hi) para usar em iloc[lo:hi]
+    """
+    valores = dates.to_numpy()
+    lo = 0 if start is None else int(np.searchsorted(valores, _as_datetime64(start), side='left'))
+    hi = len(valores) if end is None else int(np.searchsorted(valores, _as_datetime64(end), side='left'))
+    return lo, max(lo, hi)
+
+
+def date_bounds(df1):
+    """ Menor e maior Order_Date (primeira e última linha do dataframe ordenado) """
+    if len(df1) == 0:
+        return None, None
+    datas = df1['Order_Date']
+    return datas.iloc[0].to_pydatetime(), datas.iloc[-1].to_pydatetime()
+
+
+def calendar_keys(dates, keys=None):
+    """ Chaves inteiras de calendário, sem formatar texto
+
+        Aritmética de inteiros sobre datetime64 (dias desde 1970-01-01, que
+        foi uma quinta-feira); a semana ISO é a do ano da quinta-feira da
+        mesma semana. Num Dataframe (dataset, cubo ou células do sketch de
+        distintos) as chaves que já vêm como coluna (CALENDAR_COLUMNS,
+        calculadas no carregamento) são lidas; só as que faltam saem de
+        Order_Date.
+
+        Input: datas (Series ou array datetime64) ou Dataframe com Order_Date,
+               e as chaves pedidas (None = todas)
+        Output: dicionario day (dias desde 1970-01-01), week (semana ISO),
+                month (1-12) e weekday (0 = segunda)
+    """
+    keys = list(CALENDAR_COLUMNS.values()) if keys is None else list(keys)
+    if isinstance(dates, pd.DataFrame):
+        colunas = {chave: coluna for coluna, chave in CALENDAR_COLUMNS.items()}
+        prontas = {chave: dates[colunas[chave]].to_numpy().astype('int64')
+                   for chave in keys if colunas[chave] in dates.columns}
+        faltando = [chave for chave in keys if chave not in prontas]
+        calculadas = calendar_keys(dates['Order_Date'], faltando) if faltando else {}
+        return {chave: prontas[chave] if chave in prontas else calculadas[chave] for chave in keys}
+    dias = np.asarray(dates, dtype='datetime64[D]').astype('int64')
+    dia_semana = (dias + 3) % 7
+    quinta = dias - dia_semana + 3
+    ano = quinta.astype('datetime64[D]').astype('datetime64[Y]')
+    semana = (quinta - ano.astype('datetime64[D]').astype('int64')) // 7 + 1
+    mes = np.asarray(dates, dtype='datetime64[M]').astype('int64') % 12 + 1
+    chaves = {'day': dias, 'week': semana, 'month': mes, 'weekday': dia_semana}
+    return {chave: chaves[chave] for chave in keys}
+
+
+def floor_dates(dates, days):
+    """ Início do bloco de `days` dias de cada data
+
+        Os blocos contam a partir de 1969-12-29 (uma segunda-feira), então
+        blocos de 7 dias são semanas ISO e blocos de 28 dias juntam quatro
+        delas; com days=1 as datas não mudam.
+
+        Input: datas (Series ou array datetime64) e tamanho do bloco
+        Output: array datetime64[ns]
+    """
+    dias = np.asarray(dates, dtype='datetime64[D]').astype('int64')
+    inicio = (dias + 3) // days * days - 3
+    return inicio.astype('datetime64[D]').astype('datetime64[ns]')
+
+
+def clamp_date(data, data_min, data_max):
+    """ Mantém uma data padrão dentro dos limites do dataset """
+    return min(max(data, data_min), data_max)
@@ -0,0 +1,97 @@
+# Libraries
+import argparse
+
+import pandas as pd
+
+from curry_company.cube import CUBE_PATH, build_cube, load_cube, merge_cubes, store_cube, write_cube
+from curry_company.data import (DATASET_PATH, clean_code, concat_cleaned, load_dataset, prepare_dataset,
+                                read_raw_csv, snapshot_for, sort_by_date, store_dataset)
+from curry_company.sketch import (SKETCHES_PATH, build_sketches, load_sketches, merge_sketches, store_sketches,
+                                  write_sketches)
+
+
+def clean_batch(batch_path):
+    """ Lê e limpa só o lote novo, com as mesmas regras do dataset completo """
+    return prepare_dataset(clean_code(read_raw_csv(batch_path)))
+
+
+def ingested_ids(df1):
+    """ IDs dos pedidos já ingeridos (só os que estão nas linhas) """
+    return pd.Index(df1['ID'].unique().astype(str))
+
+
+def dedupe_batch(batch, ids):
+    """ Remove do lote os pedidos que já estão no dataset
+
+        A comparação é pelo ID, qualquer que seja a Order_Date: pedidos
+        atrasados (com data anterior à última já ingerida) entram, e um lote
+        reenviado não duplica nada. IDs repetidos dentro do próprio lote
+        ficam só com a primeira linha.
+
+        Input: lote limpo e IDs já ingeridos (ingested_ids)
+        Output: (lote sem repetidos, quantidade de linhas descartadas)
+    """
+    novo = ~batch['ID'].duplicated().to_numpy()
+    novo &= ~batch['ID'].astype(str).isin(ids).to_numpy()
+    return batch.loc[novo], int((~novo).sum())
+
+
+def append_batch(batch_path, path=DATASET_PATH, snapshot_path=None, cube_path=CUBE_PATH, persist=True,
+                 sketches_path=SKETCHES_PATH):
+    """ Ingestão incremental de um lote de pedidos
+
+        Limpa apenas o lote, descarta o que já foi ingerido (ver
+        dedupe_batch) e junta o resultado ao dataset em cache e ao cubo.
+        O cubo e os sketches de quantis são atualizados somando as células
+        do lote, sem reprocessar o histórico. O dataset volta a ser
+        ordenado por data (pedidos atrasados ficam no lugar certo). Com
+        persist=True o snapshot, o cubo e os sketches em disco também são
+        regravados, para que os outros processos vejam o lote.
+
+        Input: caminho do csv do lote
+        Output: (linhas adicionadas, linhas descartadas por ID repetido)
+    """
+    if snapshot_path is None:
+        snapshot_path = snapshot_for(path)
+    df1 = load_dataset(path, snapshot_path)
+    cube = load_cube(path, snapshot_path, cube_path)
+    sketches = load_sketches(path, snapshot_path, sketches_path)
+
+    batch, repetidas = dedupe_batch(clean_batch(batch_path), ingested_ids(df1))
+    if len(batch) == 0:
+        return 0, repetidas
+
+    # Índices do lote continuam a numeração do dataset
+    batch.index = batch.index + (df1.index.max() + 1 if len(df1) else 0)
+    df1 = sort_by_date(concat_cleaned([df1, batch]))
+    cube = merge_cubes([cube, build_cube(batch)])
+    sketches = merge_sketches([sketches, build_sketches(batch)])
+
+    if persist:
+        from curry_company.snapshot import write_snapshot
+        write_snapshot(df1, snapshot_path)
+        write_cube(cube, cube_path, snapshot_path)
+        write_sketches(sketches, sketches_path, snapshot_path)
+
+    store_dataset(df1, path, snapshot_path)
+    store_cube(cube, path, snapshot_path)
+    store_sketches(sketches, path, snapshot_path)
+    return len(batch), repetidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Adiciona um lote de pedidos ao dataset limpo e ao cubo')
+    parser.add_argument('batch', help='csv bruto do lote')
+    parser.add_argument('--csv', default=DATASET_PATH, help='csv bruto do histórico')
+    parser.add_argument('--snapshot', default=None, help='snapshot colunar a ser atualizado (padrão: o do --csv)')
+    parser.add_argument('--cube', default=CUBE_PATH, help='cubo a ser atualizado')
+    parser.add_argument('--sketches', default=SKETCHES_PATH, help='diretório dos sketches a serem atualizados')
+    args = parser.parse_args()
+
+    linhas, repetidas = append_batch(args.batch, args.csv, args.snapshot, args.cube, sketches_path=args.sketches)
+    print(f'{linhas} linhas adicionadas a {args.snapshot or snapshot_for(args.csv)}, '
+          f'{repetidas} descartadas por ID já ingerido ou repetido no lote')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# Libraries
+import argparse
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from curry_company.data import (DATASET_PATH, add_derived_columns, clean_code, concat_cleaned, prepare_dataset,
+                                read_raw_csv, snapshot_for)
+
+# Tamanho alvo de cada partição do csv: limita a memória de cada processo
+PARTITION_BYTES = 64 * 1024 ** 2
+
+
+def byte_ranges(path, partitions):
+    """ Divide o csv em faixas de bytes que começam e terminam em fim de linha
+
+        As fronteiras são os múltiplos de tamanho/partitions avançados até o
+        próximo '\\n'. O csv bruto não tem campos entre aspas com quebra de
+        linha, então cada faixa contém só linhas inteiras.
+
+        Input: caminho do csv e número de partições desejado
+        Output: (linha de cabeçalho em bytes, lista de (inicio, fim))
+    """
+    tamanho = os.path.getsize(path)
+    with open(path, 'rb') as arquivo:
+        header = arquivo.readline()
+        inicio = arquivo.tell()
+        fronteiras = [inicio]
+        passo = max(1, (tamanho - inicio) // max(1, partitions))
+        for i in range(1, partitions):
+            arquivo.seek(max(inicio + i * passo - 1, fronteiras[-1]))
+            arquivo.readline()
+            posicao = min(arquivo.tell(), tamanho)
+            if posicao > fronteiras[-1]:
+                fronteiras.append(posicao)
+        if tamanho > fronteiras[-1]:
+            fronteiras.append(tamanho)
+    return header, list(zip(fronteiras[:-1], fronteiras[1:]))
+
+
+def clean_partition(path, header, start, end):
+    """ Lê e limpa uma faixa de bytes do csv com as regras de clean_code()
+
+        Output: (linhas brutas da faixa, dataframe limpo com o índice local)
+    """
+    with open(path, 'rb') as arquivo:
+        arquivo.seek(start)
+        dados = arquivo.read(end - start)
+    bruto = read_raw_csv(io.BytesIO(header + dados))
+    return len(bruto), add_derived_columns(clean_code(bruto))
+
+
+def read_parallel(path=DATASET_PATH, workers=None, partitions=None):
+    """ Lê e limpa o csv bruto em paralelo, por faixas de bytes
+
+        Cada processo do pool lê direto do arquivo a sua faixa (só os
+        limites passam entre processos) e devolve o dataframe limpo. As
+        partes são juntadas na ordem do arquivo, com o índice deslocado
+        pelo número de linhas brutas das faixas anteriores, então o
+        resultado tem os mesmos valores e tipos de
+        prepare_dataset(clean_code(read_raw_csv())), inclusive a ordem das
+        categorias (alfabética em todas as colunas, ver abaixo), e é
+        idêntico para qualquer número de processos ou partições.
+
+        Input: caminho do csv, número de processos (None = CPUs) e de
+               partições (None = uma por PARTITION_BYTES, no mínimo uma por
+               processo)
+        Output: Dataframe limpo, com as colunas derivadas e ordenado por data
+    """
+    workers = workers or os.cpu_count() or 1
+    if partitions is None:
+        partitions = max(workers, -(-os.path.getsize(path) // PARTITION_BYTES))
+    header, faixas = byte_ranges(path, partitions)
+    if not faixas:
+        return prepare_dataset(clean_code(read_raw_csv(path)))
+
+    metodos = multiprocessing.get_all_start_methods()
+    contexto = multiprocessing.get_context('fork' if 'fork' in metodos else None)
+    with ProcessPoolExecutor(max_workers=min(workers, len(faixas)), mp_context=contexto) as pool:
+        tarefas = [pool.submit(clean_partition, path, header, inicio, fim) for inicio, fim in faixas]
+        partes = []
+        deslocamento = 0
+        for tarefa in tarefas:
+            linhas, df1 = tarefa.result()
+            df1.index = df1.index + deslocamento
+            deslocamento += linhas
+            partes.append(df1)
+    df1 = concat_cleaned(partes)
+    # concat_cleaned une as categorias do ID na ordem das partes, o que
+    # dependeria do número de partições. No caminho sequencial a ordem não é
+    # a de aparição: read_csv já devolve as categorias em ordem alfabética e
+    # o strip (só espaços nas pontas) não a altera, então aqui o ID também
+    # fica em ordem alfabética
+    df1['ID'] = df1['ID'].cat.reorder_categories(df1['ID'].cat.categories.sort_values())
+    return prepare_dataset(df1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Limpa o csv bruto em paralelo e grava o snapshot colunar')
+    parser.add_argument('csv', nargs='?', default=DATASET_PATH, help='csv bruto de entrada')
+    parser.add_argument('-o', '--output', default=None, help='arquivo .arrow de saída (padrão: o csv com extensão .arrow)')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='processos em paralelo (padrão: CPUs)')
+    parser.add_argument('--partitions', type=int, default=None, help='faixas de bytes do csv (padrão: uma por 64 MB)')
+    args = parser.parse_args()
+    args.output = args.output or snapshot_for(args.csv)
+
+    from curry_company.snapshot import write_snapshot
+
+    inicio = time.perf_counter()
+    df1 = read_parallel(args.csv, args.workers, args.partitions)
+    write_snapshot(df1, args.output)
+    print(f'{len(df1)} linhas gravadas em {args.output} ({time.perf_counter() - inicio:.2f}s)')
+
+
+if __name__ == '__main__':
+    main()
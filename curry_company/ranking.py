@@ -0,0 +1,82 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+from curry_company.timing import timed
+
+
+def _codes(serie):
+    """ Códigos inteiros em ordem alfabética dos valores e as categorias """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories
+        ordem = np.argsort(categorias.astype(str), kind='stable')
+        posicao = np.empty(len(ordem), dtype='int64')
+        posicao[ordem] = np.arange(len(ordem))
+        codes = serie.cat.codes.to_numpy()
+        return np.where(codes >= 0, posicao[codes], -1), categorias[ordem]
+    return pd.factorize(serie.astype(str), sort=True)
+
+
+def driver_means(df1, metric='Time_taken(min)'):
+    """ Média da métrica por cidade e entregador
+
+        Soma e contagem saem de um np.bincount sobre a chave combinada
+        (cidade, entregador), sem groupby de pandas.
+
+        Output: Dataframe com City, Delivery_person_ID e a média, ordenado
+                por cidade e ID
+    """
+    cidades, nomes_cidades = _codes(df1['City'])
+    entregadores, nomes_entregadores = _codes(df1['Delivery_person_ID'])
+    valores = df1[metric].to_numpy(dtype='float64')
+
+    validos = (cidades >= 0) & (entregadores >= 0) & ~np.isnan(valores)
+    n_entregadores = len(nomes_entregadores)
+    chave = cidades[validos] * n_entregadores + entregadores[validos]
+    tamanho = len(nomes_cidades) * n_entregadores
+    contagem = np.bincount(chave, minlength=tamanho)
+    soma = np.bincount(chave, weights=valores[validos], minlength=tamanho)
+
+    presentes = np.flatnonzero(contagem)
+    return pd.DataFrame({
+        'City': pd.Categorical.from_codes(presentes // n_entregadores, categories=nomes_cidades),
+        'Delivery_person_ID': pd.Categorical.from_codes(presentes % n_entregadores, categories=nomes_entregadores),
+        metric: soma[presentes] / contagem[presentes],
+    })
+
+
+def _top_per_city(cidades, chave_valor, n):
+    """ Posições das n primeiras linhas de cada cidade
+
+        A tabela de médias já vem ordenada por (cidade, entregador); o
+        lexsort estável por (cidade, valor) mantém o ID como desempate.
+    """
+    ordem = np.lexsort((chave_valor, cidades))
+
+    # Posição de cada linha dentro do bloco da sua cidade
+    cidades_ordenadas = cidades[ordem]
+    inicio_bloco = np.r_[0, np.flatnonzero(np.diff(cidades_ordenadas)) + 1]
+    tamanho_bloco = np.diff(np.r_[inicio_bloco, len(ordem)])
+    posicao = np.arange(len(ordem)) - np.repeat(inicio_bloco, tamanho_bloco)
+
+    return ordem[posicao < n]
+
+
+@timed
+def rank_delivers(df1, n=10, metric='Time_taken(min)'):
+    """ Top n entregadores mais rápidos e mais lentos de cada cidade
+
+        Calcula as médias por cidade x entregador uma vez e tira os dois
+        rankings do mesmo resultado, ordenando só a tabela de médias (uma
+        linha por entregador), sem groupby.apply por cidade.
+        Empates seguem a ordem do ID do entregador, como no nsmallest/nlargest.
+
+        Input: Dataframe, n e coluna usada no ranking
+        Output: (rapidos, lentos) com colunas City, Delivery_person_ID e a métrica
+    """
+    df_aux = driver_means(df1, metric)
+    cidades = df_aux['City'].cat.codes.to_numpy()
+    valores = df_aux[metric].to_numpy()
+    rapidos = df_aux.iloc[_top_per_city(cidades, valores, n)].reset_index(drop=True)
+    lentos = df_aux.iloc[_top_per_city(cidades, -valores, n)].reset_index(drop=True)
+    return rapidos, lentos
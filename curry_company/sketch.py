@@ -0,0 +1,337 @@
+# Libraries
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from curry_company.bitmap import select_rows
+from curry_company.cube import SOURCE_METADATA
+from curry_company.data import DATASET_PATH, concat_cleaned, dataset_key, load_dataset, resolve_source
+from curry_company.hll import (DISTINCT_DIMENSIONS, DistinctSketch, build_distinct, distinct_frame, distinct_from_frame,
+                               merge_distinct)
+from curry_company.index import floor_dates
+from curry_company.timing import span, timed
+
+# Dimensões dos filtros da barra lateral (as do mapa) e, no sketch de
+# tempo, também a dos percentis por veículo
+FILTER_DIMENSIONS = ['Order_Date', 'City', 'Road_traffic_density', 'Weatherconditions']
+SKETCH_DIMENSIONS = FILTER_DIMENSIONS + ['Type_of_vehicle']
+
+# Sketches: nome curto -> (coluna do dataset, largura da faixa, dimensões)
+# O tempo é inteiro em minutos, então faixa de 1 é exata. As coordenadas só
+# servem às medianas do mapa (cidade e trânsito, com os filtros da barra
+# lateral): sem o veículo e com faixa de 0.01 grau (cerca de 1,1 km), que
+# basta para posicionar os marcadores.
+SKETCHES = {
+    'time': ('Time_taken(min)', 1.0, SKETCH_DIMENSIONS),
+    'latitude': ('Delivery_location_latitude', 0.01, FILTER_DIMENSIONS),
+    'longitude': ('Delivery_location_longitude', 0.01, FILTER_DIMENSIONS),
+}
+
+# Limite de linhas de cada sketch. Com datas diárias um sketch tem no
+# máximo uma linha por dia, célula e faixa, o que cresce com os dias do
+# histórico; acima do limite as datas são agrupadas em blocos maiores
+# (SKETCH_DATE_GRAINS) e, se nem o maior bloco couber, o sketch não é
+# guardado e os quantis saem das linhas filtradas (ver
+# curry_company.backends).
+SKETCH_MAX_ROWS = int(os.environ.get('CURRY_COMPANY_SKETCH_MAX_ROWS', '2000000'))
+
+# Grãos de data dos sketches, em dias (blocos começando em uma segunda-feira)
+SKETCH_DATE_GRAINS = [1, 7, 28]
+
+QUANTILES = [0.5, 0.9, 0.99]
+
+# Sketches persistidos: um arquivo .arrow por sketch neste diretório
+SKETCHES_PATH = 'dataset/sketches'
+# Metadado de cada arquivo: grão de data (no de distintos, precisão,
+# largura dos registradores e valores do modo exato)
+SKETCH_METADATA = 'curry_company.sketch'
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def value_bins(valores, largura):
+    """ Faixa de cada valor: inteiro mais próximo de valor / largura """
+    return np.floor(np.asarray(valores, dtype='float64') / largura + 0.5)
+
+
+def build_histogram(df1, column, width, dimensions):
+    """ Contagem de pedidos por combinação de `dimensions` e faixa de `column`
+
+        Output: Dataframe com as dimensões, 'bin' e 'count', ordenado pelas
+                dimensões (Order_Date primeiro), com datas diárias
+    """
+    faixas = value_bins(df1[column], width)
+    validos = ~np.isnan(faixas)
+    frame = pd.DataFrame({'bin': faixas[validos].astype('int64')}, index=df1.index[validos])
+    for dimensao in dimensions:
+        frame[dimensao] = df1[dimensao].array[validos]
+    histograma = (frame.groupby(list(dimensions) + ['bin'], observed=True, dropna=False)
+                       .size()
+                       .rename('count')
+                       .reset_index())
+    histograma.attrs['date_grain'] = 1
+    return histograma
+
+
+def sketch_grain(sketch):
+    """ Grão de data do sketch, em dias """
+    return sketch.attrs.get('date_grain', 1)
+
+
+def coarsen_sketch(sketch, grain):
+    """ Agrupa as datas do sketch em blocos de `grain` dias somando as contagens
+
+        Os blocos de SKETCH_DATE_GRAINS se encaixam (7 divide 28), então
+        agrupar um sketch já agrupado dá o mesmo que agrupar o diário.
+    """
+    if grain == sketch_grain(sketch):
+        return sketch
+    blocos = sketch.assign(Order_Date=floor_dates(sketch['Order_Date'], grain))
+    dimensoes = [coluna for coluna in sketch.columns if coluna != 'count']
+    resultado = (blocos.groupby(dimensoes, observed=True, dropna=False)['count']
+                       .sum()
+                       .reset_index())
+    resultado.attrs['date_grain'] = grain
+    return resultado
+
+
+def fit_sketch(sketch, max_rows=None):
+    """ Sketch no menor grão de data que cabe em SKETCH_MAX_ROWS linhas
+
+        Output: Dataframe do sketch ou None quando nem o maior grão cabe
+    """
+    max_rows = SKETCH_MAX_ROWS if max_rows is None else max_rows
+    for grain in SKETCH_DATE_GRAINS:
+        if grain < sketch_grain(sketch):
+            continue
+        sketch = coarsen_sketch(sketch, grain)
+        if len(sketch) <= max_rows:
+            return sketch
+    return None
+
+
+@timed
+def build_sketches(df1, sketches=SKETCHES, max_rows=None):
+    """ Monta os sketches de quantis (histogramas de faixas fixas)
+
+        Para cada medida, uma linha por combinação das suas dimensões e
+        faixa de valor, com a contagem de pedidos. Os sketches são somáveis:
+        sketches de blocos ou lotes diferentes se juntam somando as
+        contagens (merge_sketches), sem guardar as linhas. Como no cubo, as
+        linhas saem ordenadas pelas dimensões (Order_Date primeiro) e
+        aceitam os mesmos filtros (filter_sketches).
+
+        Tamanho: no máximo SKETCH_MAX_ROWS linhas por sketch. Quando as
+        datas diárias passam disso, elas viram blocos de 7 ou 28 dias
+        (fit_sketch) e o filtro de período passa a usar blocos inteiros;
+        sem grão que caiba, o sketch fica None.
+
+        Erro: o quantil devolvido é o centro da faixa onde está o quantil
+        exato (np.quantile com method='inverted_cdf') dos pedidos dos dias
+        (ou blocos) filtrados, então fica a no máximo meia largura dele.
+        Com valores múltiplos da largura (tempo em minutos) é exato. A
+        mediana do pandas (que interpola entre os dois valores do meio)
+        pode diferir também pela distância entre esses dois valores.
+
+        Junto vai o sketch de entregadores distintos ('drivers', ver
+        curry_company.hll), que também se soma por blocos e lotes.
+
+        Input: Dataframe limpo
+        Output: dicionario nome -> Dataframe com as dimensões, 'bin' e
+                'count' ou None (e 'drivers' -> DistinctSketch)
+    """
+    resultado = {}
+    for nome, (coluna, largura, dimensoes) in sketches.items():
+        resultado[nome] = fit_sketch(build_histogram(df1, coluna, largura, dimensoes), max_rows)
+    resultado['drivers'] = build_distinct(df1)
+    return resultado
+
+
+def merge_sketches(sketches, max_rows=None):
+    """ Junta listas de sketches (dicionarios de build_sketches) somando as contagens
+
+        Sketches em grãos de data diferentes são somados no maior deles; se
+        algum dos sketches ficou de fora (None), o resultado também fica.
+    """
+    resultado = {}
+    for nome in sketches[0]:
+        partes = [s[nome] for s in sketches]
+        if isinstance(partes[0], DistinctSketch):
+            resultado[nome] = merge_distinct(partes)
+            continue
+        if any(parte is None for parte in partes):
+            resultado[nome] = None
+            continue
+        grain = max(sketch_grain(parte) for parte in partes)
+        sketch = concat_cleaned([coarsen_sketch(parte, grain) for parte in partes])
+        dimensoes = [coluna for coluna in sketch.columns if coluna != 'count']
+        sketch = (sketch.groupby(dimensoes, observed=True, dropna=False)['count']
+                        .sum()
+                        .reset_index())
+        sketch.attrs['date_grain'] = grain
+        resultado[nome] = fit_sketch(sketch, max_rows)
+    return resultado
+
+
+@timed
+def filter_sketches(sketches, date_cutoff=None, traffic=None, weather=None, date_start=None, city=None, names=None):
+    """ Aplica os filtros da barra lateral sobre os sketches (ver filter_cube)
+
+        Com `names`, só os sketches pedidos; sketches None ficam de fora.
+        Em sketches com grão de data maior que um dia o período é
+        estendido para os blocos inteiros que ele toca.
+    """
+    filters = {'Road_traffic_density': traffic, 'Weatherconditions': weather, 'City': city}
+    resultado = {}
+    for nome, sketch in sketches.items():
+        if names is not None and nome not in names:
+            continue
+        if sketch is None:
+            continue
+        if isinstance(sketch, DistinctSketch):
+            resultado[nome] = sketch.filter(date_cutoff, traffic, weather, date_start, city)
+        else:
+            inicio = date_start
+            if inicio is not None and sketch_grain(sketch) > 1:
+                inicio = floor_dates([pd.Timestamp(inicio)], sketch_grain(sketch))[0]
+            resultado[nome] = select_rows(sketch, inicio, date_cutoff, filters)
+    return resultado
+
+
+def rollup_sketch(sketch, by):
+    """ Soma as contagens do sketch ao nível das dimensões em `by` """
+    return (sketch.groupby(list(by) + ['bin'], observed=True)['count']
+                  .sum()
+                  .reset_index())
+
+
+@timed
+def quantile_table(sketch, by, quantiles=QUANTILES, width=1.0, names=None):
+    """ Quantis de uma medida por `by`, a partir do sketch
+
+        Para cada grupo, o quantil q é a primeira faixa cuja contagem
+        acumulada chega a ceil(q * total) (ver build_sketches para o erro).
+        Um `by` vazio dá os quantis do recorte inteiro (uma linha, NaN se
+        o recorte estiver vazio).
+
+        Input: sketch (filtrado ou não), dimensões, quantis, largura da
+               faixa do sketch e nomes das colunas (padrão p50, p90, ...)
+        Output: Dataframe com as dimensões e uma coluna por quantil
+    """
+    by = list(by)
+    names = names or [f'p{q * 100:g}' for q in quantiles]
+    grupos = rollup_sketch(sketch, by) if by else sketch.groupby('bin')['count'].sum().reset_index()
+    if by:
+        chaves = grupos.groupby(by, observed=True, sort=False).ngroup().to_numpy()
+    else:
+        chaves = np.zeros(len(grupos), dtype='int64')
+    contagens = grupos['count'].to_numpy()
+    faixas = grupos['bin'].to_numpy()
+
+    # Linhas já ordenadas por grupo e faixa: acumulado dentro de cada grupo
+    acumulado = np.cumsum(contagens)
+    n_grupos = chaves.max() + 1 if len(chaves) else 0
+    inicio = np.searchsorted(chaves, np.arange(n_grupos))
+    fim = np.searchsorted(chaves, np.arange(n_grupos), side='right')
+    antes = np.where(inicio > 0, acumulado[inicio - 1], 0)
+    total = acumulado[fim - 1] - antes if n_grupos else np.array([], dtype='int64')
+
+    if not by and n_grupos == 0:
+        return pd.DataFrame({nome: [np.nan] for nome in names})
+    tabela = grupos.loc[inicio, by].reset_index(drop=True) if by else pd.DataFrame(index=range(n_grupos))
+    for q, nome in zip(quantiles, names):
+        alvo = antes + np.maximum(np.ceil(q * total).astype('int64'), 1)
+        posicao = np.searchsorted(acumulado, alvo)
+        tabela[nome] = faixas[posicao] * width
+    return tabela
+
+
+def write_sketches(sketches, path=SKETCHES_PATH, source=None):
+    """ Grava os sketches, um arquivo Arrow por sketch no diretório `path`
+
+        Como no cubo (write_cube), a chave do arquivo de dados de origem vai
+        nos metadados. Sketches None não são gravados (e o arquivo antigo
+        com o mesmo nome é apagado).
+    """
+    from curry_company.snapshot import write_snapshot
+    os.makedirs(path, exist_ok=True)
+    origem = {SOURCE_METADATA: json.dumps(dataset_key(source))} if source else {}
+    for nome, sketch in sketches.items():
+        arquivo = os.path.join(path, f'{nome}.arrow')
+        if sketch is None:
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+            continue
+        if isinstance(sketch, DistinctSketch):
+            frame, info = distinct_frame(sketch)
+        else:
+            frame, info = sketch, {'date_grain': sketch_grain(sketch)}
+        write_snapshot(frame, arquivo, {**origem, SKETCH_METADATA: json.dumps(info)})
+
+
+def read_sketches(path=SKETCHES_PATH, key=None):
+    """ Sketches gravados por write_sketches
+
+        Com `key` (dataset_key), só valem os arquivos gravados a partir
+        desse arquivo de dados; sketch de quantis sem arquivo válido fica
+        None (como os que não couberam em SKETCH_MAX_ROWS).
+
+        Output: dicionario como o de build_sketches, ou None sem o sketch
+                de distintos válido
+    """
+    from curry_company.snapshot import read_metadata, read_snapshot
+
+    def ler(nome):
+        arquivo = os.path.join(path, f'{nome}.arrow')
+        if not os.path.exists(arquivo):
+            return None, None
+        metadata = read_metadata(arquivo)
+        origem = metadata.get(SOURCE_METADATA)
+        if key is not None and (origem is None or tuple(json.loads(origem)) != key):
+            return None, None
+        return read_snapshot(arquivo), json.loads(metadata[SKETCH_METADATA])
+
+    frame, info = ler('drivers')
+    # Sem arquivo, ou gravado antes das chaves de calendário nas células
+    if frame is None or not set(DISTINCT_DIMENSIONS) <= set(frame.columns):
+        return None
+    resultado = {}
+    for nome in SKETCHES:
+        sketch, info_sketch = ler(nome)
+        if sketch is not None:
+            sketch.attrs['date_grain'] = info_sketch['date_grain']
+        resultado[nome] = sketch
+    resultado['drivers'] = distinct_from_frame(frame, info)
+    return resultado
+
+
+def load_sketches(path=DATASET_PATH, snapshot_path=None, sketches_path=SKETCHES_PATH):
+    """ Sketches do dataset atual, uma vez por processo
+
+        Usa os sketches persistidos (python -m curry_company.streaming)
+        quando foram montados a partir do arquivo de dados lido agora;
+        senão monta a partir do dataset em cache.
+    """
+    key = dataset_key(resolve_source(path, snapshot_path))
+    with span('load_sketches'), _lock:
+        sketches = _cache.get(key)
+        if sketches is None:
+            if sketches_path and os.path.isdir(sketches_path):
+                sketches = read_sketches(sketches_path, key)
+            if sketches is None:
+                sketches = build_sketches(load_dataset(path, snapshot_path))
+            _cache.clear()
+            _cache[key] = sketches
+    return sketches
+
+
+def store_sketches(sketches, path=DATASET_PATH, snapshot_path=None):
+    """ Substitui os sketches em cache (usado pela ingestão incremental) """
+    key = dataset_key(resolve_source(path, snapshot_path))
+    with _lock:
+        _cache.clear()
+        _cache[key] = sketches
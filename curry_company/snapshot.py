@@ -0,0 +1,137 @@
+# Libraries
+import argparse
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+
+from curry_company.data import (DATASET_PATH, SCHEMA, SNAPSHOT_PATH, clean_code, prepare_dataset, read_raw_csv,
+                                snapshot_for)
+
+
+def write_snapshot(df1, path=SNAPSHOT_PATH, metadata=None):
+    """ Grava o dataframe limpo em formato Arrow IPC (feather v2)
+
+        O arquivo fica sem compressão para poder ser lido por memory map:
+        várias instâncias do dashboard compartilham as mesmas páginas do
+        page cache do sistema operacional.
+        A escrita é feita em um arquivo temporário e renomeada no final,
+        então um leitor nunca vê um snapshot pela metade.
+        `metadata` (texto -> texto) vai junto no schema (ver read_metadata).
+    """
+    tabela = pa.Table.from_pandas(df1)
+    if metadata:
+        tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), **metadata})
+    tmp_path = path + '.tmp'
+    feather.write_feather(tabela, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+
+def write_snapshot_batches(frames, path=SNAPSHOT_PATH):
+    """ Grava o snapshot bloco a bloco, sem juntar os dataframes na memória
+
+        Todos os blocos precisam ter as mesmas colunas e, nas colunas
+        category, as mesmas categorias (o formato de arquivo Arrow não
+        aceita trocar o dicionário no meio do arquivo). Colunas category
+        quase únicas (ID) podem ser gravadas como texto; read_snapshot
+        refaz o dicionário na leitura.
+
+        Input: iterável de dataframes limpos, na ordem do arquivo
+        Output: quantidade de linhas gravadas
+    """
+    tmp_path = path + '.tmp'
+    writer = None
+    linhas = 0
+    try:
+        for df1 in frames:
+            tabela = pa.Table.from_pandas(df1)
+            if writer is None:
+                schema = tabela.schema
+                writer = ipc.new_file(tmp_path, schema)
+            writer.write_table(tabela.cast(schema))
+            linhas += len(df1)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        os.replace(tmp_path, path)
+    return linhas
+
+
+def read_snapshot(path=SNAPSHOT_PATH):
+    """ Lê o snapshot por memory map e converte para pandas
+
+        Colunas numéricas sem nulos são convertidas sem cópia (split_blocks).
+        Colunas que o SCHEMA define como category e que foram gravadas como
+        texto (ver write_snapshot_batches) são codificadas em dicionário.
+    """
+    return _to_pandas(feather.read_table(path, memory_map=True))
+
+
+def _to_pandas(tabela):
+    for i, campo in enumerate(tabela.schema):
+        if SCHEMA.get(campo.name) == 'category' and not pa.types.is_dictionary(campo.type):
+            tabela = tabela.set_column(i, campo.name, pc.dictionary_encode(tabela.column(i)))
+    return tabela.to_pandas(split_blocks=True)
+
+
+def read_snapshot_batches(path=SNAPSHOT_PATH, rows=None):
+    """ Lê o snapshot em blocos de cerca de `rows` linhas, por memory map
+
+        Os record batches do arquivo são juntados até passar de `rows`
+        (None = um bloco por record batch); só um bloco fica convertido
+        para pandas por vez.
+
+        Output: iterável de dataframes limpos, na ordem do arquivo
+    """
+    # O arquivo fica aberto enquanto houver blocos usando a memória dele
+    leitor = ipc.open_file(pa.memory_map(path))
+    lote, linhas = [], 0
+    for i in range(leitor.num_record_batches):
+        batch = leitor.get_batch(i)
+        lote.append(batch)
+        linhas += batch.num_rows
+        if rows is None or linhas >= rows:
+            yield _to_pandas(pa.Table.from_batches(lote))
+            lote, linhas = [], 0
+    if lote:
+        yield _to_pandas(pa.Table.from_batches(lote))
+
+
+def read_metadata(path):
+    """ Metadados do schema de um arquivo Arrow, sem ler as colunas """
+    with pa.memory_map(path) as arquivo:
+        metadata = ipc.open_file(arquivo).schema.metadata or {}
+    return {chave.decode(): valor.decode() for chave, valor in metadata.items()}
+
+
+def build_snapshot(csv_path=DATASET_PATH, path=None):
+    """ Executa a limpeza uma única vez e grava o snapshot colunar
+
+        Input: caminho do csv bruto e do snapshot (None = o do csv, ver
+               snapshot_for)
+        Output: Dataframe limpo
+    """
+    path = path or snapshot_for(csv_path)
+    df1 = prepare_dataset(clean_code(read_raw_csv(csv_path)))
+    write_snapshot(df1, path)
+    return df1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera o snapshot colunar do dataset limpo')
+    parser.add_argument('csv', nargs='?', default=DATASET_PATH, help='csv bruto de entrada')
+    parser.add_argument('-o', '--output', default=None, help='arquivo .arrow de saída (padrão: o csv com extensão .arrow)')
+    args = parser.parse_args()
+    args.output = args.output or snapshot_for(args.csv)
+
+    inicio = time.perf_counter()
+    df1 = build_snapshot(args.csv, args.output)
+    print(f'{len(df1)} linhas gravadas em {args.output} ({time.perf_counter() - inicio:.2f}s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# Libraries
+import argparse
+import ast
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+
+from curry_company.benchmark import git_commit
+
+# Scripts do Streamlit medidos: página -> arquivo
+PAGES = {
+    'home': 'home.py',
+    'empresa': 'pages/1_visao_empresa.py',
+    'entregadores': 'pages/2_visao_entregadores.py',
+    'restaurantes': 'pages/3_visao_restaurante.py',
+}
+REPEAT = 3
+# Pacotes mais pesados listados por página
+TOP_PACKAGES = 5
+# Acima desta razão em relação ao baseline a página conta como regressão
+THRESHOLD = 1.25
+# Marca na saída de erro a partir da qual vêm os imports da página (antes
+# dela ficam os da inicialização do interpretador)
+MARKER = 'curry_company.startup: imports'
+
+# Executado em um interpretador novo: primeira execução da página e a
+# seguinte (caches do processo já preenchidos), com o AppTest do Streamlit
+RENDER_CODE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[2]))
+tempos = []
+for _ in range(2):
+    inicio = time.perf_counter()
+    app.run()
+    tempos.append((time.perf_counter() - inicio) * 1000)
+erros = [str(e.message) for e in app.exception]
+print(json.dumps({'first_render_ms': tempos[0], 'rerun_ms': tempos[1], 'errors': erros}))
+"""
+
+
+def page_imports(script):
+    """ Código só com os imports do nível de módulo do script """
+    with open(script, encoding='utf-8') as arquivo:
+        arvore = ast.parse(arquivo.read(), script)
+    imports = [no for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom))]
+    return ast.unparse(ast.Module(body=imports, type_ignores=[]))
+
+
+def parse_importtime(saida):
+    """ Lê a saída de `python -X importtime`
+
+        Output: (tempo total dos imports de primeiro nível em ms,
+                 dicionario pacote raiz -> tempo próprio somado em ms)
+    """
+    total = 0
+    pacotes = {}
+    linhas = saida.splitlines()
+    if MARKER in linhas:
+        linhas = linhas[linhas.index(MARKER) + 1:]
+    for linha in linhas:
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|')
+        modulo = nome.strip()
+        if len(nome) - len(nome.lstrip()) == 1:
+            total += int(acumulado)
+        raiz = modulo.split('.')[0]
+        pacotes[raiz] = pacotes.get(raiz, 0) + int(proprio)
+    return total / 1000, {raiz: us / 1000 for raiz, us in pacotes.items()}
+
+
+def import_time(script):
+    """ Tempo dos imports da página em um interpretador novo
+
+        Output: (ms, dicionario pacote raiz -> ms)
+    """
+    codigo = f'import sys; sys.stderr.write({MARKER!r} + "\\n"); sys.stderr.flush()\n' + page_imports(script)
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo],
+                           capture_output=True, text=True, check=True)
+    return parse_importtime(saida.stderr)
+
+
+def render_time(script, timeout=120):
+    """ Primeira execução da página e a seguinte, em um interpretador novo
+
+        A primeira inclui os imports da página (o streamlit já vem carregado
+        pelo AppTest), o carregamento do dataset e a montagem dos caches do
+        processo; a segunda mostra o custo de uma interação.
+    """
+    saida = subprocess.run([sys.executable, '-c', RENDER_CODE, script, str(timeout)],
+                           capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def run(pages=PAGES, repeat=REPEAT):
+    """ Mede cada página `repeat` vezes (mediana) a partir de processos novos
+
+        Input: dicionario página -> script e número de repetições
+        Output: dicionario pronto para gravar em JSON
+    """
+    resultados = []
+    for pagina, script in pages.items():
+        imports, renders, pacotes = [], [], {}
+        for _ in range(repeat):
+            ms, pacotes = import_time(script)
+            imports.append(ms)
+            renders.append(render_time(script))
+        pesados = sorted(pacotes.items(), key=lambda item: -item[1])[:TOP_PACKAGES]
+        medida = {
+            'page': pagina,
+            'script': script,
+            'imports_ms': statistics.median(imports),
+            'first_render_ms': statistics.median(r['first_render_ms'] for r in renders),
+            'rerun_ms': statistics.median(r['rerun_ms'] for r in renders),
+            'errors': renders[-1]['errors'],
+            'top_packages': dict(pesados),
+        }
+        resultados.append(medida)
+        print(f'{pagina:<13} imports {medida["imports_ms"]:8.1f}ms  primeira execução {medida["first_render_ms"]:8.1f}ms'
+              f'  seguinte {medida["rerun_ms"]:8.1f}ms  ' + ', '.join(f'{p} {ms:.0f}' for p, ms in pesados),
+              file=sys.stderr)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'repeat': repeat,
+        'results': resultados,
+    }
+
+
+def compare(atual, baseline, threshold=THRESHOLD):
+    """ Páginas com primeira execução mais lenta que o baseline
+
+        Output: lista de (página, razão) acima do threshold
+    """
+    anteriores = {r['page']: r['first_render_ms'] for r in baseline['results']}
+    regressoes = []
+    for r in atual['results']:
+        anterior = anteriores.get(r['page'])
+        if anterior:
+            razao = r['first_render_ms'] / anterior
+            if razao > threshold:
+                regressoes.append((r['page'], razao))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede os imports e a primeira execução de cada página')
+    parser.add_argument('-o', '--output', default='-', help='arquivo JSON de saída (- = stdout)')
+    parser.add_argument('--page', action='append', choices=list(PAGES), help='mede só esta página (pode repetir)')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='processos novos por página')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='razão de tempo considerada regressão')
+    args = parser.parse_args()
+
+    pages = {p: s for p, s in PAGES.items() if not args.page or p in args.page}
+    resultado = run(pages, args.repeat)
+    texto = json.dumps(resultado, indent=2)
+    if args.output == '-':
+        print(texto)
+    else:
+        with open(args.output, 'w') as arquivo:
+            arquivo.write(texto + '\n')
+
+    if args.baseline:
+        with open(args.baseline) as arquivo:
+            regressoes = compare(resultado, json.load(arquivo), args.threshold)
+        for pagina, razao in regressoes:
+            print(f'REGRESSÃO {pagina}: primeira execução {razao:.2f}x mais lenta', file=sys.stderr)
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Libraries
+import argparse
+
+from curry_company.cube import CUBE_PATH, DIMENSIONS, build_cube, merge_cubes, write_cube
+from curry_company.data import DATASET_PATH, add_derived_columns, clean_code, read_raw_csv, resolve_source
+from curry_company.sketch import SKETCHES_PATH, build_sketches, merge_sketches, write_sketches
+
+# Linhas do csv lidas por vez: define o pico de memória do processamento
+CHUNKSIZE = 200_000
+# Cubos e sketches parciais acumulados antes de serem somados em um só
+MERGE_EVERY = 8
+
+
+def read_chunks(path=DATASET_PATH, chunksize=CHUNKSIZE):
+    """ Blocos limpos de um arquivo de dados, sem carregar o arquivo inteiro
+
+        Do csv bruto, cada bloco passa por clean_code(); do snapshot
+        colunar (.arrow), os blocos já limpos são lidos por memory map.
+
+        Output: iterável de dataframes limpos com as colunas derivadas
+    """
+    if path.endswith('.arrow'):
+        from curry_company.snapshot import read_snapshot_batches
+        chunks = read_snapshot_batches(path, chunksize)
+    else:
+        chunks = (clean_code(chunk) for chunk in read_raw_csv(path, chunksize=chunksize))
+    for df1 in chunks:
+        yield add_derived_columns(df1)
+
+
+def stream_aggregates(path=DATASET_PATH, chunksize=CHUNKSIZE, dimensions=DIMENSIONS, sketches=True):
+    """ Monta o cubo e os sketches lendo o arquivo de dados em blocos
+
+        Cada bloco (read_chunks) é reduzido ao seu cubo e aos seus sketches
+        (build_sketches) e descartado; os parciais são somados a cada
+        MERGE_EVERY blocos. A memória usada depende do chunksize e do
+        tamanho do cubo e dos sketches, não do tamanho do arquivo.
+
+        Input: caminho do csv bruto ou do snapshot, tamanho do bloco,
+               dimensões do cubo e se os sketches também são montados
+        Output: (cubo, sketches) iguais a build_cube e build_sketches do
+                dataset completo (sketches = None com sketches=False)
+    """
+    cubos, parciais = [], []
+    for df1 in read_chunks(path, chunksize):
+        cubos.append(build_cube(df1, dimensions))
+        if sketches:
+            parciais.append(build_sketches(df1))
+        if len(cubos) >= MERGE_EVERY:
+            cubos = [merge_cubes(cubos)]
+            parciais = [merge_sketches(parciais)] if sketches else []
+    return merge_cubes(cubos), merge_sketches(parciais) if sketches else None
+
+
+def stream_cube(path=DATASET_PATH, chunksize=CHUNKSIZE, dimensions=DIMENSIONS):
+    """ Monta só o cubo lendo o arquivo de dados em blocos (ver stream_aggregates)
+
+        Input: caminho do csv bruto ou do snapshot e tamanho do bloco
+        Output: Dataframe do cubo (igual a build_cube do dataset completo)
+    """
+    return stream_aggregates(path, chunksize, dimensions, sketches=False)[0]
+
+
+def build_aggregates(path=DATASET_PATH, cube_path=CUBE_PATH, sketches_path=SKETCHES_PATH, chunksize=CHUNKSIZE):
+    """ Monta em blocos e grava o cubo e os sketches que as páginas procuram
+
+        Lê o mesmo arquivo que as páginas leriam (resolve_source: o snapshot,
+        se estiver atualizado, ou o csv) e grava a chave dele junto, então
+        load_cube e load_sketches usam os agregados gravados e as páginas
+        que só precisam deles não carregam o dataset inteiro.
+
+        Output: (cubo, sketches)
+    """
+    source = resolve_source(path)
+    cube, sketches = stream_aggregates(source, chunksize)
+    write_cube(cube, cube_path, source)
+    write_sketches(sketches, sketches_path, source)
+    return cube, sketches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera o cubo e os sketches lendo os dados em blocos')
+    parser.add_argument('csv', nargs='?', default=DATASET_PATH, help='csv bruto de entrada (ou o snapshot dele, se atualizado)')
+    parser.add_argument('-o', '--output', default=CUBE_PATH, help='arquivo .arrow do cubo')
+    parser.add_argument('--sketches', default=SKETCHES_PATH, help='diretório dos sketches')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE, help='linhas lidas por bloco')
+    args = parser.parse_args()
+
+    cube, sketches = build_aggregates(args.csv, args.output, args.sketches, args.chunksize)
+    print(f'{len(cube)} células gravadas em {args.output}, sketches em {args.sketches}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+# Libraries
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+
+from curry_company.data import NAN_FILTER_COLUMNS, STRIP_COLUMNS, clean_code, prepare_dataset, read_raw_csv
+from curry_company.snapshot import write_snapshot_batches
+
+# Linhas geradas por bloco: define o pico de memória do gerador
+CHUNKSIZE = 200_000
+# Linhas sorteadas com a mesma semente: cada faixa [k * SEED_ROWS, (k + 1) * SEED_ROWS)
+# tem a sua, então o arquivo não depende do tamanho do bloco
+SEED_ROWS = 10_000
+
+# Prefixos de região usados nos IDs de entregador do dataset original
+CITY_CODES = ['INDO', 'BANG', 'COIMB', 'CHEN', 'HYD', 'RANCHI', 'MYS', 'DEH', 'KOC', 'PUNE', 'LUDH',
+              'KNP', 'MUM', 'KOL', 'JAP', 'SUR', 'GOA', 'AURG', 'AGR', 'VAD', 'ALH', 'BHP']
+
+COLUMNS = ['ID', 'Delivery_person_ID', 'Delivery_person_Age', 'Delivery_person_Ratings', 'Restaurant_latitude',
+           'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude', 'Order_Date',
+           'Time_Orderd', 'Time_Order_picked', 'Weatherconditions', 'Road_traffic_density', 'Vehicle_condition',
+           'Type_of_order', 'Type_of_vehicle', 'multiple_deliveries', 'Festival', 'City', 'Time_taken(min)']
+
+# Valores brutos, no mesmo formato do train.csv (espaços sobrando e 'NaN ' como texto)
+WEATHER = ['conditions Sunny', 'conditions Stormy', 'conditions Sandstorms', 'conditions Cloudy',
+           'conditions Fog', 'conditions Windy', 'conditions NaN']
+TRAFFIC = ['Low ', 'Medium ', 'High ', 'Jam ']
+ORDER_TYPES = ['Snack ', 'Meal ', 'Drinks ', 'Buffet ']
+VEHICLES = ['motorcycle ', 'scooter ', 'electric_scooter ', 'bicycle ']
+FESTIVAL = ['No ', 'Yes ']
+CITY_TYPES = ['Urban ', 'Metropolitian ', 'Semi-Urban ']
+RAW_NAN = 'NaN '
+# Fração de 'NaN ' nas colunas que aceitam nulo
+NAN_RATE = 0.02
+
+START_DATE = '2022-02-11'
+DAYS = 55
+# Horário dos pedidos (minutos do dia, de 5 em 5); a coleta sai 5 a 15 min depois
+ORDER_START = 8 * 60
+ORDER_END = 23 * 60
+
+
+def region_codes(regions):
+    """ Prefixos das regiões: os do dataset original e depois CITYnn """
+    return [CITY_CODES[i] if i < len(CITY_CODES) else f'CITY{i}' for i in range(regions)]
+
+
+def build_catalog(drivers, regions, restaurants, seed=0):
+    """ Entidades fixas do dataset sintético
+
+        Cada restaurante pertence a uma região e tem uma coordenada fixa
+        perto do centro dela; cada entregador trabalha para um restaurante
+        (como nos IDs do dataset original, ex. INDORES13DEL02). A região só
+        define o prefixo do ID e as coordenadas: a coluna City continua
+        sendo um dos tipos de CITY_TYPES, como no train.csv.
+
+        Input: quantidade de entregadores, regiões e restaurantes, semente
+        Output: dicionario com os arrays do catálogo
+    """
+    rng = np.random.default_rng([seed, 0])
+    centros = np.column_stack([rng.uniform(10, 30, regions), rng.uniform(72, 88, regions)])
+
+    regiao_restaurante = np.arange(restaurants) % regions
+    numero_restaurante = np.arange(restaurants) // regions + 1
+    coordenadas = centros[regiao_restaurante] + rng.normal(0, 0.05, (restaurants, 2))
+
+    restaurante_entregador = np.arange(drivers) % restaurants
+    numero_entregador = np.arange(drivers) // restaurants + 1
+    codigos = region_codes(regions)
+    ids = np.array([f'{codigos[regiao_restaurante[r]]}RES{numero_restaurante[r]:02d}DEL{d:02d} '
+                    for r, d in zip(restaurante_entregador, numero_entregador)], dtype=object)
+
+    return {
+        'restaurant_lat': coordenadas[:, 0],
+        'restaurant_lon': coordenadas[:, 1],
+        'driver_ids': ids,
+        'driver_restaurant': restaurante_entregador,
+        'driver_age': rng.integers(20, 40, drivers),
+        'driver_rating': rng.uniform(3.5, 5.0, drivers),
+    }
+
+
+def _with_nan(rng, valores, rate=NAN_RATE):
+    valores = np.asarray(valores, dtype=object)
+    valores[rng.random(len(valores)) < rate] = RAW_NAN
+    return valores
+
+
+def _clock(minutos):
+    minutos = np.asarray(minutos) % (24 * 60)
+    return np.array([f'{m // 60:02d}:{m % 60:02d}:00' for m in minutos], dtype=object)
+
+
+# Textos de cada valor possível, indexados pelo número (evita formatar linha a linha)
+CLOCK_TEXT = _clock(np.arange(24 * 60))
+RATING_TEXT = np.array([f'{i / 10:.1f}' for i in range(51)], dtype=object)
+SMALL_INT_TEXT = np.array([str(i) for i in range(100)], dtype=object)
+
+
+def _generate_rows(rng, catalog, start, stop, rows, start_date, days):
+    """ Linhas [start, stop) sorteadas com um único gerador """
+    n = stop - start
+    posicao = np.arange(start, stop)
+    entregador = rng.integers(0, len(catalog['driver_ids']), n)
+    restaurante = catalog['driver_restaurant'][entregador]
+    lat = catalog['restaurant_lat'][restaurante]
+    lon = catalog['restaurant_lon'][restaurante]
+
+    datas = (pd.Timestamp(start_date) + pd.to_timedelta(np.arange(days), unit='D')).strftime('%d-%m-%Y').to_numpy(dtype=object)
+    pedido = rng.integers(ORDER_START // 5, ORDER_END // 5, n) * 5
+    coleta = (pedido + rng.choice([5, 10, 15], n)) % (24 * 60)
+    nota = np.clip(catalog['driver_rating'][entregador] + rng.normal(0, 0.3, n), 1, 5)
+
+    return pd.DataFrame({
+        'ID': [f'0x{i:04x} ' for i in posicao],
+        'Delivery_person_ID': catalog['driver_ids'][entregador],
+        'Delivery_person_Age': _with_nan(rng, SMALL_INT_TEXT[catalog['driver_age'][entregador]] + ' '),
+        'Delivery_person_Ratings': _with_nan(rng, RATING_TEXT[np.rint(nota * 10).astype(int)]),
+        'Restaurant_latitude': lat,
+        'Restaurant_longitude': lon,
+        'Delivery_location_latitude': (lat + rng.uniform(-0.1, 0.1, n)).round(6),
+        'Delivery_location_longitude': (lon + rng.uniform(-0.1, 0.1, n)).round(6),
+        'Order_Date': datas[posicao * days // rows],
+        'Time_Orderd': _with_nan(rng, CLOCK_TEXT[pedido]),
+        'Time_Order_picked': CLOCK_TEXT[coleta],
+        'Weatherconditions': rng.choice(WEATHER, n),
+        'Road_traffic_density': _with_nan(rng, rng.choice(TRAFFIC, n)),
+        'Vehicle_condition': rng.integers(0, 4, n),
+        'Type_of_order': rng.choice(ORDER_TYPES, n),
+        'Type_of_vehicle': rng.choice(VEHICLES, n),
+        'multiple_deliveries': _with_nan(rng, SMALL_INT_TEXT[rng.integers(0, 4, n)]),
+        'Festival': _with_nan(rng, rng.choice(FESTIVAL, n, p=[0.98, 0.02])),
+        'City': _with_nan(rng, rng.choice(CITY_TYPES, n)),
+        'Time_taken(min)': '(min) ' + SMALL_INT_TEXT[rng.integers(10, 55, n)],
+    }, columns=COLUMNS, index=pd.RangeIndex(start, stop))
+
+
+def generate_chunk(catalog, start, stop, rows, seed=0, start_date=START_DATE, days=DAYS):
+    """ Linhas [start, stop) do csv bruto
+
+        As datas crescem com o número da linha, então o arquivo inteiro
+        sai ordenado por Order_Date, como o snapshot espera. Cada faixa de
+        SEED_ROWS linhas é sorteada com a semente (seed, índice da faixa),
+        então a mesma linha sai igual qualquer que seja o bloco pedido.
+
+        Output: Dataframe com as colunas do csv bruto, tudo como texto
+    """
+    partes = []
+    for faixa in range(start // SEED_ROWS, (stop - 1) // SEED_ROWS + 1):
+        inicio = faixa * SEED_ROWS
+        rng = np.random.default_rng([seed, 1, faixa])
+        parte = _generate_rows(rng, catalog, inicio, min(inicio + SEED_ROWS, rows), rows, start_date, days)
+        partes.append(parte.loc[max(start, inicio):stop - 1])
+    return pd.concat(partes) if len(partes) > 1 else partes[0]
+
+
+def generate_chunks(rows, drivers, regions, restaurants, seed=0, chunksize=CHUNKSIZE, days=DAYS):
+    """ Blocos do csv bruto, gerados um de cada vez
+
+        Mesma semente = mesmo arquivo, para qualquer chunksize.
+    """
+    catalog = build_catalog(drivers, regions, restaurants, seed)
+    for start in range(0, rows, chunksize):
+        yield generate_chunk(catalog, start, min(start + chunksize, rows), rows, seed, days=days)
+
+
+def clean_categories(catalog):
+    """ Categorias finais de cada coluna category do dataset limpo
+
+        Mesmo resultado que clean_code daria para o arquivo inteiro: strip
+        nas colunas de STRIP_COLUMNS, sem o 'NaN' das colunas filtradas e
+        em ordem alfabética. Fixar as categorias deixa todos os blocos do
+        snapshot com o mesmo dicionário.
+    """
+    brutos = {
+        'Delivery_person_ID': catalog['driver_ids'],
+        'Time_Orderd': list(CLOCK_TEXT[ORDER_START:ORDER_END:5]) + [RAW_NAN],
+        'Time_Order_picked': CLOCK_TEXT[ORDER_START + 5:ORDER_END + 15:5],
+        'Weatherconditions': WEATHER,
+        'Road_traffic_density': TRAFFIC + [RAW_NAN],
+        'Type_of_order': ORDER_TYPES,
+        'Type_of_vehicle': VEHICLES,
+        'Festival': FESTIVAL + [RAW_NAN],
+        'City': CITY_TYPES + [RAW_NAN],
+    }
+    categorias = {}
+    for coluna, valores in brutos.items():
+        valores = set(valores)
+        if coluna in STRIP_COLUMNS:
+            valores = {v.strip() for v in valores}
+        if coluna in NAN_FILTER_COLUMNS:
+            valores.discard('NaN')
+        categorias[coluna] = sorted(valores)
+    return categorias
+
+
+def clean_chunk(chunk, categorias):
+    """ Passa um bloco bruto pelo mesmo caminho do csv (read_raw_csv + clean_code) """
+    buffer = io.BytesIO()
+    pcsv.write_csv(pa.Table.from_pandas(chunk, preserve_index=False), buffer,
+                   write_options=pcsv.WriteOptions(quoting_style='none'))
+    buffer.seek(0)
+    df1 = prepare_dataset(clean_code(read_raw_csv(buffer)))
+    df1.index = df1.index + chunk.index[0]
+
+    for coluna, valores in categorias.items():
+        novas = set(df1[coluna].cat.categories) - set(valores)
+        if novas:
+            raise ValueError(f'{coluna}: valores fora do catálogo {sorted(novas)[:5]}')
+        df1[coluna] = df1[coluna].cat.set_categories(valores)
+    # ID é único por linha: vai como texto e read_snapshot refaz o dicionário
+    df1['ID'] = df1['ID'].astype(str)
+    return df1
+
+
+def write_csv(chunks, path):
+    """ Grava os blocos brutos em csv com o escritor do pyarrow
+
+        Sem aspas, como no train.csv (os valores não têm vírgulas).
+    """
+    opcoes = pcsv.WriteOptions(include_header=False, quoting_style='none')
+    linhas = 0
+    with open(path, 'wb') as arquivo:
+        arquivo.write((','.join(COLUMNS) + '\n').encode())
+        writer = None
+        for chunk in chunks:
+            tabela = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pcsv.CSVWriter(arquivo, tabela.schema, write_options=opcoes)
+            writer.write_table(tabela)
+            linhas += len(chunk)
+        if writer is not None:
+            writer.close()
+    return linhas
+
+
+def generate(path, rows, drivers, regions, restaurants, seed=0, chunksize=CHUNKSIZE, days=DAYS):
+    """ Gera o dataset sintético em disco, um bloco por vez
+
+        Extensão .csv: csv bruto no formato do train.csv (para testar a
+        limpeza). Extensão .arrow: snapshot já limpo, no mesmo formato do
+        curry_company.snapshot.
+
+        Input: caminho de saída, quantidade de linhas, entregadores,
+               regiões e restaurantes, semente, tamanho do bloco e
+               quantidade de dias a partir de START_DATE
+        Output: quantidade de linhas gravadas
+    """
+    if drivers < restaurants:
+        raise ValueError('É preciso pelo menos um entregador por restaurante')
+    if days < 1:
+        raise ValueError('É preciso pelo menos um dia de pedidos')
+    chunks = generate_chunks(rows, drivers, regions, restaurants, seed, chunksize, days)
+    if path.endswith('.arrow'):
+        categorias = clean_categories(build_catalog(drivers, regions, restaurants, seed))
+        return write_snapshot_batches((clean_chunk(chunk, categorias) for chunk in chunks), path)
+    return write_csv(chunks, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera pedidos sintéticos no formato do train.csv')
+    parser.add_argument('-o', '--output', default='dataset/synthetic.csv', help='arquivo de saída (.csv bruto ou .arrow limpo)')
+    parser.add_argument('-n', '--rows', type=int, default=1_000_000, help='quantidade de pedidos')
+    parser.add_argument('--drivers', type=int, default=1_500, help='quantidade de entregadores')
+    parser.add_argument('--regions', type=int, default=len(CITY_CODES),
+                        help='quantidade de regiões (prefixo do ID do entregador e coordenadas); City sai de CITY_TYPES')
+    parser.add_argument('--restaurants', type=int, default=450, help='quantidade de restaurantes')
+    parser.add_argument('--seed', type=int, default=0, help='semente do gerador')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE, help='linhas geradas por bloco')
+    parser.add_argument('--days', type=int, default=DAYS, help=f'dias de pedidos a partir de {START_DATE}')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    linhas = generate(args.output, args.rows, args.drivers, args.regions, args.restaurants, args.seed,
+                      args.chunksize, args.days)
+    print(f'{linhas} linhas gravadas em {args.output} ({time.perf_counter() - inicio:.2f}s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+from curry_company.cube import rollup
+from curry_company.index import calendar_keys
+from curry_company.timing import timed
+
+# Janelas móveis, em dias
+WINDOWS = [7, 28]
+
+SERIES_COLUMNS = ['Order_Date', 'City', 'window', 'orders', 'avg_time', 'orders_per_driver']
+
+
+def daily_bins(cube, by='City'):
+    """ Matrizes densas (grupo x dia) com as somas do cubo por dia
+
+        Todos os dias entre a primeira e a última data do cubo aparecem,
+        com zero nos dias sem pedidos, para que as janelas sejam de dias de
+        calendário e não de linhas.
+
+        Output: (valores do grupo, primeiro dia em dias desde 1970-01-01,
+                 dicionario coluna de medida -> matriz)
+    """
+    # Order_Day (chave do carregamento) vai junto quando o cubo a tem
+    diario = rollup(cube, [by, 'Order_Date'] + [c for c in ['Order_Day'] if c in cube.columns])
+    grupos, valores = pd.factorize(diario[by], sort=True)
+    dias = calendar_keys(diario, ['day'])['day']
+    primeiro = dias.min() if len(dias) else 0
+    n_dias = dias.max() - primeiro + 1 if len(dias) else 0
+    validos = grupos >= 0
+    matrizes = {}
+    for coluna in ['n', 'time_n', 'time_sum']:
+        matriz = np.zeros((len(valores), n_dias), dtype='float64')
+        matriz[grupos[validos], dias[validos] - primeiro] = diario[coluna].to_numpy()[validos]
+        matrizes[coluna] = matriz
+    return valores, primeiro, matrizes
+
+
+def rolling_sum(matriz, window):
+    """ Soma móvel de `window` dias em cada linha, por somas acumuladas (O(n))
+
+        A posição d soma os dias d - window + 1 até d; no começo da série a
+        janela é parcial.
+    """
+    acumulado = np.zeros((matriz.shape[0], matriz.shape[1] + 1))
+    np.cumsum(matriz, axis=1, out=acumulado[:, 1:])
+    fim = np.arange(1, matriz.shape[1] + 1)
+    return acumulado[:, fim] - acumulado[:, np.maximum(fim - window, 0)]
+
+
+@timed
+def rolling_metrics(cube, drivers, windows=WINDOWS, by='City'):
+    """ Séries diárias móveis por cidade: pedidos, tempo médio e pedidos por entregador
+
+        Pedidos e tempo médio saem de somas acumuladas dos totais diários
+        do cubo; os entregadores distintos de cada janela, da união das
+        células diárias do sketch de distintos (ver DistinctSketch.rolling_count).
+
+        Input: cubo e sketch de entregadores (já filtrados) e janelas em dias
+        Output: Dataframe longo com Order_Date, City, window ('7 dias', ...),
+                orders, avg_time e orders_per_driver
+    """
+    valores, primeiro, matrizes = daily_bins(cube, by)
+    n_grupos, n_dias = matrizes['n'].shape
+    if n_grupos == 0 or n_dias == 0:
+        return pd.DataFrame(columns=SERIES_COLUMNS)
+
+    celulas = drivers.cells
+    grupos_celula = pd.Index(valores).get_indexer(celulas[by])
+    dias_celula = calendar_keys(celulas, ['day'])['day'] - primeiro
+
+    datas = (np.arange(n_dias) + primeiro).astype('datetime64[D]').astype('datetime64[ns]')
+    partes = []
+    for janela in windows:
+        pedidos = rolling_sum(matrizes['n'], janela)
+        tempo_n = rolling_sum(matrizes['time_n'], janela)
+        tempo_soma = rolling_sum(matrizes['time_sum'], janela)
+        entregadores = drivers.rolling_count(grupos_celula, dias_celula, n_grupos, n_dias, janela)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            tempo_medio = np.where(tempo_n > 0, tempo_soma / tempo_n, np.nan)
+            por_entregador = np.where(entregadores > 0, pedidos / entregadores, np.nan)
+        partes.append(pd.DataFrame({
+            'Order_Date': np.tile(datas, n_grupos),
+            by: np.repeat(np.asarray(valores), n_dias),
+            'window': f'{janela} dias',
+            'orders': pedidos.ravel().astype('int64'),
+            'avg_time': tempo_medio.ravel(),
+            'orders_per_driver': por_entregador.ravel(),
+        }))
+    return pd.concat(partes, ignore_index=True)
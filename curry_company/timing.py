@@ -0,0 +1,152 @@
+# Libraries
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+
+# Liga a medição (CURRY_COMPANY_TIMING=1) e, opcionalmente, o log JSON-lines
+ENABLED = os.environ.get('CURRY_COMPANY_TIMING', '') not in ('', '0')
+LOG_PATH = os.environ.get('CURRY_COMPANY_TIMING_LOG') or None
+
+# Etapas da execução atual; cada sessão do Streamlit roda em uma thread
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+class _Span:
+    """ Uma etapa medida: nome, duração em ms, linhas e nível de aninhamento """
+
+    def __init__(self, nome, rows=None):
+        self.nome = nome
+        self.rows = rows
+        self.ms = None
+
+    def __enter__(self):
+        spans = _spans()
+        self.depth = getattr(_local, 'depth', 0)
+        _local.depth = self.depth + 1
+        spans.append(self)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.ms = (time.perf_counter() - self.inicio) * 1000
+        _local.depth = self.depth
+        return False
+
+    def as_dict(self):
+        return {'stage': self.nome, 'ms': self.ms, 'rows': self.rows, 'depth': self.depth}
+
+
+class _NullSpan:
+    """ Etapa que não mede nada (medição desligada) """
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _spans():
+    spans = getattr(_local, 'spans', None)
+    if spans is None:
+        spans = _local.spans = []
+    return spans
+
+
+def span(nome, rows=None):
+    """ Mede um trecho com `with span('etapa') as s:` (s.rows = linhas)
+
+        Com a medição desligada devolve um objeto vazio compartilhado.
+    """
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(nome, rows)
+
+
+def timed(func):
+    """ Decorador: mede a função como uma etapa com o nome dela
+
+        As linhas registradas são as do primeiro argumento (dataframe ou cubo).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            return func(*args, **kwargs)
+        rows = len(args[0]) if args and hasattr(args[0], '__len__') else None
+        with _Span(func.__name__, rows):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def begin_run(page):
+    """ Começa a medição de uma execução do script da página """
+    _local.spans = []
+    _local.depth = 0
+    _local.page = page
+    _local.stage = None
+    _local.inicio = time.perf_counter()
+
+
+def stage(nome):
+    """ Etapa sequencial do script: fecha a anterior e abre `nome` """
+    if not ENABLED:
+        return
+    _end_stage()
+    _local.stage = _Span(nome).__enter__()
+
+
+def _end_stage():
+    atual = getattr(_local, 'stage', None)
+    if atual is not None:
+        atual.__exit__(None, None, None)
+        _local.stage = None
+
+
+def end_run():
+    """ Fecha a execução e devolve as etapas (grava no log se configurado)
+
+        Output: dicionario com página, etapas e tempo total em ms
+    """
+    _end_stage()
+    execucao = {
+        'page': getattr(_local, 'page', None),
+        'timestamp': datetime.datetime.now().isoformat(timespec='milliseconds'),
+        'total_ms': (time.perf_counter() - getattr(_local, 'inicio', time.perf_counter())) * 1000,
+        'spans': [s.as_dict() for s in _spans() if s.ms is not None],
+    }
+    if LOG_PATH:
+        with _log_lock, open(LOG_PATH, 'a') as arquivo:
+            arquivo.write(json.dumps(execucao, default=str) + '\n')
+    return execucao
+
+
+def timing_panel(cache_stats=None):
+    """ Painel recolhível na barra lateral com as etapas desta execução
+
+        Chamado no fim do script da página; não faz nada com a medição
+        desligada.
+    """
+    if not ENABLED:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    execucao = end_run()
+    with st.sidebar.expander('Tempos desta execução'):
+        tabela = pd.DataFrame(execucao['spans'], columns=['stage', 'ms', 'rows', 'depth'])
+        tabela['stage'] = ['  ' * d + nome for nome, d in zip(tabela['stage'], tabela['depth'])]
+        st.dataframe(tabela.drop(columns='depth').round({'ms': 1}), hide_index=True)
+        st.caption(f"Total: {execucao['total_ms']:.1f} ms")
+        if cache_stats is not None:
+            st.caption('Cache de resultados: ' + ', '.join(f'{k}={v}' for k, v in cache_stats.items()))
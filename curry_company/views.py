@@ -0,0 +1,514 @@
+# Libraries
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from curry_company.backends import get_backend
+from curry_company.bitmap import select_rows
+from curry_company.cache import ResultCache, filter_key
+from curry_company.cube import aggregate_plan, measure_table, rollup
+from curry_company.geo import delivery_grid
+from curry_company.index import calendar_keys
+from curry_company.ranking import rank_delivers
+from curry_company.sketch import SKETCHES, quantile_table, rollup_sketch
+from curry_company.timeseries import rolling_metrics
+from curry_company.timing import begin_run, span, timed
+
+# Resultados de cada página por combinação de filtros (compartilhado pelas sessões)
+results_cache = ResultCache()
+
+
+@timed
+def filter_rows(df1, date_cutoff=None, traffic=None, weather=None, date_start=None, city=None):
+    """ Filtros da barra lateral sobre as linhas (período, trânsito, clima, cidade)
+
+        O período é um recorte do dataset ordenado por data (sem cópia); os
+        filtros categóricos são resolvidos nos bitmaps das dimensões (ver
+        curry_company.bitmap).
+    """
+    filters = {'Road_traffic_density': traffic, 'Weatherconditions': weather, 'City': city}
+    return select_rows(df1, date_start, date_cutoff, filters)
+
+
+def dataset_date_bounds():
+    """ Limites do slider de período: menor data e o dia seguinte à maior
+
+        O fim do período é exclusivo (Order_Date < date_cutoff), então o
+        limite superior do slider é um dia depois da última data para que
+        o último dia do dataset possa ser selecionado.
+    """
+    data_min, data_max = get_backend().date_bounds()
+    if data_max is None:
+        return data_min, data_max
+    return data_min, data_max + datetime.timedelta(days=1)
+
+
+#===================================================================
+# Visão Empresa
+#===================================================================
+
+def orders_by_day(cube):
+    """ Quantidade de pedidos por dia (coluna ID) """
+    return rollup(cube, ['Order_Date']).rename(columns={'n': 'ID'}).loc[:, ['Order_Date', 'ID']]
+
+
+@timed
+def order_metric(cube):
+    import plotly.express as px
+
+    df_aux = orders_by_day(cube)
+    fig = px.bar(df_aux, x='Order_Date', y='ID')
+
+    return fig
+
+
+def traffic_share(cube):
+    """ Pedidos e percentual de pedidos por tipo de trânsito """
+    df_aux = rollup(cube, ['Road_traffic_density']).rename(columns={'n': 'ID'}).loc[:, ['Road_traffic_density', 'ID']]
+    df_aux['perc_ID'] = 100 * ( df_aux['ID'] / df_aux['ID'].sum() )
+    return df_aux
+
+
+@timed
+def traffic_order_share(cube):
+    import plotly.express as px
+
+    df_aux = traffic_share(cube)
+    fig = px.pie( df_aux, values='perc_ID', names='Road_traffic_density')
+
+    return fig
+
+
+def orders_by_city_traffic(cube):
+    """ Pedidos por cidade e tipo de trânsito """
+    return rollup(cube, ['City' , 'Road_traffic_density']).rename(columns={'n': 'ID'}).loc[:, ['City', 'Road_traffic_density', 'ID']]
+
+
+@timed
+def traffic_order_city(cube):
+    import plotly.express as px
+
+    df_aux = orders_by_city_traffic(cube)
+    fig = px.scatter(df_aux, x='Road_traffic_density', y='City', size='ID')
+
+    return fig
+
+
+def orders_by_week(cube):
+    """ Pedidos por semana ISO do ano (chave inteira, ver calendar_keys) """
+    semanas = pd.Series(cube['n'].to_numpy(), index=calendar_keys(cube, ['week'])['week'])
+    return semanas.groupby(level=0).sum().rename_axis('Week_of_year').reset_index(name='ID')
+
+
+@timed
+def order_by_week(cube):
+    import plotly.express as px
+
+    df_aux = orders_by_week(cube)
+    fig = px.line(df_aux , x='Week_of_year', y='ID')
+    return fig
+
+
+def orders_per_driver_week(cube, drivers):
+    """ Pedidos, entregadores únicos e pedidos por entregador em cada semana
+
+        Os entregadores únicos de cada semana saem juntando as células do
+        sketch de distintos (ver curry_company.hll), sem passar pelas linhas.
+    """
+    pedidos = orders_by_week(cube)
+    semanas = calendar_keys(drivers.cells, ['week'])['week']
+    entregadores = drivers.count(semanas).rename('Delivery_person_ID').rename_axis('Week_of_year').reset_index()
+    df_aux = pd.merge(pedidos, entregadores, how='inner')
+    df_aux['order_by_delivery'] = df_aux['ID'] /df_aux['Delivery_person_ID']
+    return df_aux
+
+
+@timed
+def order_share_by_week(cube, drivers):
+    import plotly.express as px
+
+    df_aux = orders_per_driver_week(cube, drivers)
+    fig = px.line(df_aux, x="Week_of_year", y="order_by_delivery",)
+
+    return fig
+
+
+@timed
+def country_map_data(sketches):
+    """ Mediana da localização de entrega por cidade e trânsito (marcadores do mapa)
+
+        Calculada nos sketches de latitude e longitude (erro de até meia
+        faixa, ver curry_company.sketch).
+    """
+    columns_groupby = ['City', 'Road_traffic_density']
+    medianas = []
+    for nome, coluna in [('latitude', 'Delivery_location_latitude'), ('longitude', 'Delivery_location_longitude')]:
+        medianas.append(quantile_table(sketches[nome], columns_groupby, [0.5], SKETCHES[nome][1], [coluna]))
+    return medianas[0].merge(medianas[1], on=columns_groupby)
+
+
+# Marcador de cada célula de restaurantes com a quantidade de pedidos
+CLUSTER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup('Pedidos: ' + row[2]);
+    return marker;
+};
+"""
+
+
+@timed
+def country_map(map_data, map_grid):
+    """ Mapa folium da Visão Geográfica
+
+        Entregas como mapa de calor, restaurantes agrupados em clusters
+        (ambos já agregados em células, ver geo.delivery_grid) e a mediana
+        por cidade e trânsito como camada opcional.
+
+        Input: resultados map_data e map_grid da visão
+        Output: folium.Map
+    """
+    import folium
+    from folium.plugins import FastMarkerCluster, HeatMap
+
+    map = folium.Map( zoom_start=11 )
+
+    entregas = map_grid['entregas']
+    HeatMap(entregas[['latitude', 'longitude', 'count']].to_numpy().tolist(),
+            name='Entregas').add_to( map )
+
+    restaurantes = map_grid['restaurantes']
+    FastMarkerCluster(restaurantes[['latitude', 'longitude', 'count']].to_numpy().tolist(),
+                      callback=CLUSTER_CALLBACK, name='Restaurantes').add_to( map )
+
+    medianas = folium.FeatureGroup(name='Mediana por cidade e trânsito')
+    for location_info in map_data.itertuples(index=False):
+        folium.Marker( [location_info.Delivery_location_latitude,
+                        location_info.Delivery_location_longitude],
+                        popup=f'{location_info.City} / {location_info.Road_traffic_density}' ).add_to( medianas )
+    medianas.add_to( map )
+
+    folium.LayerControl().add_to( map )
+    if len(entregas):
+        map.fit_bounds([[entregas['latitude'].min(), entregas['longitude'].min()],
+                        [entregas['latitude'].max(), entregas['longitude'].max()]])
+    return map
+
+
+@timed
+def empresa_gerencial(df1, cube, sketches):
+    return {
+        'order_metric': order_metric(cube),
+        'traffic_order_share': traffic_order_share(cube),
+        'traffic_order_city': traffic_order_city(cube),
+    }
+
+
+@timed
+def empresa_tatica(df1, cube, sketches):
+    return {
+        'order_by_week': order_by_week(cube),
+        'order_share_by_week': order_share_by_week(cube, sketches['drivers']),
+    }
+
+
+@timed
+def empresa_geografica(df1, cube, sketches):
+    return {
+        'map_data': country_map_data(sketches),
+        'map_grid': delivery_grid(df1),
+    }
+
+
+# Gráficos de tendência: resultado -> (coluna da série, título do eixo)
+TREND_CHARTS = {
+    'orders_trend': ('orders', 'Pedidos na janela'),
+    'time_trend': ('avg_time', 'Tempo médio de entrega (min)'),
+    'driver_trend': ('orders_per_driver', 'Pedidos por entregador'),
+}
+
+
+def trend_chart(series, column, title):
+    import plotly.express as px
+
+    fig = px.line(series, x='Order_Date', y=column, color='City', line_dash='window',
+                  labels={column: title, 'Order_Date': '', 'window': 'Janela'})
+    return fig
+
+
+@timed
+def empresa_tendencias(df1, cube, sketches):
+    series = rolling_metrics(cube, sketches['drivers'])
+    return {nome: trend_chart(series, coluna, titulo) for nome, (coluna, titulo) in TREND_CHARTS.items()}
+
+
+@timed
+def empresa_view(df1, cube, sketches):
+    return {**empresa_gerencial(df1, cube, sketches), **empresa_tatica(df1, cube, sketches),
+            **empresa_geografica(df1, cube, sketches), **empresa_tendencias(df1, cube, sketches)}
+
+
+#===================================================================
+# Visão Entregadores
+#===================================================================
+
+@timed
+def ratings_by_driver(df1):
+    coluns = ['Delivery_person_ID' , 'Delivery_person_Ratings']
+    return ( df1.loc[: , coluns].groupby('Delivery_person_ID', observed=True)
+                                .mean()
+                                .reset_index()
+                                .sort_values(by='Delivery_person_Ratings', ascending=False))
+
+
+@timed
+def entregadores_view(df1, cube, sketches):
+    rapidos, lentos = rank_delivers(df1, n=10)
+    return {
+        'maior_idade': df1['Delivery_person_Age'].max(),
+        'menor_idade': df1['Delivery_person_Age'].min(),
+        'melhor_condicao': df1['Vehicle_condition'].max(),
+        'pior_condicao': df1['Vehicle_condition'].min(),
+        'tabela_avaliacoes': ratings_by_driver(df1),
+        'avaliacao_transito': measure_table(cube, ['Road_traffic_density'], 'rating', 'Delivery_mean', 'Delivery_std'),
+        'avaliacao_clima': measure_table(cube, ['Weatherconditions'], 'rating', 'Delivery_mean', 'Delivery_std'),
+        'rapidos': rapidos,
+        'lentos': lentos,
+    }
+
+
+#===================================================================
+# Visão Restaurantes
+#===================================================================
+
+# Tabelas da Visão Restaurantes, calculadas juntas por aggregate_plan
+RESTAURANT_SPECS = {
+    'distancia_total': ([], 'distance', 'mean', 'std'),
+    'tempo_festival': (['Festival'], 'time', 'mean', 'std'),
+    'tempo_cidade': (['City'], 'time', 'avg_time', 'std_time'),
+    'distancia_cidade': (['City'], 'distance', 'Distance (km)', 'std_distance'),
+    'tempo_cidade_pedido': (['City' , 'Type_of_order'], 'time', 'tempo_medio', 'desvio_padro'),
+    'tempo_cidade_transito': (['City', 'Road_traffic_density'], 'time', 'avg_time', 'std_time'),
+}
+
+
+@timed
+def distance_haversine(distancia_total):
+    # A distância já vem calculada do carregamento e somada no cubo
+    valor_medio = np.round(distancia_total['mean'].iloc[0],2)
+    return valor_medio
+
+
+@timed
+def city_time_chart(df_aux):
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+    name='Control',
+    x=df_aux['City'],
+    y=df_aux['avg_time'],
+    error_y=dict(type='data', array=df_aux['std_time'])
+    ))
+
+    fig.update_layout(barmode='group')
+    return fig
+
+
+@timed
+def city_distance_chart(avg_distance):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(
+    data=[go.Pie(
+    labels=avg_distance['City'],
+    values=avg_distance['Distance (km)'],
+    pull=[0, 0.05, 0]
+    )]
+    )
+    return fig
+
+
+@timed
+def city_traffic_chart(df_aux):
+    import plotly.express as px
+
+    fig = px.sunburst(
+    df_aux, path=['City', 'Road_traffic_density'], values='avg_time',
+    color='std_time', color_continuous_scale='RdBu',
+    color_continuous_midpoint=np.average(df_aux['std_time'])
+    )
+    return fig
+
+
+# Percentis do tempo de entrega: tabela -> dimensão
+TIME_PERCENTILES = {
+    'percentis_cidade': 'City',
+    'percentis_transito': 'Road_traffic_density',
+    'percentis_veiculo': 'Type_of_vehicle',
+}
+
+
+def time_percentiles(sketch):
+    """ p50/p90/p99 do tempo de entrega no total e por cidade, trânsito e veículo
+
+        O sketch é somado uma vez ao nível das três dimensões e cada tabela
+        sai desse resultado.
+
+        Output: dicionario com 'percentis' (uma linha) e as tabelas de TIME_PERCENTILES
+    """
+    base = rollup_sketch(sketch, list(TIME_PERCENTILES.values()))
+    tabelas = {'percentis': quantile_table(base, [])}
+    for nome, dimensao in TIME_PERCENTILES.items():
+        tabelas[nome] = quantile_table(base, [dimensao])
+    return tabelas
+
+
+@timed
+def restaurantes_view(df1, cube, sketches):
+    # Uma passada no cubo para todas as tabelas; entregadores únicos e percentis nos sketches
+    tabelas = aggregate_plan(cube, RESTAURANT_SPECS)
+    tempo_festival = tabelas['tempo_festival'].set_index('Festival').reindex(['Yes', 'No'])
+    percentis = time_percentiles(sketches['time'])
+    return {
+        'qtd_entregadores': sketches['drivers'].count(),
+        'distancia_media': distance_haversine(tabelas['distancia_total']),
+        'tempo_medio_festival': np.round(tempo_festival.loc['Yes', 'mean'], 2),
+        'desvpad_festival': np.round(tempo_festival.loc['Yes', 'std'], 2),
+        'tempo_medio_nao_festival': np.round(tempo_festival.loc['No', 'mean'], 2),
+        'desvpad_nao_festival': np.round(tempo_festival.loc['No', 'std'], 2),
+        'city_time_chart': city_time_chart(tabelas['tempo_cidade']),
+        'city_order_table': tabelas['tempo_cidade_pedido'],
+        'city_distance_chart': city_distance_chart(tabelas['distancia_cidade']),
+        'city_traffic_chart': city_traffic_chart(tabelas['tempo_cidade_transito']),
+        **{f'tempo_{q}': percentis['percentis'][q].iloc[0] for q in percentis['percentis'].columns},
+        **{nome: percentis[nome] for nome in TIME_PERCENTILES},
+    }
+
+
+PAGES = {
+    'empresa': empresa_view,
+    'entregadores': entregadores_view,
+    'restaurantes': restaurantes_view,
+}
+
+# Visões (abas) de cada página que podem ser calculadas separadamente
+SECTIONS = {
+    'empresa': {
+        'gerencial': empresa_gerencial,
+        'tatica': empresa_tatica,
+        'geografica': empresa_geografica,
+        'tendencias': empresa_tendencias,
+    },
+}
+
+# Colunas das linhas filtradas que cada página (ou visão) usa; o backend
+# duckdb só devolve estas. Lista vazia: a visão só usa o cubo e os sketches
+_EMPRESA_GEOGRAFICA = ['City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude',
+                       'Restaurant_latitude', 'Restaurant_longitude']
+ROW_COLUMNS = {
+    ('empresa', None): _EMPRESA_GEOGRAFICA,
+    ('empresa', 'gerencial'): [],
+    ('empresa', 'tatica'): [],
+    ('empresa', 'geografica'): _EMPRESA_GEOGRAFICA,
+    ('empresa', 'tendencias'): [],
+    ('entregadores', None): ['Delivery_person_ID', 'Delivery_person_Age', 'Delivery_person_Ratings',
+                             'Vehicle_condition', 'City', 'Time_taken(min)'],
+    ('restaurantes', None): [],
+}
+
+# Sketches que cada página (ou visão) usa (ver curry_company.sketch)
+SKETCH_NAMES = {
+    ('empresa', None): ['latitude', 'longitude', 'drivers'],
+    ('empresa', 'tatica'): ['drivers'],
+    ('empresa', 'geografica'): ['latitude', 'longitude'],
+    ('empresa', 'tendencias'): ['drivers'],
+    ('restaurantes', None): ['time', 'drivers'],
+}
+
+# Pré-carga das outras visões depois que a visível foi desenhada
+_prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+# Pré-cargas enviadas por página: chave do resultado -> Future
+_prefetch_futures = {}
+_prefetch_lock = threading.Lock()
+
+
+def _results_key(page, section, date_cutoff, traffic, weather, date_start, city):
+    return (page, section, get_backend().version()) + filter_key(date_cutoff, traffic, weather, date_start, city)
+
+
+def page_results(page, date_cutoff=None, traffic=None, weather=None, date_start=None, section=None, city=None):
+    """ Agregados e figuras de uma página para um conjunto de filtros
+
+        O resultado fica no results_cache (LRU) com a chave normalizada dos
+        filtros; voltar a uma combinação já vista não recalcula nada.
+        Com `section` só a visão pedida é calculada (ver SECTIONS). As
+        linhas e o cubo filtrados vêm do backend configurado em
+        CURRY_COMPANY_BACKEND (ver curry_company.backends).
+
+        Input: nome da página (ver PAGES), filtros da barra lateral e visão
+        Output: dicionario com os resultados da página (ou da visão)
+    """
+    backend = get_backend()
+    view = PAGES[page] if section is None else SECTIONS[page][section]
+    key = _results_key(page, section, date_cutoff, traffic, weather, date_start, city)
+    filtros = {'date_cutoff': date_cutoff, 'traffic': traffic, 'weather': weather, 'date_start': date_start,
+               'city': city}
+
+    def calcular():
+        colunas = ROW_COLUMNS.get((page, section))
+        with span(f'{backend.name}_query') as s:
+            linhas = None if colunas == [] else backend.rows(filtros, colunas)
+            celulas = backend.cube(filtros)
+            sketches = backend.sketches(filtros, SKETCH_NAMES.get((page, section), []))
+            s.rows = len(celulas)
+        return view(linhas, celulas, sketches)
+
+    with span('page_results'):
+        resultados = results_cache.get_or_compute(key, calcular)
+    return resultados
+
+
+def _prefetch(page, section, filtros):
+    begin_run('prefetch')
+    page_results(page, section=section, **filtros)
+
+
+def prefetch_sections(page, visible=None, **filtros):
+    """ Calcula em segundo plano as visões da página ainda fora do cache
+
+        Chamado depois que a visão visível foi desenhada; ao trocar de aba
+        o resultado já está pronto (ou page_results espera o cálculo em
+        andamento em vez de repetir).
+
+        Pré-cargas da página ainda na fila com outros filtros (o slider foi
+        arrastado de novo) ou para a visão que já foi calculada são
+        canceladas; chaves já na fila, em cálculo ou em cache não são
+        enviadas de novo. Assim a fila tem no máximo uma pré-carga por
+        visão, sempre dos últimos filtros.
+
+        Input: página, visão já calculada e os mesmos filtros de page_results
+    """
+    # Visões que usam as linhas só são pré-carregadas se o dataset já está
+    # na memória: com cubo e sketches gravados ele pode nem ser carregado
+    linhas = get_backend().rows_loaded()
+    chaves = {}
+    for section in SECTIONS.get(page, {}):
+        if section != visible and (linhas or not ROW_COLUMNS.get((page, section))):
+            chaves[_results_key(page, section, filtros.get('date_cutoff'), filtros.get('traffic'),
+                                filtros.get('weather'), filtros.get('date_start'), filtros.get('city'))] = section
+
+    with _prefetch_lock:
+        enviadas = {}
+        for key, futuro in _prefetch_futures.get(page, {}).items():
+            if key not in chaves:
+                futuro.cancel()
+            elif not futuro.done():
+                enviadas[key] = futuro
+        for key, section in chaves.items():
+            if key not in enviadas and not results_cache.computing(key):
+                enviadas[key] = _prefetch_pool.submit(_prefetch, page, section, filtros)
+        _prefetch_futures[page] = enviadas
@@ -1,12 +1,11 @@
 import streamlit as st
-from PIL import Image
+from curry_company.assets import LOGO_WIDTH, logo_image
 
 st.set_page_config(
     page_title="Home")
 
 # image_path = '/home/lincon/repos/ftc_analisando_dados_com_python/logo.png'
-image = Image.open('logo.png')
-st.sidebar.image(image, width=230)
+st.sidebar.image(logo_image(), width=LOGO_WIDTH)
 
 st.sidebar.markdown('# Cury Company')
 st.sidebar.markdown('## Fastest Delivery in Town')
@@ -1,119 +1,24 @@
 # Libraries
-import pandas as pd
-import plotly.express as px
-import plotly.io as pio
-from haversine import haversine
 import streamlit as st
 import datetime
-from PIL import Image
-import folium
-from streamlit_folium import folium_static
+from curry_company.assets import LOGO_WIDTH, logo_image
+from curry_company.index import clamp_date
+from curry_company.timing import begin_run, span, stage, timing_panel
+from curry_company.views import country_map, dataset_date_bounds, page_results, prefetch_sections, results_cache
 
 st.set_page_config(page_title='Visão Empresa', layout='wide')
+begin_run('empresa')
+stage('sidebar')
 #===================================================================
 # Funções
 #===================================================================
-def clean_code(df1):
-    """ Esta funcao de limpar do dataframe
-
-        Tipos de limpeza:
-        1. Remoção de valores NaN
-        2. Transformacao tipo de dados
-        3. Formatacao da coluna de data
-        4. Remocao dos espacos das variaveis de texto
-        5. Limpeza da coluna de tempo (remocao do texto da variavel numerica)
-
-        Input: Dataframe
-        Output: Dataframe
-    
-    """
-    # Retirada de espaços em branco
-    colunas_texto = ['ID', 'Road_traffic_density', 'Type_of_order', 'Type_of_vehicle', 'City', 'multiple_deliveries', 'Delivery_person_Age', 'Festival']
-    for coluna in colunas_texto:
-        df1[coluna] = df1[coluna].str.strip()
-    
-    # Removendo linhas com valores inválidos ('NaN' como string) nas colunas
-    df1 = df1[df1['Road_traffic_density'] != 'NaN']
-    df1 = df1[df1['City'] != 'NaN']
-    df1 = df1[df1['Delivery_person_Age'] != 'NaN']
-    df1 = df1[df1['multiple_deliveries'] != 'NaN']
-    df1 = df1[df1['Festival'] != 'NaN']
-    
-    #Converter Lat/Long para numérico e tratar strings inválidas como nulo (NaN)
-    df1['Delivery_location_latitude'] = pd.to_numeric(df1['Delivery_location_latitude'], errors="coerce")
-    df1['Delivery_location_longitude'] = pd.to_numeric(df1['Delivery_location_longitude'], errors="coerce")
-    df1['Delivery_person_Age'] = pd.to_numeric(df1['Delivery_person_Age'], errors="coerce")
-    df1['Delivery_person_Ratings'] = pd.to_numeric(df1['Delivery_person_Ratings'], errors="coerce")
-    df1['multiple_deliveries'] = pd.to_numeric(df1['multiple_deliveries'], errors="coerce")
-
-    #Remover linhas onde Lat/Long são nulas (NaN) após a conversão
-    df1.dropna(subset=['Delivery_location_latitude', 'Delivery_location_longitude'], inplace=True)
-    
-    # Convertendo para tipo data
-    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format="%d-%m-%Y")
-    
-    # Limpando a coluna de time taken
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply(lambda x: x.split('(min) ')[1])
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].astype(int)
-
-    return df1
-
-
-def order_metric(df1):
-    coluns = ['ID', 'Order_Date']
-    df_aux = df1.loc[: , coluns].groupby('Order_Date').count().reset_index()
-    fig = px.bar(df_aux, x='Order_Date', y='ID')
-
-    return fig
-
-
-def traffic_order_share(df1):
-    columns = ['ID', 'Road_traffic_density']
-    df_aux = df1.loc[:, columns].groupby( 'Road_traffic_density').count().reset_index()
-    df_aux['perc_ID'] = 100 * ( df_aux['ID'] / df_aux['ID'].sum() )
-    fig = px.pie( df_aux, values='perc_ID', names='Road_traffic_density')
-
-    return fig
-
-
-def traffic_order_city(df1):
-    coluns = ['ID', 'City', 'Road_traffic_density']
-    df_aux = df1.loc[: , coluns].groupby(['City' , 'Road_traffic_density']).count().reset_index()
-    fig = px.scatter(df_aux, x='Road_traffic_density', y='City', size='ID')
-
-    return fig
-
-
-def order_by_week(df1):
-    df1['Week_of_year'] = df1['Order_Date'].dt.strftime("%U")
-    coluns = ['Week_of_year' , 'ID']
-    df_aux = df1.loc[: , coluns].groupby('Week_of_year').count().reset_index()
-    fig = px.line(df_aux , x='Week_of_year', y='ID')
-    return fig
-
-
-
-def order_share_by_week(df1):
-    df1['Week_of_year'] = df1['Order_Date'].dt.strftime("%U")
-    df_aux1 = df1.loc[: , ['Week_of_year' ,'ID']].groupby('Week_of_year').count().reset_index()
-    df_aux2 = df1.loc[: , ['Week_of_year', 'Delivery_person_ID']].groupby('Week_of_year').nunique().reset_index()
-    df_aux =  pd.merge(df_aux1 , df_aux2, how='inner')
-    df_aux['order_by_delivery'] = df_aux['ID'] /df_aux['Delivery_person_ID']
-    fig = px.line(df_aux, x="Week_of_year", y="order_by_delivery",)
+def plot_contry_map(data_plot, grid):
+        # streamlit_folium (e o folium) só são importados quando a Visão
+        # Geográfica é desenhada
+        from streamlit_folium import folium_static
 
-    return fig
-
-
-def plot_contry_map(df1):
-        columns = ['City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude']
-        columns_groupby = ['City', 'Road_traffic_density']
-        data_plot = df1.loc[:, columns].groupby( columns_groupby ).median().reset_index()
-        # Desenhar o mapa
-        map = folium.Map( zoom_start=11 )
-        for index, location_info in data_plot.iterrows():
-            folium.Marker( [location_info['Delivery_location_latitude'], 
-                            location_info['Delivery_location_longitude']], 
-                            popup=location_info[['City', 'Road_traffic_density']] ).add_to( map )
+        # Desenhar o mapa (camadas montadas em curry_company.views.country_map)
+        map = country_map(data_plot, grid)
         folium_static(map , width=1024 , height=600)
         return None
 
@@ -124,15 +29,9 @@ def plot_contry_map(df1):
 # Import dataset
 #===================================================================
 
-df = pd.read_csv('dataset/train.csv')
-df1 = df.copy()
-
-
-#===================================================================
-# Limpando os dados
-#===================================================================
+# Dataset limpo e cubo de agregados ficam em cache no processo
+# (curry_company.data / curry_company.cube); a página só pede os resultados.
 
-df1 = clean_code(df1)
 
 #===================================================================
 #Barra Lateral
@@ -141,15 +40,16 @@ df1 = clean_code(df1)
 st.header('Marketplace - Visão Cliente')
 
 #image_path = '/home/lincon/repos/ftc_analisando_dados_com_python/logo.png'
-image = Image.open('logo.png')
-st.sidebar.image(image, width=230)
+st.sidebar.image(logo_image(), width=LOGO_WIDTH)
 
 st.sidebar.markdown('# Cury Company')
 st.sidebar.markdown('## Fastest Delivery in Town')
 st.sidebar.markdown("""___""")
 
-st.sidebar.markdown('## Selecione uma data limite')
-date_slider = st.sidebar.slider('Até qual valor?', value=datetime.datetime(2022, 3, 13), min_value=datetime.datetime(2022, 2, 11), max_value=datetime.datetime(2022, 4, 6), format='DD-MM-YYYY')
+st.sidebar.markdown('## Selecione o período')
+# Limites do slider saem do próprio dataset (primeira e última data)
+data_min, data_max = dataset_date_bounds()
+date_start, date_slider = st.sidebar.slider('Entre quais datas?', value=(data_min, clamp_date(datetime.datetime(2022, 3, 13), data_min, data_max)), min_value=data_min, max_value=data_max, format='DD-MM-YYYY')
 
 st.sidebar.markdown("""___""")
 
@@ -158,25 +58,25 @@ traffic_options = st.sidebar.multiselect('Quais as condições do trânsito' , [
 st.sidebar.markdown("""___""")
 st.sidebar.markdown('### Powered by Lincon Schafranski')
 
-#Filtro de data
-linhas_selecionadas = df1['Order_Date'] < date_slider
-df1 = df1.loc[linhas_selecionadas, :]
-
-#Filtro de transito
-linhas_selecionadas = df1['Road_traffic_density'].isin(traffic_options)
-df1 = df1.loc[linhas_selecionadas, :]
-
-
-
 #===================================================================
 #Layout no Streamlit
 #===================================================================
 
-tab1, tab2, tab3 = st.tabs(['Visão Gerencial', 'Visão Tática', 'Visão Geográfica'])
+# Só a visão escolhida é calculada e desenhada; as outras são pré-carregadas
+# em segundo plano depois, para a mesma combinação de filtros
+VISOES = {'Visão Gerencial': 'gerencial', 'Visão Tática': 'tatica', 'Visão Geográfica': 'geografica',
+          'Visão Tendências': 'tendencias'}
+visao = st.radio('Visão', list(VISOES), horizontal=True, label_visibility='collapsed')
+filtros = dict(date_cutoff=date_slider, traffic=traffic_options, date_start=date_start)
 
-with tab1:
+stage('results')
+#Agregados e figuras da visão escolhida para os filtros escolhidos (cache LRU)
+resultados = page_results('empresa', section=VISOES[visao], **filtros)
+
+stage('render')
+if visao == 'Visão Gerencial':
     with st.container():
-        fig = order_metric(df1)
+        fig = resultados['order_metric']
         st.markdown('## Orders by day')
         st.plotly_chart(fig , use_container_width=True)       
         
@@ -186,35 +86,54 @@ with tab1:
         
         with col1:
             st.header('Traffic Order Share')
-            fig = traffic_order_share(df1)
+            fig = resultados['traffic_order_share']
             st.plotly_chart(fig , use_container_width=True)
 
             
         with col2:
             st.header('Traffic Order City')
-            fig = traffic_order_city(df1)
+            fig = resultados['traffic_order_city']
             st.plotly_chart(fig , use_container_width=True)
 
  
-with tab2:
+elif visao == 'Visão Tática':
     with st.container():
         st.markdown('# Order by Week')
-        fig = order_by_week(df1)
+        fig = resultados['order_by_week']
         st.plotly_chart( fig, use_container_width=True)
 
     
     with st.container():
         st.markdown('# Order Share by Week')
-        fig = order_share_by_week(df1)
+        fig = resultados['order_share_by_week']
         st.plotly_chart(fig, use_container_width=True)
 
 
-with tab3:
-    st.markdown('# Country Map')
-    fig = plot_contry_map(df1)
+elif visao == 'Visão Tendências':
+    # Janelas móveis de 7 e 28 dias por cidade
+    with st.container():
+        st.markdown('# Orders Trend')
+        st.plotly_chart(resultados['orders_trend'], use_container_width=True)
+
+    with st.container():
+        col1 , col2 = st.columns(2)
 
+        with col1:
+            st.header('Delivery Time Trend')
+            st.plotly_chart(resultados['time_trend'], use_container_width=True)
 
+        with col2:
+            st.header('Orders per Driver Trend')
+            st.plotly_chart(resultados['driver_trend'], use_container_width=True)
 
 
+else:
+    st.markdown('# Country Map')
+    with span('folium'):
+        fig = plot_contry_map(resultados['map_data'], resultados['map_grid'])
+
 
+prefetch_sections('empresa', visible=VISOES[visao], **filtros)
 
+# Tempos de cada etapa desta execução (CURRY_COMPANY_TIMING=1)
+timing_panel(results_cache.stats())
@@ -1,78 +1,15 @@
 # Libraries
-import pandas as pd
-import plotly.express as px
-import plotly.io as pio
-from haversine import haversine
 import streamlit as st
 import datetime
-from PIL import Image
-import folium
-from streamlit_folium import folium_static
+from curry_company.assets import LOGO_WIDTH, logo_image
+from curry_company.index import clamp_date
+from curry_company.timing import begin_run, stage, timing_panel
+from curry_company.views import dataset_date_bounds, page_results, results_cache
 
 
 st.set_page_config(page_title='Visão Entregadores', layout='wide')
-#===================================================================
-# Funções
-#===================================================================
-
-def clean_code(df1):
-    """ Esta funcao de limpar do dataframe
-
-        Tipos de limpeza:
-        1. Remoção de valores NaN
-        2. Transformacao tipo de dados
-        3. Formatacao da coluna de data
-        4. Remocao dos espacos das variaveis de texto
-        5. Limpeza da coluna de tempo (remocao do texto da variavel numerica)
-
-        Input: Dataframe
-        Output: Dataframe
-    
-    """
-    # Retirada de espaços em branco
-    colunas_texto = ['ID', 'Road_traffic_density', 'Type_of_order', 'Type_of_vehicle', 'City', 'multiple_deliveries', 'Delivery_person_Age', 'Festival']
-    for coluna in colunas_texto:
-        df1[coluna] = df1[coluna].str.strip()
-    
-    # Removendo linhas com valores inválidos ('NaN' como string) nas colunas
-    df1 = df1[df1['Road_traffic_density'] != 'NaN']
-    df1 = df1[df1['City'] != 'NaN']
-    df1 = df1[df1['Delivery_person_Age'] != 'NaN']
-    df1 = df1[df1['multiple_deliveries'] != 'NaN']
-    df1 = df1[df1['Festival'] != 'NaN']
-    
-    #Converter Lat/Long para numérico e tratar strings inválidas como nulo (NaN)
-    df1['Delivery_location_latitude'] = pd.to_numeric(df1['Delivery_location_latitude'], errors="coerce")
-    df1['Delivery_location_longitude'] = pd.to_numeric(df1['Delivery_location_longitude'], errors="coerce")
-    df1['Delivery_person_Age'] = pd.to_numeric(df1['Delivery_person_Age'], errors="coerce")
-    df1['Delivery_person_Ratings'] = pd.to_numeric(df1['Delivery_person_Ratings'], errors="coerce")
-    df1['multiple_deliveries'] = pd.to_numeric(df1['multiple_deliveries'], errors="coerce")
-
-    #Remover linhas onde Lat/Long são nulas (NaN) após a conversão
-    df1.dropna(subset=['Delivery_location_latitude', 'Delivery_location_longitude'], inplace=True)
-    
-    # Convertendo para tipo data
-    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format="%d-%m-%Y")
-    
-    # Limpando a coluna de time taken
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply(lambda x: x.split('(min) ')[1])
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].astype(int)
-
-    return df1
-
-
-def top_delivers(df1, tipo):
-    colunas = ['Delivery_person_ID' , 'City' , 'Time_taken(min)']
-    df_aux = df1.loc[: , colunas].groupby(['City' , 'Delivery_person_ID']).mean().sort_values(by=['City', 'Time_taken(min)']).reset_index()
-    if tipo == 'lentos':
-        df2 = (df_aux.groupby('City')
-                 .apply(lambda x: x.nlargest(10, 'Time_taken(min)'))
-                 .reset_index(drop=True))
-    elif tipo == 'rapidos':
-        df2 = (df_aux.groupby('City')
-                 .apply(lambda x: x.nsmallest(10, 'Time_taken(min)'))
-                 .reset_index(drop=True))
-    return df2
+begin_run('entregadores')
+stage('sidebar')
 
 #------------------------------------------------------------Início da estrutura lógica do código-----------------------------------------------------------
 
@@ -80,16 +17,10 @@ def top_delivers(df1, tipo):
 # Import dataset
 #===================================================================
 
-# Import dataset
-df = pd.read_csv('dataset/train.csv')
-df1 = df.copy()
+# Dataset limpo e cubo de agregados ficam em cache no processo
+# (curry_company.data / curry_company.cube); a página só pede os resultados.
 
 
-#===================================================================
-# Limpando os dados
-#===================================================================
-df1 = clean_code(df1)
-
 
 #===================================================================
 #Barra Lateral
@@ -98,15 +29,16 @@ df1 = clean_code(df1)
 st.header('Marketplace - Visão Entregadores')
 
 #image_path = '/home/lincon/repos/ftc_analisando_dados_com_python/logo.png'
-image = Image.open('logo.png')
-st.sidebar.image(image, width=230)
+st.sidebar.image(logo_image(), width=LOGO_WIDTH)
 
 st.sidebar.markdown('# Cury Company')
 st.sidebar.markdown('## Fastest Delivery in Town')
 st.sidebar.markdown("""___""")
 
-st.sidebar.markdown('## Selecione uma data limite')
-date_slider = st.sidebar.slider('Até qual valor?', value=datetime.datetime(2022, 3, 13), min_value=datetime.datetime(2022, 2, 11), max_value=datetime.datetime(2022, 4, 6), format='DD-MM-YYYY')
+st.sidebar.markdown('## Selecione o período')
+# Limites do slider saem do próprio dataset (primeira e última data)
+data_min, data_max = dataset_date_bounds()
+date_start, date_slider = st.sidebar.slider('Entre quais datas?', value=(data_min, clamp_date(datetime.datetime(2022, 3, 13), data_min, data_max)), min_value=data_min, max_value=data_max, format='DD-MM-YYYY')
 
 st.sidebar.markdown("""___""")
 
@@ -120,23 +52,16 @@ climate_conditions = st.sidebar.multiselect('Quais as condições de clima' , ['
 st.sidebar.markdown("""___""")
 st.sidebar.markdown('### Powered by Lincon Schafranski')
 
-#Filtro de data
-linhas_selecionadas = df1['Order_Date'] < date_slider
-df1 = df1.loc[linhas_selecionadas, :]
-
-#Filtro de transito
-linhas_selecionadas = df1['Road_traffic_density'].isin(traffic_options)
-df1 = df1.loc[linhas_selecionadas, :]
-
-#Filtro de transito
-linhas_selecionadas = df1['Weatherconditions'].isin(climate_conditions)
-df1 = df1.loc[linhas_selecionadas, :]
+stage('results')
+#Agregados da página para os filtros escolhidos (cache LRU)
+resultados = page_results('entregadores', date_cutoff=date_slider, traffic=traffic_options, weather=climate_conditions, date_start=date_start)
 
 
 #===================================================================
 #Layout no Streamlit
 #===================================================================
 
+stage('render')
 tab1, tab2, tab3 = st.tabs(['Visão Gerencial', '', ''])
 
 with tab1:
@@ -145,20 +70,20 @@ with tab1:
 
         col1, col2, col3, col4 = st.columns( 4 , gap='large')
         with col1:
-            maior_idade = df1['Delivery_person_Age'].max()
+            maior_idade = resultados['maior_idade']
             col1.metric('Maior idade', maior_idade)
             
         with col2:
-            menor_idade = df1['Delivery_person_Age'].min()
+            menor_idade = resultados['menor_idade']
             col2.metric('Menor idade', menor_idade)
             
         with col3:
-            melhor_condicao = df1['Vehicle_condition'].max()
+            melhor_condicao = resultados['melhor_condicao']
             col3.metric('Melhor condição', melhor_condicao)
 
             
         with col4:
-            pior_condicao = df1['Vehicle_condition'].min()
+            pior_condicao = resultados['pior_condicao']
             col4.metric('Pior condição', pior_condicao )
             
             
@@ -170,29 +95,19 @@ with tab1:
 
         with col1:
             st.markdown('##### Avaliação média por entregador')
-            coluns = ['Delivery_person_ID' , 'Delivery_person_Ratings']
-            tabela_avaliacoes = ( df1.loc[: , coluns].groupby('Delivery_person_ID')
-                                                     .mean()
-                                                     .reset_index()
-                                                     .sort_values(by='Delivery_person_Ratings', ascending=False))
+            tabela_avaliacoes = resultados['tabela_avaliacoes']
             
             st.dataframe(tabela_avaliacoes)
             
             
         with col2:
             st.markdown('##### Avaliação média por trânsito')
-            coluns = ['Road_traffic_density' , 'Delivery_person_Ratings']
-            avaliacao_transito = ( df1.loc[: , coluns].groupby('Road_traffic_density')
-                                                      .agg(Delivery_mean=('Delivery_person_Ratings' , 'mean') , Delivery_std=('Delivery_person_Ratings' , 'std'))
-                                                      .reset_index())
+            avaliacao_transito = resultados['avaliacao_transito']
 
             st.dataframe(avaliacao_transito)
             
             st.markdown('##### Avaliação média por clima')
-            coluns = ['Weatherconditions' , 'Delivery_person_Ratings']
-            avaliacao_clima = (df1.loc[: , coluns].groupby('Weatherconditions')
-                                                  .agg(Delivery_mean=('Delivery_person_Ratings' , 'mean') , Delivery_std=('Delivery_person_Ratings' , 'std'))
-                                                  .reset_index())
+            avaliacao_clima = resultados['avaliacao_clima']
 
             st.dataframe(avaliacao_clima)
 
@@ -205,20 +120,13 @@ with tab1:
 
         with col1:
             st.markdown('##### Top entregadores mais rápidos')
-            df2 = top_delivers(df1, 'rapidos')
-            st.dataframe(df2)
+            st.dataframe(resultados['rapidos'])
          
 
         with col2:
             st.markdown('##### Top entregadores mais lentos')
-            df2 = top_delivers(df1, 'lentos')
-            st.dataframe(df2)
-
-         
-                
-        
-            
-            
-            
+            st.dataframe(resultados['lentos'])
 
 
+# Tempos de cada etapa desta execução (CURRY_COMPANY_TIMING=1)
+timing_panel(results_cache.stats())
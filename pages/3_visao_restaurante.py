@@ -1,101 +1,24 @@
 # Libraries
-import pandas as pd
-import plotly.express as px
-import plotly.io as pio
-from haversine import haversine
 import streamlit as st
 import datetime
-from PIL import Image
-import folium
-from streamlit_folium import folium_static
-import numpy as np
-import plotly.graph_objects as go
+from curry_company.assets import LOGO_WIDTH, logo_image
+from curry_company.index import clamp_date
+from curry_company.timing import begin_run, stage, timing_panel
+from curry_company.views import dataset_date_bounds, page_results, results_cache
 
 st.set_page_config(page_title='Visão Restaurantes', layout='wide')
-#===================================================================
-# Funções
-#===================================================================
-
-def clean_code(df1):
-    """ Esta funcao de limpar do dataframe
-
-        Tipos de limpeza:
-        1. Remoção de valores NaN
-        2. Transformacao tipo de dados
-        3. Formatacao da coluna de data
-        4. Remocao dos espacos das variaveis de texto
-        5. Limpeza da coluna de tempo (remocao do texto da variavel numerica)
-
-        Input: Dataframe
-        Output: Dataframe
-    
-    """
-    # Retirada de espaços em branco
-    colunas_texto = ['ID', 'Road_traffic_density', 'Type_of_order', 'Type_of_vehicle', 'City', 'multiple_deliveries', 'Delivery_person_Age', 'Festival']
-    for coluna in colunas_texto:
-        df1[coluna] = df1[coluna].str.strip()
-    
-    # Removendo linhas com valores inválidos ('NaN' como string) nas colunas
-    df1 = df1[df1['Road_traffic_density'] != 'NaN']
-    df1 = df1[df1['City'] != 'NaN']
-    df1 = df1[df1['Delivery_person_Age'] != 'NaN']
-    df1 = df1[df1['multiple_deliveries'] != 'NaN']
-    df1 = df1[df1['Festival'] != 'NaN']
-    
-    #Converter Lat/Long para numérico e tratar strings inválidas como nulo (NaN)
-    df1['Delivery_location_latitude'] = pd.to_numeric(df1['Delivery_location_latitude'], errors="coerce")
-    df1['Delivery_location_longitude'] = pd.to_numeric(df1['Delivery_location_longitude'], errors="coerce")
-    df1['Delivery_person_Age'] = pd.to_numeric(df1['Delivery_person_Age'], errors="coerce")
-    df1['Delivery_person_Ratings'] = pd.to_numeric(df1['Delivery_person_Ratings'], errors="coerce")
-    df1['multiple_deliveries'] = pd.to_numeric(df1['multiple_deliveries'], errors="coerce")
-
-    #Remover linhas onde Lat/Long são nulas (NaN) após a conversão
-    df1.dropna(subset=['Delivery_location_latitude', 'Delivery_location_longitude'], inplace=True)
-    
-    # Convertendo para tipo data
-    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format="%d-%m-%Y")
-    
-    # Limpando a coluna de time taken
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply(lambda x: x.split('(min) ')[1])
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].astype(int)
-
-    return df1
-
-
-def top_delivers(df1, tipo):
-    colunas = ['Delivery_person_ID' , 'City' , 'Time_taken(min)']
-    df_aux = df1.loc[: , colunas].groupby(['City' , 'Delivery_person_ID']).mean().sort_values(by=['City', 'Time_taken(min)']).reset_index()
-    if tipo == 'lentos':
-        df2 = (df_aux.groupby('City')
-                 .apply(lambda x: x.nlargest(10, 'Time_taken(min)'))
-                 .reset_index(drop=True))
-    elif tipo == 'rapidos':
-        df2 = (df_aux.groupby('City')
-                 .apply(lambda x: x.nsmallest(10, 'Time_taken(min)'))
-                 .reset_index(drop=True))
-    return df2
-
-def distance_haversine(df1):
-    coluns = ['Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude']
-    df1['Distance (km)'] = (df1.loc[: , coluns].apply(lambda x: haversine((x['Restaurant_latitude'] , x['Restaurant_longitude']) , (x['Delivery_location_latitude'] , x['Delivery_location_longitude'])), axis=1))
-    valor_medio = np.round(df1['Distance (km)'].mean(),2)
-    return valor_medio
-
+begin_run('restaurantes')
+stage('sidebar')
 
 #------------------------------------------------------------Início da estrutura lógica do código-----------------------------------------------------------
 
 #===================================================================
 # Import dataset
 #===================================================================
-df = pd.read_csv('dataset/train.csv')
-df1 = df.copy()
+# Dataset limpo e cubo de agregados ficam em cache no processo
+# (curry_company.data / curry_company.cube); a página só pede os resultados.
 
 
-#===================================================================
-# Limpando os dados
-#===================================================================
-df1 = clean_code(df1)
-
 
 #===================================================================
 #Barra Lateral
@@ -105,15 +28,16 @@ df1 = clean_code(df1)
 st.header('Marketplace - Visão Restaurantes')
 
 #image_path = '/home/lincon/repos/ftc_analisando_dados_com_python/logo.png'
-image = Image.open('logo.png')
-st.sidebar.image(image, width=230)
+st.sidebar.image(logo_image(), width=LOGO_WIDTH)
 
 st.sidebar.markdown('# Cury Company')
 st.sidebar.markdown('## Fastest Delivery in Town')
 st.sidebar.markdown("""___""")
 
-st.sidebar.markdown('## Selecione uma data limite')
-date_slider = st.sidebar.slider('Até qual valor?', value=datetime.datetime(2022, 3, 13), min_value=datetime.datetime(2022, 2, 11), max_value=datetime.datetime(2022, 4, 6), format='DD-MM-YYYY')
+st.sidebar.markdown('## Selecione o período')
+# Limites do slider saem do próprio dataset (primeira e última data)
+data_min, data_max = dataset_date_bounds()
+date_start, date_slider = st.sidebar.slider('Entre quais datas?', value=(data_min, clamp_date(datetime.datetime(2022, 3, 13), data_min, data_max)), min_value=data_min, max_value=data_max, format='DD-MM-YYYY')
 
 st.sidebar.markdown("""___""")
 
@@ -127,23 +51,16 @@ climate_conditions = st.sidebar.multiselect('Quais as condições de clima' , ['
 st.sidebar.markdown("""___""")
 st.sidebar.markdown('### Powered by Lincon Schafranski')
 
-#Filtro de data
-linhas_selecionadas = df1['Order_Date'] < date_slider
-df1 = df1.loc[linhas_selecionadas, :]
-
-#Filtro de transito
-linhas_selecionadas = df1['Road_traffic_density'].isin(traffic_options)
-df1 = df1.loc[linhas_selecionadas, :]
-
-#Filtro de transito
-linhas_selecionadas = df1['Weatherconditions'].isin(climate_conditions)
-df1 = df1.loc[linhas_selecionadas, :]
+stage('results')
+#Agregados e figuras da página para os filtros escolhidos (cache LRU)
+resultados = page_results('restaurantes', date_cutoff=date_slider, traffic=traffic_options, weather=climate_conditions, date_start=date_start)
 
 
 #===================================================================
 #Layout no Streamlit
 #===================================================================
 
+stage('render')
 tab1, tab2, tab3 = st.tabs(['Visão Gerencial', '', ''])
 
 with tab1:
@@ -153,34 +70,28 @@ with tab1:
 
         col1, col2, col3, col4, col5, col6 = st.columns(6)
         with col1:
-            qtd_entregadores = len(df1['Delivery_person_ID'].unique())
+            qtd_entregadores = resultados['qtd_entregadores']
             col1.metric('Entregadores únicos', qtd_entregadores)
 
         with col2:
-            valor_medio = distance_haversine(df1)
+            valor_medio = resultados['distancia_media']
             col2.metric('Distância média das entregas' , valor_medio)            
 
         with col3:
-            tempo_medio_festival = np.round(df1.loc[df1['Festival'] == 'Yes' , 'Time_taken(min)'].mean(), 2)
+            tempo_medio_festival = resultados['tempo_medio_festival']
             col3.metric('Tempo entrega com festival' , tempo_medio_festival)
 
         with col4:
-            desvpad_festival = np.round(df1.loc[df1['Festival'] == 'Yes' , 'Time_taken(min)'].std(), 2)
+            desvpad_festival = resultados['desvpad_festival']
             col4.metric('Desvio padrão entrega com festival' , desvpad_festival)
 
         with col5:
-            df_final = (df1.loc[: , ['City' , 'Time_taken(min)' , 'Type_of_vehicle']].groupby(['City' , 'Type_of_vehicle'])
-                                                                                    .agg(tempo_medio=('Time_taken(min)' , 'mean') , desvio_padro=('Time_taken(min)' , 'std'))
-                                                                                    .reset_index())
-            tempo_medio_nao_festival = np.round(df1.loc[df1['Festival'] == 'No' , 'Time_taken(min)'].mean(), 2)
+            tempo_medio_nao_festival = resultados['tempo_medio_nao_festival']
             col5.metric('Tempo entrega sem festival' , tempo_medio_nao_festival)
             
 
         with col6:
-            df_final = (df1.loc[: , ['City' , 'Time_taken(min)' , 'Type_of_vehicle']].groupby(['City' , 'Type_of_vehicle'])
-                                                                                    .agg(tempo_medio=('Time_taken(min)' , 'mean') , desvio_padro=('Time_taken(min)' , 'std'))
-                                                                                    .reset_index())
-            desvpad_nao_festival = np.round(df1.loc[df1['Festival'] == 'No' , 'Time_taken(min)'].std(), 2)
+            desvpad_nao_festival = resultados['desvpad_nao_festival']
             col6.metric('Desvio padrão entrega sem festival' , desvpad_nao_festival)
 
     with st.container():
@@ -188,27 +99,13 @@ with tab1:
 
         with col1:
             st.markdown("""___""")
-            df_aux = df1.loc[:, ['City', 'Time_taken(min)']].groupby('City').agg({'Time_taken(min)': ['mean', 'std']})
-            df_aux.columns = ['avg_time', 'std_time']
-            df_aux = df_aux.reset_index()
-
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-            name='Control',
-            x=df_aux['City'],
-            y=df_aux['avg_time'],
-            error_y=dict(type='data', array=df_aux['std_time'])
-            ))
-
-            fig.update_layout(barmode='group')
+            fig = resultados['city_time_chart']
             st.plotly_chart(fig)
 
         with col2:
             st.markdown("""___""")
             st.markdown("###### Tempo médio e o desvio padrão de entrega por cidade e tipo de pedido")
-            coluns = ['City' , 'Time_taken(min)' , 'Type_of_order']
-            df_final = df1.loc[: , coluns].groupby(['City' , 'Type_of_order']).agg(tempo_medio=('Time_taken(min)' , 'mean') , desvio_padro=('Time_taken(min)' , 'std')).reset_index()
-            st.dataframe(df_final)
+            st.dataframe(resultados['city_order_table'])
 
 
     
@@ -222,25 +119,7 @@ with tab1:
            
             st.markdown("##### Proporção da distância média de entrega por cidade")
     
-            cols = ['Delivery_location_latitude', 'Delivery_location_longitude', 
-            'Restaurant_latitude', 'Restaurant_longitude']
-    
-            df1['distance'] = df1.loc[:, cols].apply(
-        lambda x: haversine(
-            (x['Restaurant_latitude'], x['Restaurant_longitude']),
-            (x['Delivery_location_latitude'], x['Delivery_location_longitude'])
-            ), axis=1
-            )
-
-            avg_distance = df1.loc[:, ['City', 'distance']].groupby('City').mean().reset_index()
-
-            fig2 = go.Figure(
-            data=[go.Pie(
-            labels=avg_distance['City'], 
-            values=avg_distance['distance'], 
-            pull=[0, 0.05, 0]
-            )]
-            )
+            fig2 = resultados['city_distance_chart']
     
             st.plotly_chart(fig2)
 
@@ -250,55 +129,32 @@ with tab1:
         with col2:
             st.markdown("##### Proporção da distância média de entrega por cidade e por tipo de tráfego")
     
-            cols = ['City', 'Time_taken(min)', 'Road_traffic_density']
-            df_aux = df1.loc[:, cols].groupby(['City', 'Road_traffic_density']).agg({'Time_taken(min)': ['mean', 'std']})
-
-            df_aux.columns = ['avg_time', 'std_time']
-            df_aux = df_aux.reset_index()
-
-            fig1 = px.sunburst(
-            df_aux, path=['City', 'Road_traffic_density'], values='avg_time',
-            color='std_time', color_continuous_scale='RdBu',
-            color_continuous_midpoint=np.average(df_aux['std_time'])
-            )
+            fig1 = resultados['city_traffic_chart']
 
             st.plotly_chart(fig1)
-            
-
-
-        
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
 
+    with st.container():
+        st.markdown("""___""")
+        st.title("Percentis do Tempo de Entrega")
 
+        col1, col2, col3 = st.columns(3)
+        col1.metric('Tempo p50 (min)', resultados['tempo_p50'])
+        col2.metric('Tempo p90 (min)', resultados['tempo_p90'])
+        col3.metric('Tempo p99 (min)', resultados['tempo_p99'])
 
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.markdown("###### Por cidade")
+            st.dataframe(resultados['percentis_cidade'], hide_index=True)
 
+        with col2:
+            st.markdown("###### Por tipo de tráfego")
+            st.dataframe(resultados['percentis_transito'], hide_index=True)
 
+        with col3:
+            st.markdown("###### Por tipo de veículo")
+            st.dataframe(resultados['percentis_veiculo'], hide_index=True)
 
 
+# Tempos de cada etapa desta execução (CURRY_COMPANY_TIMING=1)
+timing_panel(results_cache.stats())
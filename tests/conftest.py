@@ -0,0 +1,34 @@
+# Libraries
+import pytest
+
+from curry_company.data import clean_code, prepare_dataset, read_raw_csv
+from curry_company.synthetic import build_catalog, generate_chunk, write_csv
+
+# Dataset sintético pequeno usado pelos testes
+ROWS = 3000
+DRIVERS = 60
+REGIONS = 3
+RESTAURANTS = 20
+
+
+def raw_orders(rows=ROWS, seed=0, start_date='2022-02-11', days=20):
+    """ Pedidos brutos no formato do train.csv (ver curry_company.synthetic) """
+    catalog = build_catalog(DRIVERS, REGIONS, RESTAURANTS, seed)
+    return generate_chunk(catalog, 0, rows, rows, seed, start_date=start_date, days=days)
+
+
+def clean_csv(path):
+    """ Mesmo caminho das páginas para um csv bruto: leitura, limpeza e ordem por data """
+    return prepare_dataset(clean_code(read_raw_csv(path)))
+
+
+@pytest.fixture(scope='session')
+def raw_csv(tmp_path_factory):
+    path = tmp_path_factory.mktemp('dados') / 'train.csv'
+    write_csv([raw_orders()], path)
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def orders(raw_csv):
+    return clean_csv(raw_csv)
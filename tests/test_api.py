@@ -0,0 +1,108 @@
+# Libraries
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from curry_company import api
+from curry_company.backends import PandasBackend
+from curry_company.cache import ResultCache
+from curry_company.cube import build_cube, filter_cube
+from curry_company.sketch import build_sketches, filter_sketches
+from curry_company.views import filter_rows
+
+
+class _Backend(PandasBackend):
+    """ Backend sobre um dataframe fixo que registra as consultas """
+
+    def __init__(self, df1, falha=None):
+        self.df1 = df1
+        self.falha = falha
+        self.consultas = []
+
+    def version(self):
+        return ('teste', id(self))
+
+    def rows(self, filters, columns=None):
+        self.consultas.append(('rows', tuple(columns)))
+        return filter_rows(self.df1, **filters)
+
+    def cube(self, filters):
+        self.consultas.append(('cube',))
+        if self.falha:
+            raise self.falha
+        return filter_cube(build_cube(self.df1), **filters)
+
+    def sketches(self, filters, names=None):
+        self.consultas.append(('sketches', tuple(names)))
+        return filter_sketches(build_sketches(self.df1), **filters, names=names)
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    monkeypatch.setattr(api, 'results_cache', ResultCache())
+    server = ThreadingHTTPServer(('127.0.0.1', 0), api.MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def _get(url, headers=None):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers or {})) as resposta:
+            return resposta.status, resposta.headers, json.loads(resposta.read())
+    except urllib.error.HTTPError as erro:
+        corpo = erro.read()
+        return erro.code, erro.headers, json.loads(corpo) if corpo else None
+
+
+def test_every_route_returns_json(servidor, monkeypatch, orders):
+    monkeypatch.setattr(api, 'get_backend', lambda: _Backend(orders))
+    _, _, corpo = _get(servidor + '/')
+    for rota in corpo['endpoints']:
+        status, _, corpo = _get(servidor + rota + '?end=2022-02-25&traffic=Low,Jam')
+        assert status == 200, rota
+        assert corpo['filters']['traffic'] == ['Low', 'Jam']
+
+
+def test_matching_etag_answers_304_without_computing(servidor, monkeypatch, orders):
+    backend = _Backend(orders)
+    monkeypatch.setattr(api, 'get_backend', lambda: backend)
+    _, headers, _ = _get(servidor + '/orders/day')
+    contadores = api.results_cache.stats()
+    status, _, corpo = _get(servidor + '/orders/day', {'If-None-Match': headers['ETag']})
+    assert status == 304 and corpo is None
+    assert api.results_cache.stats() == contadores
+
+
+def test_bad_date_and_unknown_route(servidor):
+    assert _get(servidor + '/orders/day?end=ontem')[0] == 400
+    assert _get(servidor + '/inexistente')[0] == 404
+
+
+def test_endpoints_use_configured_backend(servidor, monkeypatch, orders):
+    backend = _Backend(orders)
+    monkeypatch.setattr(api, 'get_backend', lambda: backend)
+
+    status, _, corpo = _get(servidor + '/orders/day?traffic=Low,Jam')
+    assert status == 200 and corpo['data']
+    assert ('rows',) not in [c[:1] for c in backend.consultas]
+
+    backend.consultas.clear()
+    status, _, corpo = _get(servidor + '/drivers/summary')
+    assert status == 200
+    assert corpo['data']['entregadores_unicos'] == orders['Delivery_person_ID'].nunique()
+    assert backend.consultas == [('rows', tuple(api.ENDPOINT_ROWS['/drivers/summary'])), ('cube',),
+                                 ('sketches', ('drivers',))]
+
+
+def test_endpoint_error_returns_json(servidor, monkeypatch, orders):
+    monkeypatch.setattr(api, 'get_backend', lambda: _Backend(orders, falha=RuntimeError('sem cubo')))
+    status, _, corpo = _get(servidor + '/orders/week')
+    assert status == 500
+    assert 'sem cubo' in corpo['error']
@@ -0,0 +1,38 @@
+# Libraries
+import io
+import os
+
+from PIL import Image
+
+from curry_company import assets
+
+
+def _png(path, size):
+    Image.new('RGBA', size, (200, 30, 30, 255)).save(path, format='PNG')
+
+
+def test_logo_is_downscaled_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, '_cache', {})
+    path = str(tmp_path / 'logo.png')
+    _png(path, (1024, 512))
+
+    imagem = assets.logo_image(path, width=100)
+    with Image.open(io.BytesIO(imagem)) as reduzida:
+        assert reduzida.size == (100 * assets.LOGO_SCALE, 100)
+        assert reduzida.mode == 'RGBA'
+    # A segunda chamada devolve os mesmos bytes guardados
+    assert assets.logo_image(path, width=100) is imagem
+
+
+def test_logo_reloads_when_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, '_cache', {})
+    path = str(tmp_path / 'logo.png')
+    _png(path, (1024, 1024))
+    primeira = assets.logo_image(path, width=100)
+
+    _png(path, (100, 50))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+    with Image.open(io.BytesIO(assets.logo_image(path, width=100))) as nova:
+        # Imagens menores que o dobro da largura não são ampliadas
+        assert nova.size == (100, 50)
+    assert len(assets._cache) == 2 and primeira in assets._cache.values()
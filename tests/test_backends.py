@@ -0,0 +1,61 @@
+# Libraries
+import os
+
+import pandas.testing as pdt
+import pytest
+
+from curry_company import backends
+from curry_company import cube as cube_module
+from curry_company import sketch as sketch_module
+from curry_company import views
+from curry_company.data import DATASET_PATH, clear_cache, load_dataset
+from curry_company.sketch import SKETCHES, build_histogram
+from curry_company.snapshot import build_snapshot
+from curry_company.synthetic import write_csv
+from tests.conftest import raw_orders
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    """ dataset/train.csv e o snapshot sintéticos cobrindo as datas de PARITY_FILTERS """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(DATASET_PATH))
+    write_csv([raw_orders(rows=4000, days=55)], DATASET_PATH)
+    build_snapshot(DATASET_PATH)
+    monkeypatch.setattr(backends, '_backends', {})
+    clear_cache()
+    cube_module._cache.clear()
+    sketch_module._cache.clear()
+    yield
+    clear_cache()
+    cube_module._cache.clear()
+    sketch_module._cache.clear()
+
+
+def test_duckdb_matches_pandas(dataset):
+    pytest.importorskip('duckdb')
+    assert backends.check_parity() == []
+
+
+def test_pandas_sketches_fall_back_to_rows(dataset, monkeypatch):
+    # Nenhum grão cabe no limite: os quantis saem das linhas filtradas
+    monkeypatch.setattr(sketch_module, 'SKETCH_MAX_ROWS', 0)
+    backend = backends.get_backend('pandas')
+    filtros = backends.PARITY_FILTERS[2]
+    sketches = backend.sketches(filtros, ['time', 'drivers'])
+    esperado = build_histogram(views.filter_rows(load_dataset(), **filtros), *SKETCHES['time'])
+    pdt.assert_frame_equal(sketches['time'], esperado)
+    resultados = views.restaurantes_view(None, backend.cube(filtros), sketches)
+    assert resultados['tempo_p50'] > 0
+
+
+class _Falha(backends.PandasBackend):
+    def cube(self, filters):
+        raise KeyError('Order_Date')
+
+
+def test_parity_counts_backend_errors(dataset, monkeypatch):
+    monkeypatch.setitem(backends._backends, 'falha', _Falha())
+    diferencas = backends.check_parity(filter_sets=[{}], other='falha')
+    assert len(diferencas) == len(views.PAGES)
+    assert all('falha falhou' in d for d in diferencas)
@@ -0,0 +1,19 @@
+# Libraries
+from curry_company import benchmark
+
+
+def test_run_records_each_case(tmp_path):
+    resultado = benchmark.run(scales=[2_000], directory=str(tmp_path), repeat=2, only=['clean_code', 'build_cube'])
+    assert [r['case'] for r in resultado['results']] == ['clean_code', 'build_cube']
+    for r in resultado['results']:
+        assert r['rows'] == 2_000 and len(r['seconds']) == 2
+        assert r['best'] == min(r['seconds']) and r['peak_bytes'] > 0
+    # O csv sintético é gerado uma vez e reaproveitado
+    assert benchmark.bench_input(2_000, str(tmp_path)) == str(tmp_path / 'synthetic_2000_0.csv')
+
+
+def test_compare_flags_slower_cases():
+    baseline = {'results': [{'case': 'a', 'rows': 10, 'best': 1.0}, {'case': 'b', 'rows': 10, 'best': 1.0}]}
+    atual = {'results': [{'case': 'a', 'rows': 10, 'best': 1.1}, {'case': 'b', 'rows': 10, 'best': 2.0},
+                         {'case': 'c', 'rows': 10, 'best': 9.0}]}
+    assert benchmark.compare(atual, baseline, threshold=1.25) == [('b', 10, 2.0)]
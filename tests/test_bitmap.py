@@ -0,0 +1,20 @@
+# Libraries
+import gc
+
+from curry_company import bitmap
+from curry_company.bitmap import bitmap_index, select_rows
+
+
+def test_index_does_not_keep_frame_alive(orders):
+    copia = orders.copy()
+    chave = id(copia)
+    select_rows(copia, None, None, {'City': ['Urban']})
+    assert chave in bitmap._indexes
+
+    del copia
+    gc.collect()
+    assert chave not in bitmap._indexes
+
+
+def test_index_built_once_per_frame(orders):
+    assert bitmap_index(orders) is bitmap_index(orders)
@@ -0,0 +1,112 @@
+# Libraries
+import threading
+import time
+
+import pandas as pd
+
+from curry_company.cache import ResultCache, filter_key
+
+
+def test_filter_key_ignores_selection_order():
+    a = filter_key('2022-03-13', ['Low', 'Jam'], ['conditions Fog'], None)
+    b = filter_key(pd.Timestamp('2022-03-13'), ['Jam', 'Low', 'Jam'], ['conditions Fog'], None)
+    assert a == b
+    assert filter_key(None, None, None) == (None, None, None, None, None)
+
+
+def test_get_or_compute_caches_result():
+    cache = ResultCache()
+    chamadas = []
+    for _ in range(3):
+        assert cache.get_or_compute('k', lambda: chamadas.append(1) or 42) == 42
+    assert len(chamadas) == 1
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 1
+
+
+def test_get_or_compute_single_flight():
+    cache = ResultCache()
+    chamadas = []
+    liberar = threading.Event()
+
+    def calcular():
+        chamadas.append(1)
+        liberar.wait(5)
+        return 'valor'
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(cache.get_or_compute('k', calcular)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    assert cache.computing('k')
+    liberar.set()
+    for thread in threads:
+        thread.join(5)
+    assert resultados == ['valor'] * 4
+    assert len(chamadas) == 1
+    assert cache.stats()['misses'] == 4
+
+
+def test_waiters_get_result_too_large_to_keep():
+    # O resultado não cabe no cache: quem esperava recebe o valor calculado
+    cache = ResultCache(max_bytes=10)
+    chamadas = []
+    liberar = threading.Event()
+    grande = pd.DataFrame({'x': range(1000)})
+
+    def calcular():
+        chamadas.append(1)
+        liberar.wait(5)
+        return grande
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(cache.get_or_compute('k', calcular)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    liberar.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(resultados) == 4 and all(r is grande for r in resultados)
+    assert len(chamadas) == 1
+    assert cache.stats()['misses'] == 4 and cache.stats()['entries'] == 0
+
+
+def test_get_or_compute_releases_key_on_error():
+    cache = ResultCache()
+
+    def falhar():
+        raise ValueError('erro')
+
+    for _ in range(2):
+        try:
+            cache.get_or_compute('k', falhar)
+        except ValueError:
+            pass
+    assert not cache.computing('k')
+    assert cache.get_or_compute('k', lambda: 1) == 1
+
+
+def test_lru_eviction_by_entries():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_lru_eviction_by_bytes():
+    frame = pd.DataFrame({'x': range(1000)})
+    cache = ResultCache(max_bytes=frame.memory_usage(deep=True).sum() + 10)
+    cache.put('a', frame)
+    cache.put('b', frame)
+    assert cache.get('a') is None and cache.get('b') is frame
+    # Maior que o limite inteiro: devolvido mas não guardado
+    grande = pd.DataFrame({'x': range(10_000)})
+    assert cache.put('c', grande) is grande
+    assert cache.get('c') is None
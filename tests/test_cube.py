@@ -0,0 +1,80 @@
+# Libraries
+import os
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+from curry_company import cube as cube_module
+from curry_company.cube import (CALENDAR_DIMENSIONS, DIMENSIONS, aggregate_plan, build_cube, filter_cube, load_cube,
+                                measure_table, measure_total, rollup, write_cube)
+from curry_company.data import clear_cache
+from curry_company.synthetic import write_csv
+from curry_company.views import RESTAURANT_SPECS
+from tests.conftest import raw_orders
+
+
+def test_measure_table_matches_groupby(orders):
+    tabela = measure_table(build_cube(orders), ['City', 'Road_traffic_density'], 'time')
+    esperado = (orders.groupby(['City', 'Road_traffic_density'], observed=True)['Time_taken(min)']
+                      .agg(['mean', 'std'])
+                      .reset_index())
+    pdt.assert_frame_equal(tabela, esperado, check_dtype=False)
+
+
+def test_filtered_cube_matches_rows(orders):
+    corte, transito = pd.Timestamp('2022-02-20'), ['Low', 'Jam']
+    cube = filter_cube(build_cube(orders), date_cutoff=corte, traffic=transito)
+    linhas = orders[(orders['Order_Date'] < corte) & orders['Road_traffic_density'].isin(transito)]
+
+    contagem = rollup(cube, ['City'])
+    np.testing.assert_array_equal(contagem['n'], linhas.groupby('City', observed=True).size())
+    media, desvio = measure_total(cube, 'rating')
+    assert np.isclose(media, linhas['Delivery_person_Ratings'].mean())
+    assert np.isclose(desvio, linhas['Delivery_person_Ratings'].std())
+
+
+def test_aggregate_plan_matches_measure_table(orders):
+    cube = build_cube(orders)
+    tabelas = aggregate_plan(cube, RESTAURANT_SPECS)
+    for nome, (by, measure, mean_name, std_name) in RESTAURANT_SPECS.items():
+        if by:
+            pdt.assert_frame_equal(tabelas[nome], measure_table(cube, by, measure, mean_name, std_name))
+        else:
+            assert len(tabelas[nome]) == 1
+            np.testing.assert_allclose(tabelas[nome].loc[0, [mean_name, std_name]].to_numpy(dtype='float64'),
+                                       measure_total(cube, measure))
+
+
+def _novo_processo():
+    clear_cache()
+    cube_module._cache.clear()
+
+
+def test_load_cube_reuses_only_its_own_source(tmp_path, raw_csv, orders):
+    cube_path = str(tmp_path / 'cube.arrow')
+    write_cube(build_cube(orders), cube_path, raw_csv)
+
+    # Mesmo arquivo: o cubo persistido é lido
+    _novo_processo()
+    pdt.assert_frame_equal(load_cube(raw_csv, '', cube_path), build_cube(orders), check_categorical=False)
+
+    # Outro csv, mais antigo que o cubo: o cubo persistido é ignorado
+    outro = str(tmp_path / 'outro.csv')
+    write_csv([raw_orders(rows=500, seed=3)], outro)
+    os.utime(outro, ns=(0, 0))
+    _novo_processo()
+    cubo = load_cube(outro, '', cube_path)
+    assert cubo['n'].sum() < len(orders)
+    assert np.isclose(cubo['time_sum'].sum() / cubo['time_n'].sum(),
+                      cube_module.load_dataset(outro, '')['Time_taken(min)'].mean())
+
+
+def test_stale_cube_without_calendar_keys_is_rebuilt(tmp_path, raw_csv, orders):
+    cube_path = str(tmp_path / 'cube.arrow')
+    antigo = build_cube(orders, [d for d in DIMENSIONS if d not in CALENDAR_DIMENSIONS])
+    # As chaves de calendário dependem só de Order_Date: mesmas células
+    assert len(antigo) == len(build_cube(orders))
+    write_cube(antigo, cube_path, raw_csv)
+    _novo_processo()
+    pdt.assert_frame_equal(load_cube(raw_csv, '', cube_path), build_cube(orders))
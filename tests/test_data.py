@@ -0,0 +1,115 @@
+# Libraries
+import os
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+from curry_company.data import (DATASET_PATH, SCHEMA, SNAPSHOT_PATH, clean_code, clear_cache, load_dataset, read_raw_csv,
+                                resolve_source, snapshot_for)
+from curry_company.snapshot import build_snapshot
+from curry_company.synthetic import write_csv
+from tests.conftest import clean_csv, raw_orders
+
+
+def test_load_dataset_reuses_cleaned_frame(raw_csv, orders):
+    clear_cache()
+    df1 = load_dataset(raw_csv, '')
+    assert load_dataset(raw_csv, '') is df1
+    pdt.assert_frame_equal(df1, orders)
+
+
+def test_load_dataset_rereads_changed_file(tmp_path):
+    path = str(tmp_path / 'train.csv')
+    write_csv([raw_orders(rows=500)], path)
+    clear_cache()
+    antigo = load_dataset(path, '')
+
+    write_csv([raw_orders(rows=800, seed=1)], path)
+    os.utime(path, ns=(0, 0))
+    novo = load_dataset(path, '')
+    assert novo is not antigo
+    pdt.assert_frame_equal(novo, clean_csv(path))
+
+
+def test_snapshot_matches_csv(tmp_path, raw_csv, orders):
+    snapshot = str(tmp_path / 'train.arrow')
+    build_snapshot(raw_csv, snapshot)
+    assert resolve_source(raw_csv, snapshot) == snapshot
+    clear_cache()
+    pdt.assert_frame_equal(load_dataset(raw_csv, snapshot), orders)
+
+
+def test_older_snapshot_is_ignored(tmp_path, raw_csv):
+    snapshot = str(tmp_path / 'train.arrow')
+    build_snapshot(raw_csv, snapshot)
+    os.utime(snapshot, ns=(0, 0))
+    assert resolve_source(raw_csv, snapshot) == raw_csv
+    assert resolve_source(raw_csv, str(tmp_path / 'inexistente.arrow')) == raw_csv
+
+
+def baseline_clean(df1):
+    """ Limpeza linha a linha, como as páginas faziam antes do clean_code vetorizado """
+    for coluna in ['ID', 'Road_traffic_density', 'Type_of_order', 'Type_of_vehicle', 'City', 'multiple_deliveries',
+                   'Delivery_person_Age', 'Festival']:
+        df1[coluna] = df1[coluna].str.strip()
+    for coluna in ['Road_traffic_density', 'City', 'Delivery_person_Age', 'multiple_deliveries', 'Festival']:
+        df1 = df1[df1[coluna] != 'NaN']
+    for coluna in ['Delivery_location_latitude', 'Delivery_location_longitude', 'Delivery_person_Age',
+                   'Delivery_person_Ratings', 'multiple_deliveries']:
+        df1[coluna] = pd.to_numeric(df1[coluna], errors='coerce')
+    df1 = df1.dropna(subset=['Delivery_location_latitude', 'Delivery_location_longitude'])
+    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format='%d-%m-%Y')
+    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply(lambda x: x.split('(min) ')[1]).astype(int)
+    return df1
+
+
+def test_clean_code_matches_row_by_row(raw_csv):
+    esperado = baseline_clean(pd.read_csv(raw_csv))
+    df1 = clean_code(read_raw_csv(raw_csv))
+    pdt.assert_index_equal(df1.index, esperado.index)
+    for coluna in esperado.columns:
+        if SCHEMA[coluna] == 'category':
+            np.testing.assert_array_equal(df1[coluna].astype(str), esperado[coluna].astype(str))
+        elif SCHEMA[coluna] == 'datetime64[ns]':
+            pdt.assert_series_equal(df1[coluna], esperado[coluna])
+        else:
+            np.testing.assert_array_equal(df1[coluna].astype('float64'), esperado[coluna])
+
+
+def test_clean_code_schema(orders):
+    for coluna, tipo in SCHEMA.items():
+        if tipo == 'category':
+            assert isinstance(orders[coluna].dtype, pd.CategoricalDtype), coluna
+        elif tipo == 'integer':
+            assert pd.api.types.is_integer_dtype(orders[coluna]), coluna
+        else:
+            assert orders[coluna].dtype == tipo, coluna
+
+
+def test_snapshot_for_follows_csv():
+    assert snapshot_for(DATASET_PATH) == SNAPSHOT_PATH
+    assert snapshot_for('outro/pedidos.csv') == 'outro/pedidos.arrow'
+
+
+def test_other_csv_does_not_use_train_snapshot(tmp_path, monkeypatch, raw_csv, orders):
+    # dataset/train.arrow mais novo que o outro csv não pode ser usado por ele
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('dataset')
+    build_snapshot(raw_csv, SNAPSHOT_PATH)
+    outro = 'outro.csv'
+    write_csv([raw_orders(rows=500, seed=3)], outro)
+    os.utime(outro, ns=(0, 0))
+
+    assert resolve_source(outro) == outro
+    clear_cache()
+    assert len(load_dataset(outro)) < len(orders)
+
+
+def test_snapshot_of_the_csv_is_used(tmp_path, orders):
+    csv = str(tmp_path / 'pedidos.csv')
+    write_csv([raw_orders()], csv)
+    build_snapshot(csv)
+    assert resolve_source(csv) == str(tmp_path / 'pedidos.arrow')
+    clear_cache()
+    pdt.assert_frame_equal(load_dataset(csv), orders, check_categorical=False)
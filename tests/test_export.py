@@ -0,0 +1,54 @@
+# Libraries
+import json
+import os
+
+import pytest
+
+from curry_company import cube as cube_module
+from curry_company import export
+from curry_company.data import DATASET_PATH, clear_cache
+from curry_company.synthetic import write_csv
+from tests.conftest import raw_orders
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    """ dataset/train.csv sintético e caches do processo vazios """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(DATASET_PATH))
+    write_csv([raw_orders()], DATASET_PATH)
+    clear_cache()
+    cube_module._cache.clear()
+    yield
+    clear_cache()
+    cube_module._cache.clear()
+
+
+def test_export_writes_each_filter_set(dataset, tmp_path):
+    filter_sets = [{'name': 'Urban Jam', 'city': ['Urban'], 'traffic': ['Jam']},
+                   {'name': 'fevereiro', 'end': '2022-02-20'}]
+    gravados = export.export(filter_sets, str(tmp_path / 'reports'), workers=2)
+    assert sorted(gravados) == ['Urban Jam', 'fevereiro']
+    for arquivos in gravados.values():
+        assert arquivos and all(os.path.exists(arquivo) for arquivo in arquivos)
+
+    pasta = tmp_path / 'reports' / 'Urban_Jam'
+    assert json.loads((pasta / 'filters.json').read_text()) == filter_sets[0]
+    assert (pasta / 'empresa' / 'map.html').exists()
+    assert json.loads((pasta / 'restaurantes' / 'metrics.json').read_text())
+
+
+@pytest.mark.parametrize('filter_sets', [
+    [{'name': 'Urban', 'city': ['Urban']}, {'city': ['Metropolitian']}],
+    [{'name': 'Urban', 'city': ['Urban']}, {'name': '  ', 'city': ['Metropolitian']}],
+    [{'name': 'Urban', 'city': ['Urban']}, {'name': 'Urban', 'traffic': ['Jam']}],
+    [{'name': 'Urban Jam', 'traffic': ['Jam']}, {'name': 'Urban_Jam', 'traffic': ['Low']}],
+])
+def test_export_rejects_bad_names_before_loading(filter_sets, monkeypatch):
+    monkeypatch.setattr(export, 'load_dataset', lambda: pytest.fail('carregou o dataset'))
+    with pytest.raises(ValueError):
+        export.export(filter_sets)
+
+
+def test_grid_names_are_valid(orders):
+    export.validate_filter_sets(export.grid_filter_sets(orders))
@@ -0,0 +1,55 @@
+# Libraries
+import numpy as np
+import pandas as pd
+import pytest
+from haversine import haversine
+
+from curry_company.data import DISTANCE_COLUMN
+from curry_company.geo import bin_points, haversine_np
+
+
+def test_haversine_np_matches_haversine(orders):
+    pontos = orders.head(200)
+    esperado = [haversine((a, b), (c, d)) for a, b, c, d in
+                zip(pontos['Restaurant_latitude'], pontos['Restaurant_longitude'],
+                    pontos['Delivery_location_latitude'], pontos['Delivery_location_longitude'])]
+    distancia = haversine_np(pontos['Restaurant_latitude'], pontos['Restaurant_longitude'],
+                             pontos['Delivery_location_latitude'], pontos['Delivery_location_longitude'])
+    np.testing.assert_allclose(distancia, esperado, rtol=1e-12)
+    np.testing.assert_allclose(pontos[DISTANCE_COLUMN], esperado, rtol=1e-5)
+
+
+def test_bin_points_matches_groupby(orders):
+    lat, lon = orders['Delivery_location_latitude'], orders['Delivery_location_longitude']
+    grade, cell_deg = bin_points(lat, lon, cell_deg=0.01, max_cells=len(orders))
+    assert cell_deg == 0.01
+    celulas = pd.DataFrame({'linha': np.floor(lat / cell_deg), 'coluna': np.floor(lon / cell_deg)})
+    esperado = celulas.groupby(['linha', 'coluna']).size()
+    assert len(grade) == len(esperado)
+    np.testing.assert_array_equal(np.sort(grade['count']), np.sort(esperado.to_numpy()))
+
+
+def test_bin_points_limits_cells(orders):
+    grade, cell_deg = bin_points(orders['Delivery_location_latitude'], orders['Delivery_location_longitude'], max_cells=50)
+    assert len(grade) <= 50
+    assert grade['count'].sum() == len(orders)
+
+
+@pytest.mark.parametrize('max_cells', [0, -1])
+def test_bin_points_rejects_max_cells(max_cells):
+    with pytest.raises(ValueError, match='max_cells'):
+        bin_points([1.0], [1.0], max_cells=max_cells)
+
+
+def test_bin_points_rejects_cell_size():
+    with pytest.raises(ValueError, match='cell_deg'):
+        bin_points([1.0], [1.0], cell_deg=0)
+
+
+def test_bin_points_stops_at_the_globe():
+    # Um ponto em cada quadrante nunca cabe em uma célula só
+    lat = np.array([10.0, 10.0, -10.0, -10.0])
+    lon = np.array([20.0, -20.0, 20.0, -20.0])
+    grade, cell_deg = bin_points(lat, lon, max_cells=1)
+    assert len(grade) == 4 and cell_deg >= 360
+    assert grade['count'].sum() == 4
@@ -0,0 +1,41 @@
+# Libraries
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from curry_company.hll import build_distinct, merge_distinct
+
+
+def test_exact_counts_match_nunique(orders):
+    sketch = build_distinct(orders)
+    assert sketch.exact
+    assert sketch.count() == orders['Delivery_person_ID'].nunique()
+    esperado = orders.groupby('City', observed=True)['Delivery_person_ID'].nunique()
+    np.testing.assert_array_equal(sketch.count(['City'])['distinct'], esperado.to_numpy())
+
+    corte, transito = pd.Timestamp('2022-02-20'), ['Low', 'Jam']
+    linhas = orders[(orders['Order_Date'] < corte) & orders['Road_traffic_density'].isin(transito)]
+    assert sketch.filter(date_cutoff=corte, traffic=transito).count() == linhas['Delivery_person_ID'].nunique()
+
+
+@pytest.mark.parametrize('precision', [10, 12])
+def test_hll_error_within_bound(orders, precision):
+    # IDs dos pedidos: um valor distinto por linha
+    sketch = build_distinct(orders, column='ID', precision=precision, exact=False)
+    assert not sketch.exact
+    limite = 3 * 1.04 / np.sqrt(2 ** precision)
+    assert abs(sketch.count() / len(orders) - 1) < limite
+    esperado = orders.groupby('City', observed=True).size().to_numpy()
+    assert (np.abs(sketch.count(['City'])['distinct'] / esperado - 1) < limite).all()
+
+
+@pytest.mark.parametrize('exact', [True, False])
+def test_merged_halves_equal_full_build(orders, exact):
+    meio = len(orders) // 2
+    inteiro = build_distinct(orders, precision=10, exact=exact)
+    partes = merge_distinct([build_distinct(orders.iloc[:meio], precision=10, exact=exact),
+                             build_distinct(orders.iloc[meio:], precision=10, exact=exact)])
+    assert partes.exact == exact
+    assert partes.count() == inteiro.count()
+    pdt.assert_frame_equal(partes.count(['City']), inteiro.count(['City']), check_categorical=False)
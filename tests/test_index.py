@@ -0,0 +1,72 @@
+# Libraries
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from curry_company.bitmap import select_rows
+from curry_company.index import calendar_keys, date_slice
+
+PERIODS = [
+    (None, None),
+    ('2022-02-15', '2022-02-20'),
+    (None, '2022-02-11'),
+    ('2022-02-25', None),
+    ('2022-03-02', '2022-03-03'),
+    ('2021-01-01', '2021-02-01'),
+    ('2022-02-20', '2022-02-15'),
+]
+
+
+@pytest.mark.parametrize('start,end', PERIODS)
+def test_date_slice_matches_mask(orders, start, end):
+    datas = orders['Order_Date']
+    mascara = np.ones(len(orders), dtype=bool)
+    if start is not None:
+        mascara &= (datas >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mascara &= (datas < pd.Timestamp(end)).to_numpy()
+    lo, hi = date_slice(datas, start, end)
+    pdt.assert_frame_equal(orders.iloc[lo:hi], orders.loc[mascara])
+
+
+@pytest.mark.parametrize('filters', [
+    {'City': ['Urban'], 'Road_traffic_density': None, 'Weatherconditions': None},
+    {'City': None, 'Road_traffic_density': ['Low', 'Jam'], 'Weatherconditions': ['conditions Fog']},
+    {'City': ['Metropolitian', 'Inexistente'], 'Road_traffic_density': ['High'], 'Weatherconditions': None},
+])
+def test_select_rows_matches_mask(orders, filters):
+    inicio, fim = '2022-02-13', '2022-02-27'
+    datas = orders['Order_Date']
+    mascara = ((datas >= pd.Timestamp(inicio)) & (datas < pd.Timestamp(fim))).to_numpy()
+    for coluna, valores in filters.items():
+        if valores is not None:
+            mascara &= orders[coluna].isin(valores).to_numpy()
+    pdt.assert_frame_equal(select_rows(orders, inicio, fim, filters), orders.loc[mascara])
+
+
+def test_calendar_keys_match_pandas():
+    datas = pd.Series(pd.date_range('1999-01-01', '2031-12-31', freq='D'))
+    chaves = calendar_keys(datas)
+    iso = datas.dt.isocalendar()
+    np.testing.assert_array_equal(chaves['week'], iso['week'].to_numpy())
+    np.testing.assert_array_equal(chaves['weekday'], datas.dt.weekday.to_numpy())
+    np.testing.assert_array_equal(chaves['month'], datas.dt.month.to_numpy())
+    np.testing.assert_array_equal(chaves['day'], (datas - pd.Timestamp('1970-01-01')).dt.days.to_numpy())
+
+
+def test_calendar_keys_read_precomputed_columns(orders):
+    # As chaves do carregamento batem com as calculadas e são lidas da coluna
+    chaves = calendar_keys(orders['Order_Date'])
+    for coluna, chave in [('Order_Day', 'day'), ('Order_Week', 'week'), ('Order_Month', 'month'),
+                          ('Order_Weekday', 'weekday')]:
+        np.testing.assert_array_equal(orders[coluna].to_numpy(), chaves[chave])
+    marcado = orders.loc[:, ['Order_Date', 'Order_Week']].assign(Order_Week=-1)
+    assert (calendar_keys(marcado, ['week'])['week'] == -1).all()
+    # Chave sem coluna sai de Order_Date
+    np.testing.assert_array_equal(calendar_keys(marcado, ['day'])['day'], chaves['day'])
+
+
+def test_order_hour_from_time_orderd(orders):
+    horas = pd.to_numeric(orders['Time_Orderd'].astype(str).str[:2], errors='coerce').fillna(-1)
+    np.testing.assert_array_equal(orders['Order_Hour'].to_numpy(), horas.to_numpy())
@@ -0,0 +1,98 @@
+# Libraries
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from curry_company import cube as cube_module
+from curry_company import sketch as sketch_module
+from curry_company.cube import build_cube, cube_source, load_cube
+from curry_company.data import clear_cache, dataset_key, load_dataset
+from curry_company.hll import DISTINCT_DIMENSIONS
+from curry_company.ingest import append_batch
+from curry_company.sketch import build_sketches, load_sketches
+from curry_company.synthetic import write_csv
+from tests.conftest import clean_csv, raw_orders
+
+
+def _novo_processo():
+    clear_cache()
+    cube_module._cache.clear()
+    sketch_module._cache.clear()
+
+
+@pytest.fixture
+def lote(tmp_path):
+    """ Histórico e lote brutos em csv
+
+        O lote tem pedidos novos a partir do último dia do histórico, um
+        pedido atrasado (data anterior ao último dia, ID novo), cópias de
+        pedidos do último dia já ingeridos e linhas repetidas dentro dele.
+    """
+    historico = raw_orders(rows=2000, seed=0, days=10)
+    novos = raw_orders(rows=400, seed=5, start_date='2022-02-20', days=4)
+    novos['ID'] = [f'0xb{i:04x} ' for i in range(len(novos))]
+    novos.loc[novos.index[:5], 'Order_Date'] = '14-02-2022'
+    ultimo_dia = historico.loc[historico['Order_Date'] == historico['Order_Date'].iloc[-1]].head(30)
+    batch = pd.concat([ultimo_dia, novos, novos.iloc[50:70]], ignore_index=True)
+
+    paths = {
+        'csv': str(tmp_path / 'train.csv'),
+        'snapshot': str(tmp_path / 'train.arrow'),
+        'cube': str(tmp_path / 'cube.arrow'),
+        'batch': str(tmp_path / 'lote.csv'),
+        'full': str(tmp_path / 'completo.csv'),
+    }
+    write_csv([historico], paths['csv'])
+    write_csv([batch], paths['batch'])
+
+    # Reconstrução completa: histórico + pedidos do lote com ID ainda não visto
+    ids = historico['ID'].str.strip()
+    lote_ids = batch['ID'].str.strip()
+    novos_no_lote = batch.loc[~lote_ids.isin(ids) & ~lote_ids.duplicated()]
+    write_csv([pd.concat([historico, novos_no_lote], ignore_index=True)], paths['full'])
+    return paths, len(batch)
+
+
+def _sem_indice(df1):
+    return df1.reset_index(drop=True)
+
+
+def test_append_batch_matches_full_rebuild(lote):
+    paths, linhas_lote = lote
+    _novo_processo()
+    adicionadas, repetidas = append_batch(paths['batch'], paths['csv'], paths['snapshot'], paths['cube'])
+    assert adicionadas > 0
+    assert adicionadas + repetidas == len(clean_csv(paths['batch']))
+
+    # Reenviar o mesmo lote não muda nada
+    assert append_batch(paths['batch'], paths['csv'], paths['snapshot'], paths['cube'])[0] == 0
+
+    completo = clean_csv(paths['full'])
+    df1 = load_dataset(paths['csv'], paths['snapshot'])
+    assert df1['Order_Date'].is_monotonic_increasing
+    pdt.assert_frame_equal(_sem_indice(df1), _sem_indice(completo), check_categorical=False)
+
+    cube = load_cube(paths['csv'], paths['snapshot'], paths['cube'])
+    pdt.assert_frame_equal(cube, build_cube(completo), check_categorical=False)
+
+    esperado = build_sketches(completo)
+    sketches = load_sketches(paths['csv'], paths['snapshot'])
+    for nome in ['time', 'latitude', 'longitude']:
+        pdt.assert_frame_equal(sketches[nome], esperado[nome], check_dtype=False, check_categorical=False)
+    pdt.assert_frame_equal(sketches['drivers'].count(DISTINCT_DIMENSIONS), esperado['drivers'].count(DISTINCT_DIMENSIONS),
+                           check_categorical=False)
+
+
+def test_append_batch_persists_snapshot_and_cube(lote):
+    paths, _ = lote
+    _novo_processo()
+    append_batch(paths['batch'], paths['csv'], paths['snapshot'], paths['cube'])
+    completo = clean_csv(paths['full'])
+
+    # Outro processo: lê o snapshot e reaproveita o cubo gravado
+    _novo_processo()
+    assert cube_source(paths['cube']) == dataset_key(paths['snapshot'])
+    pdt.assert_frame_equal(_sem_indice(load_dataset(paths['csv'], paths['snapshot'])), _sem_indice(completo),
+                           check_categorical=False)
+    pdt.assert_frame_equal(load_cube(paths['csv'], paths['snapshot'], paths['cube']), build_cube(completo),
+                           check_categorical=False)
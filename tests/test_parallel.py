@@ -0,0 +1,22 @@
+# Libraries
+import pandas as pd
+import pandas.testing as pdt
+
+from curry_company.parallel import read_parallel
+from curry_company.synthetic import write_csv
+from tests.conftest import clean_csv, raw_orders
+
+
+def test_parallel_matches_sequential_dtypes(tmp_path):
+    # Linhas embaralhadas: a ordem de aparição dos IDs não é a alfabética
+    path = str(tmp_path / 'pedidos.csv')
+    write_csv([raw_orders().sample(frac=1, random_state=1)], path)
+    sequencial = clean_csv(path)
+
+    for partitions in [1, 3, 7]:
+        paralelo = read_parallel(path, workers=2, partitions=partitions)
+        pdt.assert_series_equal(paralelo.dtypes, sequencial.dtypes)
+        for coluna in sequencial.columns:
+            if isinstance(sequencial[coluna].dtype, pd.CategoricalDtype):
+                pdt.assert_index_equal(paralelo[coluna].cat.categories, sequencial[coluna].cat.categories)
+        pdt.assert_frame_equal(paralelo, sequencial)
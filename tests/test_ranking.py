@@ -0,0 +1,44 @@
+# Libraries
+import pandas as pd
+import pandas.testing as pdt
+
+from curry_company.ranking import rank_delivers
+
+METRIC = 'Time_taken(min)'
+
+
+def baseline_rank(df1, n=10, ascending=True):
+    """ Ranking como a página fazia (groupby + mean + nsmallest/nlargest por cidade)
+
+        Empates pelo ID do entregador, a regra documentada em rank_delivers.
+    """
+    df_aux = df1.loc[:, ['City', 'Delivery_person_ID', METRIC]].astype({'City': str, 'Delivery_person_ID': str})
+    df_aux = df_aux.groupby(['City', 'Delivery_person_ID'])[METRIC].mean().reset_index()
+    df_aux = df_aux.sort_values(['City', METRIC, 'Delivery_person_ID'], ascending=[True, ascending, True], kind='stable')
+    return df_aux.groupby('City').head(n).reset_index(drop=True)
+
+
+def as_text(df_aux):
+    return df_aux.astype({'City': str, 'Delivery_person_ID': str}).reset_index(drop=True)
+
+
+def test_rank_delivers_matches_groupby(orders):
+    rapidos, lentos = rank_delivers(orders)
+    pdt.assert_frame_equal(as_text(rapidos), baseline_rank(orders, ascending=True))
+    pdt.assert_frame_equal(as_text(lentos), baseline_rank(orders, ascending=False))
+
+
+def test_rank_delivers_ignores_missing_values(orders):
+    df1 = orders.copy()
+    df1[METRIC] = df1[METRIC].astype('float64')
+    df1.loc[df1.index[::7], METRIC] = float('nan')
+    rapidos, _ = rank_delivers(df1, n=3)
+    pdt.assert_frame_equal(as_text(rapidos), baseline_rank(df1, n=3))
+    assert rapidos.groupby('City', observed=True).size().le(3).all()
+
+
+def test_rank_delivers_empty_frame(orders):
+    rapidos, lentos = rank_delivers(orders.iloc[:0])
+    assert len(rapidos) == 0 and len(lentos) == 0
+    assert list(rapidos.columns) == ['City', 'Delivery_person_ID', METRIC]
+    assert isinstance(rapidos, pd.DataFrame)
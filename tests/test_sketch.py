@@ -0,0 +1,108 @@
+# Libraries
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from curry_company.index import floor_dates
+from curry_company.sketch import (QUANTILES, SKETCHES, build_sketches, filter_sketches, merge_sketches, quantile_table,
+                                  sketch_grain)
+from tests.conftest import clean_csv, raw_orders
+
+NAMES = [f'p{q * 100:g}' for q in QUANTILES]
+
+
+def baseline_quantiles(df1, by):
+    """ Quantis exatos das linhas (np.quantile com method='inverted_cdf') """
+    def quantis(tempos):
+        return pd.Series(np.quantile(tempos.to_numpy(dtype='float64'), QUANTILES, method='inverted_cdf'), index=NAMES)
+    return (df1.groupby(by, observed=True)['Time_taken(min)']
+               .apply(quantis)
+               .unstack()
+               .reset_index()
+               .rename_axis(columns=None))
+
+
+@pytest.fixture(scope='module')
+def sketches(orders):
+    return build_sketches(orders)
+
+
+@pytest.mark.parametrize('by', [['City'], ['City', 'Road_traffic_density'], ['Type_of_vehicle']])
+def test_quantile_table_matches_rows(orders, sketches, by):
+    # Tempo é inteiro em minutos: com faixas de 1 o quantil é exato
+    tabela = quantile_table(sketches['time'], by)
+    pdt.assert_frame_equal(tabela, baseline_quantiles(orders, by), check_dtype=False, check_categorical=False)
+
+
+def test_quantile_table_total_and_empty(orders, sketches):
+    tabela = quantile_table(sketches['time'], [])
+    esperado = np.quantile(orders['Time_taken(min)'].to_numpy(dtype='float64'), QUANTILES, method='inverted_cdf')
+    np.testing.assert_array_equal(tabela.loc[0, NAMES].to_numpy(dtype='float64'), esperado)
+
+    vazio = quantile_table(sketches['time'].iloc[:0], [])
+    assert len(vazio) == 1 and vazio.isna().all(axis=None)
+
+
+def test_sketches_merge_like_full_build(orders, sketches):
+    meio = len(orders) // 2
+    partes = merge_sketches([build_sketches(orders.iloc[:meio]), build_sketches(orders.iloc[meio:])])
+    for nome in ['time', 'latitude', 'longitude']:
+        pdt.assert_frame_equal(partes[nome], sketches[nome], check_dtype=False, check_categorical=False)
+    assert partes['drivers'].count() == sketches['drivers'].count() == orders['Delivery_person_ID'].nunique()
+
+
+def test_latitude_median_within_half_bin(orders, sketches):
+    coluna, largura = SKETCHES['latitude'][:2]
+    tabela = quantile_table(sketches['latitude'], ['City'], width=largura)
+    esperado = (orders.groupby('City', observed=True)[coluna]
+                      .apply(lambda v: np.quantile(v.dropna(), 0.5, method='inverted_cdf')))
+    np.testing.assert_allclose(tabela['p50'], esperado.to_numpy(), rtol=0, atol=largura / 2 + 1e-9)
+
+
+def test_sketch_size_is_bounded_by_cells(tmp_path):
+    # Muitos pedidos em poucos dias: o sketch fica limitado pelas células
+    # e faixas ocupadas, não pelo número de pedidos
+    caminho = tmp_path / 'denso.csv'
+    raw_orders(rows=40000, days=2).to_csv(caminho, index=False)
+    denso = clean_csv(str(caminho))
+    sketches = build_sketches(denso)
+    for nome, (coluna, largura, dimensoes) in SKETCHES.items():
+        assert list(sketches[nome].columns) == dimensoes + ['bin', 'count']
+        celulas = denso.groupby(dimensoes, observed=True, dropna=False).ngroups
+        faixas = np.unique(sketches[nome]['bin']).size
+        assert len(sketches[nome]) <= celulas * faixas
+    assert 'Type_of_vehicle' not in sketches['latitude'].columns
+    assert len(sketches['latitude']) < len(denso) / 2
+    assert len(sketches['longitude']) < len(denso) / 2
+
+
+def test_sketches_coarsen_dates_over_the_limit(orders, sketches):
+    limite = len(sketches['time']) - 1
+    grossos = build_sketches(orders, max_rows=limite)
+    grain = sketch_grain(grossos['time'])
+    assert grain > 1 and len(grossos['time']) <= limite
+    assert grossos['time']['count'].sum() == sketches['time']['count'].sum()
+
+    # O período vira os blocos inteiros que ele toca; os quantis são os
+    # exatos dos pedidos desses blocos
+    inicio, fim = pd.Timestamp('2022-02-16'), pd.Timestamp('2022-02-25')
+    filtrado = filter_sketches(grossos, date_start=inicio, date_cutoff=fim, names=['time'])['time']
+    primeiro = floor_dates([inicio], grain)[0]
+    ultimo = floor_dates([fim - pd.Timedelta(days=1)], grain)[0] + np.timedelta64(grain, 'D')
+    linhas = orders[(orders['Order_Date'] >= primeiro) & (orders['Order_Date'] < ultimo)]
+    pdt.assert_frame_equal(quantile_table(filtrado, ['City']), baseline_quantiles(linhas, ['City']),
+                           check_dtype=False, check_categorical=False)
+
+    # Grãos diferentes se juntam no maior
+    juntos = merge_sketches([sketches, grossos])
+    assert sketch_grain(juntos['time']) == grain
+    assert juntos['time']['count'].sum() == 2 * len(orders)
+
+
+def test_sketches_left_out_when_no_grain_fits(orders, sketches):
+    vazios = build_sketches(orders, max_rows=0)
+    assert all(vazios[nome] is None for nome in SKETCHES)
+    assert vazios['drivers'].count() == sketches['drivers'].count()
+    assert merge_sketches([sketches, vazios])['time'] is None
+    assert list(filter_sketches(vazios, names=['time', 'drivers'])) == ['drivers']
@@ -0,0 +1,35 @@
+# Libraries
+import pytest
+
+from curry_company import startup
+
+# Pacotes que os scripts das páginas não devem importar no topo
+HEAVY = ['pandas', 'numpy', 'plotly', 'haversine', 'folium', 'streamlit_folium', 'PIL']
+
+
+@pytest.mark.parametrize('script', list(startup.PAGES.values()))
+def test_pages_defer_heavy_imports(script):
+    codigo = startup.page_imports(script)
+    for pacote in HEAVY:
+        assert f'import {pacote}' not in codigo and f'from {pacote}' not in codigo
+
+
+def test_parse_importtime_counts_after_marker():
+    saida = '\n'.join([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       500 |        500 | encodings',
+        startup.MARKER,
+        'import time:       100 |        100 |   numpy.core',
+        'import time:       300 |        400 | numpy',
+        'import time:      1000 |       1000 | pandas',
+    ])
+    total, pacotes = startup.parse_importtime(saida)
+    assert total == pytest.approx(1.4)
+    assert pacotes == pytest.approx({'numpy': 0.4, 'pandas': 1.0})
+
+
+def test_compare_flags_slower_pages():
+    baseline = {'results': [{'page': 'home', 'first_render_ms': 100.0}, {'page': 'empresa', 'first_render_ms': 100.0}]}
+    atual = {'results': [{'page': 'home', 'first_render_ms': 110.0}, {'page': 'empresa', 'first_render_ms': 200.0},
+                         {'page': 'nova', 'first_render_ms': 900.0}]}
+    assert startup.compare(atual, baseline, threshold=1.25) == [('empresa', 2.0)]
@@ -0,0 +1,104 @@
+# Libraries
+import os
+import shutil
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from curry_company import backends, views
+from curry_company import cube as cube_module
+from curry_company import sketch as sketch_module
+from curry_company.cube import CUBE_PATH, build_cube
+from curry_company.data import DATASET_PATH, clear_cache, dataset_key, dataset_loaded
+from curry_company.hll import DISTINCT_DIMENSIONS
+from curry_company.sketch import SKETCHES_PATH, build_sketches, read_sketches, sketch_grain
+from curry_company.snapshot import build_snapshot
+from curry_company.streaming import MERGE_EVERY, build_aggregates, stream_aggregates, stream_cube
+from curry_company.synthetic import write_csv
+from tests.conftest import raw_orders
+
+
+def test_stream_aggregates_match_full_build(raw_csv, orders):
+    # Blocos pequenos: passa por várias somas intermediárias
+    chunksize = len(orders) // (MERGE_EVERY + 3)
+    cube, sketches = stream_aggregates(raw_csv, chunksize)
+    pdt.assert_frame_equal(cube, build_cube(orders), check_categorical=False)
+
+    esperado = build_sketches(orders)
+    for nome in ['time', 'latitude', 'longitude']:
+        pdt.assert_frame_equal(sketches[nome], esperado[nome], check_dtype=False, check_categorical=False)
+    pdt.assert_frame_equal(sketches['drivers'].count(DISTINCT_DIMENSIONS), esperado['drivers'].count(DISTINCT_DIMENSIONS),
+                           check_categorical=False)
+
+
+def test_stream_cube_only(raw_csv, orders):
+    pdt.assert_frame_equal(stream_cube(raw_csv, 500), build_cube(orders), check_categorical=False)
+
+
+def test_stream_from_snapshot(raw_csv, orders, tmp_path):
+    # O snapshot é lido em blocos já limpos, por memory map
+    snapshot = str(tmp_path / 'train.arrow')
+    build_snapshot(raw_csv, snapshot)
+    pdt.assert_frame_equal(stream_cube(snapshot, 700), build_cube(orders), check_categorical=False)
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    """ dataset/train.csv sintético e caches do processo vazios """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(DATASET_PATH))
+    write_csv([raw_orders()], DATASET_PATH)
+    monkeypatch.setattr(backends, '_backends', {})
+
+    def limpar():
+        clear_cache()
+        cube_module._cache.clear()
+        sketch_module._cache.clear()
+        views.results_cache.clear()
+    limpar()
+    yield limpar
+    limpar()
+
+
+def test_persisted_sketches_round_trip(dataset, orders):
+    _, gravados = build_aggregates(chunksize=700)
+    lidos = read_sketches(key=dataset_key(DATASET_PATH))
+    for nome in ['time', 'latitude', 'longitude']:
+        pdt.assert_frame_equal(lidos[nome], gravados[nome])
+        assert sketch_grain(lidos[nome]) == sketch_grain(gravados[nome])
+    pdt.assert_frame_equal(lidos['drivers'].count(DISTINCT_DIMENSIONS), gravados['drivers'].count(DISTINCT_DIMENSIONS))
+    assert lidos['drivers'].count() == orders['Delivery_person_ID'].nunique()
+    # Chave de outro arquivo: nada é aproveitado
+    assert read_sketches(key=('outro', 0, 0)) is None
+
+
+def test_pages_run_from_streamed_aggregates(dataset):
+    def resultados():
+        return {
+            'bounds': views.dataset_date_bounds(),
+            'restaurantes': views.page_results('restaurantes'),
+            **{section: views.page_results('empresa', section=section) for section in ['gerencial', 'tatica', 'tendencias']},
+        }
+
+    build_aggregates(chunksize=700)
+    gravados = resultados()
+    # Cubo e sketches gravados: as páginas sem linhas não carregam o dataset
+    assert not dataset_loaded()
+
+    dataset()
+    os.remove(CUBE_PATH)
+    shutil.rmtree(SKETCHES_PATH)
+    completos = resultados()
+    assert dataset_loaded()
+
+    assert gravados['bounds'] == completos['bounds']
+    for chave in ['qtd_entregadores', 'distancia_media', 'tempo_p50', 'tempo_p90', 'tempo_p99', 'percentis_veiculo']:
+        esperado, obtido = completos['restaurantes'][chave], gravados['restaurantes'][chave]
+        if isinstance(esperado, pd.DataFrame):
+            pdt.assert_frame_equal(obtido, esperado, check_categorical=False)
+        else:
+            assert obtido == esperado
+    for section in ['gerencial', 'tatica', 'tendencias']:
+        for nome, fig in completos[section].items():
+            assert gravados[section][nome].to_json() == fig.to_json(), (section, nome)
@@ -0,0 +1,44 @@
+# Libraries
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from curry_company.snapshot import read_snapshot
+from curry_company.synthetic import CITY_TYPES, RAW_NAN, generate, generate_chunks
+from tests.conftest import DRIVERS, RESTAURANTS, clean_csv
+
+
+def test_arrow_output_matches_cleaned_csv(tmp_path):
+    csv, arrow = str(tmp_path / 'orders.csv'), str(tmp_path / 'orders.arrow')
+    assert generate(csv, 5_000, DRIVERS, 3, RESTAURANTS, seed=2, chunksize=1_500) == 5_000
+    limpo = clean_csv(csv)
+    # O .arrow grava só as linhas que passam pela limpeza
+    assert generate(arrow, 5_000, DRIVERS, 3, RESTAURANTS, seed=2, chunksize=1_500) == len(limpo)
+    pdt.assert_frame_equal(read_snapshot(arrow), limpo, check_categorical=False)
+
+
+def test_same_seed_same_file(tmp_path):
+    a, b = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    for path in [a, b]:
+        generate(str(path), 2_000, DRIVERS, 3, RESTAURANTS, seed=1, chunksize=700)
+    assert a.read_bytes() == b.read_bytes()
+
+
+def test_chunksize_does_not_change_output():
+    inteiro = pd.concat(generate_chunks(25_000, DRIVERS, 3, RESTAURANTS, seed=4, chunksize=25_000))
+    blocos = pd.concat(generate_chunks(25_000, DRIVERS, 3, RESTAURANTS, seed=4, chunksize=7_000))
+    pd.testing.assert_frame_equal(inteiro, blocos)
+
+
+def test_days_and_regions(tmp_path):
+    path = str(tmp_path / 'orders.csv')
+    assert generate(path, 2_000, DRIVERS, 5, RESTAURANTS, seed=1, chunksize=500, days=7) == 2_000
+    df1 = clean_csv(path)
+    assert df1['Order_Date'].nunique() == 7
+    assert df1['Delivery_person_ID'].str[:4].nunique() == 5
+    assert set(df1['City'].astype(str)) <= {c.strip() for c in CITY_TYPES + [RAW_NAN]}
+
+
+def test_generate_rejects_no_days(tmp_path):
+    with pytest.raises(ValueError):
+        generate(str(tmp_path / 'orders.csv'), 100, DRIVERS, 3, RESTAURANTS, days=0)
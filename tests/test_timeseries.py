@@ -0,0 +1,33 @@
+# Libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+from curry_company.cube import build_cube
+from curry_company.hll import build_distinct
+from curry_company.timeseries import rolling_metrics
+
+
+@pytest.fixture(scope='module')
+def series(orders):
+    return rolling_metrics(build_cube(orders), build_distinct(orders))
+
+
+@pytest.mark.parametrize('window', [7, 28])
+def test_rolling_metrics_match_brute_force(orders, series, window):
+    # A cada 3 dias, por cidade: janela de calendário de `window` dias sobre as linhas
+    datas = pd.date_range(orders['Order_Date'].min(), orders['Order_Date'].max(), freq='3D')
+    tabela = series[series['window'] == f'{window} dias'].set_index(['City', 'Order_Date'])
+    for cidade in orders['City'].dropna().unique():
+        linhas_cidade = orders[orders['City'] == cidade]
+        for data in datas:
+            janela = linhas_cidade[(linhas_cidade['Order_Date'] > data - pd.Timedelta(days=window))
+                                   & (linhas_cidade['Order_Date'] <= data)]
+            linha = tabela.loc[(cidade, data)]
+            assert linha['orders'] == len(janela)
+            if len(janela):
+                assert linha['avg_time'] == pytest.approx(janela['Time_taken(min)'].mean())
+                esperado = len(janela) / janela['Delivery_person_ID'].nunique()
+                assert linha['orders_per_driver'] == pytest.approx(esperado)
+            else:
+                assert np.isnan(linha['avg_time'])
@@ -0,0 +1,40 @@
+# Libraries
+import json
+
+from curry_company import timing
+
+
+@timing.timed
+def _contar(df1):
+    return len(df1)
+
+
+def test_spans_of_a_run(tmp_path, monkeypatch, orders):
+    log = tmp_path / 'tempos.jsonl'
+    monkeypatch.setattr(timing, 'ENABLED', True)
+    monkeypatch.setattr(timing, 'LOG_PATH', str(log))
+
+    timing.begin_run('empresa')
+    timing.stage('sidebar')
+    timing.stage('results')
+    with timing.span('filtro') as s:
+        s.rows = 7
+        assert _contar(orders) == len(orders)
+    execucao = timing.end_run()
+
+    etapas = [(e['stage'], e['rows'], e['depth']) for e in execucao['spans']]
+    assert etapas == [('sidebar', None, 0), ('results', None, 0), ('filtro', 7, 1), ('_contar', len(orders), 2)]
+    assert all(e['ms'] >= 0 for e in execucao['spans'])
+    linhas = log.read_text().splitlines()
+    assert len(linhas) == 1 and json.loads(linhas[0])['page'] == 'empresa'
+
+
+def test_disabled_records_nothing(monkeypatch, orders):
+    monkeypatch.setattr(timing, 'ENABLED', False)
+    timing.begin_run('empresa')
+    timing.stage('sidebar')
+    with timing.span('filtro') as s:
+        s.rows = 7
+    assert timing.span('outro') is s
+    assert _contar(orders) == len(orders)
+    assert timing.end_run()['spans'] == []
@@ -0,0 +1,103 @@
+# Libraries
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pandas.testing as pdt
+
+from curry_company import views
+from curry_company.bitmap import select_rows
+from curry_company.index import date_bounds
+
+
+def test_prefetch_computes_the_other_sections(monkeypatch):
+    calculadas = []
+    monkeypatch.setattr(views, 'get_backend', lambda: _Versao())
+    monkeypatch.setattr(views, '_prefetch', lambda page, section, filtros: calculadas.append((section, filtros)))
+    views.prefetch_sections('empresa', 'gerencial', date_cutoff='2022-03-01')
+    # O worker é uma thread só: esta tarefa roda depois das pré-cargas
+    views._prefetch_pool.submit(lambda: None).result(timeout=5)
+    filtros = {'date_cutoff': '2022-03-01'}
+    assert sorted(calculadas) == [('geografica', filtros), ('tatica', filtros), ('tendencias', filtros)]
+
+
+class _Backend:
+    def __init__(self, df1):
+        self.df1 = df1
+
+    def date_bounds(self):
+        return date_bounds(self.df1)
+
+
+def test_slider_bounds_include_last_day(monkeypatch, orders):
+    monkeypatch.setattr(views, 'get_backend', lambda: _Backend(orders))
+    data_min, data_max = views.dataset_date_bounds()
+    selecao = select_rows(orders, data_min, data_max)
+    pdt.assert_frame_equal(selecao, orders)
+    assert (selecao['Order_Date'] == orders['Order_Date'].max()).any()
+
+
+class _Versao:
+    def __init__(self, linhas=True):
+        self.linhas = linhas
+
+    def version(self):
+        return 0
+
+    def rows_loaded(self):
+        return self.linhas
+
+
+def test_prefetch_replaces_stale_filters(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=1)
+    liberar = threading.Event()
+    calculadas = []
+    monkeypatch.setattr(views, '_prefetch_pool', pool)
+    monkeypatch.setattr(views, '_prefetch_futures', {})
+    monkeypatch.setattr(views, 'get_backend', lambda: _Versao())
+    monkeypatch.setattr(views, '_prefetch', lambda page, section, filtros: calculadas.append((section, filtros['date_cutoff'])))
+
+    # Prende o único worker para as pré-cargas ficarem na fila
+    pool.submit(liberar.wait, 5)
+    views.prefetch_sections('empresa', 'gerencial', date_cutoff='2022-03-01')
+    views.prefetch_sections('empresa', 'gerencial', date_cutoff='2022-03-01')
+    assert len(views._prefetch_futures['empresa']) == 3
+    primeiras = list(views._prefetch_futures['empresa'].values())
+
+    # Slider arrastado: as pré-cargas dos filtros anteriores saem da fila
+    views.prefetch_sections('empresa', 'gerencial', date_cutoff='2022-03-05')
+    assert all(futuro.cancelled() for futuro in primeiras)
+
+    liberar.set()
+    pool.shutdown(wait=True)
+    assert sorted(calculadas) == [('geografica', '2022-03-05'), ('tatica', '2022-03-05'), ('tendencias', '2022-03-05')]
+
+
+def test_prefetch_skips_row_views_without_rows(monkeypatch):
+    calculadas = []
+    monkeypatch.setattr(views, '_prefetch_futures', {})
+    monkeypatch.setattr(views, 'get_backend', lambda: _Versao(linhas=False))
+    monkeypatch.setattr(views, '_prefetch', lambda page, section, filtros: calculadas.append(section))
+
+    views.prefetch_sections('empresa', 'gerencial', date_cutoff='2022-03-01')
+    for futuro in views._prefetch_futures['empresa'].values():
+        futuro.result(timeout=5)
+    assert sorted(calculadas) == ['tatica', 'tendencias']
+
+
+def test_results_key_includes_city(monkeypatch):
+    monkeypatch.setattr(views, 'get_backend', lambda: _Versao())
+    urbano = views._results_key('empresa', None, '2022-03-01', None, None, None, ['Urban'])
+    assert urbano != views._results_key('empresa', None, '2022-03-01', None, None, None, None)
+    assert urbano == views._results_key('empresa', None, '2022-03-01', None, None, None, ('Urban', 'Urban'))
+
+
+def test_ratings_by_driver_keeps_csv_values(raw_csv, orders):
+    assert orders['Delivery_person_Ratings'].dtype == 'float64'
+    bruto = pd.read_csv(raw_csv, usecols=['ID', 'Delivery_person_ID', 'Delivery_person_Ratings'],
+                        na_values=['NaN', 'NaN '])
+    bruto = bruto.loc[bruto['ID'].str.strip().isin(orders['ID'].astype(str))]
+    esperado = bruto.groupby('Delivery_person_ID')['Delivery_person_Ratings'].mean()
+    tabela = views.ratings_by_driver(orders)
+    tabela = tabela.set_index(tabela['Delivery_person_ID'].astype(str))['Delivery_person_Ratings']
+    pdt.assert_series_equal(tabela.sort_index(), esperado.sort_index(), rtol=1e-12)